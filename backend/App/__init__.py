@@ -1,16 +1,15 @@
 #_init_.py
-from flask import Flask, send_from_directory
+from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from flask_mail import Mail
-from flask_migrate import Migrate
 from .config import Config
 from flask_bcrypt import Bcrypt
 from flask_jwt_extended import JWTManager
 import os
 from datetime import timedelta
-db = SQLAlchemy()
+from utils.db_routing import RoutingSession
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 mail = Mail()
-migrate = Migrate()
 bcrypt = Bcrypt()
 jwt = JWTManager()
 def create_app():
@@ -26,7 +25,11 @@ def create_app():
     # Inisialisasi ekstensi
     db.init_app(app)
     mail.init_app(app)
-    migrate.init_app(app, db)
+    # Flask-Migrate (alembic) is only needed by the `flask db ...` commands;
+    # importing it in every gunicorn worker costs ~0.3 s of startup
+    if os.getenv('FLASK_RUN_FROM_CLI') == 'true':
+        from flask_migrate import Migrate
+        Migrate(app, db)
     bcrypt.init_app(app)
     jwt.init_app(app)
     
@@ -42,17 +45,28 @@ def create_app():
         response.headers["Access-Control-Allow-Credentials"] = "true"
         return response
 
+    # Antrean bcrypt penuh -> 503 dengan Retry-After (lihat utils/passwords.py)
+    from utils.passwords import PasswordPoolBusy
+
+    @app.errorhandler(PasswordPoolBusy)
+    def password_pool_busy(e):
+        return {'message': 'Server is busy, please try again'}, 503, {'Retry-After': str(e.retry_after)}
+
+    # Versi data bersama antar worker (ETag endpoint publik, invalidasi cache)
+    import utils.data_version  # noqa: F401  (mendaftarkan event listener session)
+
     # Registrasi blueprint
     from Routes.questions import questions_bp
     from Routes.login import login_bp
     from Routes.lecturer import lecturer_bp
     from Routes.validate import auth_bp_token
     from Routes.auth import auth_bp_profile, auth_bp
-    from Routes.admin import student_bp
+    from Routes.admin import student_bp, admin_bp
     from Routes.teaching import teaching_bp
     from Routes.class_routes import class_bp
     from Routes.evaluation_history import evaluation_history_bp
     from Routes.leaderboard import leaderboard_bp
+    from Routes.analytics import analytics_bp
     app.register_blueprint(login_bp)
     app.register_blueprint(questions_bp)
     app.register_blueprint(lecturer_bp)
@@ -60,14 +74,55 @@ def create_app():
     app.register_blueprint(auth_bp_profile)
     app.register_blueprint(auth_bp)
     app.register_blueprint(student_bp)
+    app.register_blueprint(admin_bp)
     app.register_blueprint(teaching_bp)
     app.register_blueprint(class_bp)
     app.register_blueprint(evaluation_history_bp)
     app.register_blueprint(leaderboard_bp)
-    # Serve lecturer photo uploads
+    app.register_blueprint(analytics_bp)
+
+    # Latensi per endpoint, statistik SQL per request dan pool koneksi di /metrics (Prometheus)
+    from utils.metrics import init_metrics
+    init_metrics(app, db)
+    # Mode uji: anggaran query per endpoint dan deteksi N+1 (utils/query_budget.py)
+    from utils.query_budget import init_query_budget
+    init_query_budget(app, db)
+    # Serve lecturer photo uploads (varian ber-hash: Cache-Control immutable)
 
     @app.route('/uploads/lecturers/<filename>')
     def serve_lecturer_photo(filename):
-        return send_from_directory('/app/backend/uploads/lecturers', filename)
+        from utils.photos import serve_photo
+        return serve_photo(filename)
+
+    # Recompute lecturer_scores from evaluations (backfill / repair)
+    @app.cli.command('rebuild-scores')
+    def rebuild_scores():
+        from utils.scores import rebuild_lecturer_scores
+        from utils.leaderboard import rebuild_leaderboard
+        if rebuild_lecturer_scores():
+            print("✅ Lecturer scores rebuilt.")
+            if rebuild_leaderboard():
+                print("✅ Leaderboard ranks rebuilt.")
+
+    @app.cli.command('refresh-leaderboard')
+    def refresh_leaderboard():
+        # Untuk cron: menjaga leaderboard_ranks tetap baru tanpa menunggu request baca
+        from utils.leaderboard import rebuild_leaderboard
+        if rebuild_leaderboard():
+            print("✅ Leaderboard ranks refreshed.")
+
+    @app.cli.command('drain-submissions')
+    def drain_submissions():
+        from utils.submission_queue import drain_all, queue_stats
+        drained = drain_all()
+        stats = queue_stats()
+        print(f"✅ Drained {drained} submissions ({stats['pending']} pending, {stats['failed']} failed).")
+
+    # Migrasi FK lama ke ON DELETE CASCADE (idempoten, hanya PostgreSQL)
+    @app.cli.command('apply-cascade-fks')
+    def apply_cascade_fks():
+        from utils.deletion import apply_cascade_foreign_keys
+        changed = apply_cascade_foreign_keys()
+        print(f"✅ {len(changed)} foreign keys set to ON DELETE CASCADE.")
     # from . import models
     return app
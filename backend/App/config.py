@@ -1,10 +1,38 @@
 import os
 from dotenv import load_dotenv
 load_dotenv()
+
+
+def engine_options(prefix):
+    """Pool options of one bind from the environment (<prefix>_POOL_SIZE, _MAX_OVERFLOW, _POOL_TIMEOUT, _POOL_PRE_PING, _POOL_RECYCLE)."""
+    options = {}
+    if os.getenv(f'{prefix}_POOL_SIZE'):
+        options['pool_size'] = int(os.getenv(f'{prefix}_POOL_SIZE'))
+    if os.getenv(f'{prefix}_MAX_OVERFLOW'):
+        options['max_overflow'] = int(os.getenv(f'{prefix}_MAX_OVERFLOW'))
+    if os.getenv(f'{prefix}_POOL_TIMEOUT'):
+        options['pool_timeout'] = int(os.getenv(f'{prefix}_POOL_TIMEOUT'))
+    if os.getenv(f'{prefix}_POOL_PRE_PING'):
+        options['pool_pre_ping'] = os.getenv(f'{prefix}_POOL_PRE_PING').lower() == 'true'
+    if os.getenv(f'{prefix}_POOL_RECYCLE'):
+        options['pool_recycle'] = int(os.getenv(f'{prefix}_POOL_RECYCLE'))
+    return options
+
+
 class Config:
     SECRET_KEY = os.getenv('SECRET_KEY') 
     SQLALCHEMY_DATABASE_URI = os.getenv('SQLALCHEMY_DATABASE_URI')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # Pool koneksi primary: DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_PRE_PING, DB_POOL_RECYCLE
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options('DB')
+    # Read replica opsional (lihat utils/db_routing.py); pool: DB_REPLICA_POOL_SIZE, dst.
+    SQLALCHEMY_BINDS = {
+        'replica': {'url': os.getenv('SQLALCHEMY_REPLICA_URI'), **engine_options('DB_REPLICA')}
+    } if os.getenv('SQLALCHEMY_REPLICA_URI') else {}
+    # Cost factor bcrypt untuk hash baru; hash lama di-upgrade saat login
+    BCRYPT_LOG_ROUNDS = int(os.getenv('BCRYPT_LOG_ROUNDS', '12'))
+    # Foto dosen dikirim lewat X-Sendfile (Apache/lighttpd); untuk nginx pakai PHOTO_X_ACCEL_PREFIX
+    USE_X_SENDFILE = os.getenv('USE_X_SENDFILE', 'false').lower() == 'true'
 
     # Konfigurasi untuk email
     # MAIL_SERVER = 'smtp.gmail.com'
@@ -22,7 +22,7 @@ class Class(db.Model):
     academic_year = db.Column(db.String(9), nullable=False)  # Format: '2024/2025'
 
     students = db.relationship('Student', back_populates='class_')
-    class_lecturers = db.relationship('ClassLecturer', back_populates='class_')
+    class_lecturers = db.relationship('ClassLecturer', back_populates='class_', passive_deletes=True)
 
 
 # 3. Tabel Students
@@ -32,11 +32,11 @@ class Student(db.Model):
     # nin = db.Column(db.String(50), unique=True, nullable=False)
     name = db.Column(db.String(100), nullable=False)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), unique=True)
-    class_id = db.Column(db.Integer, db.ForeignKey('classes.id'))
+    class_id = db.Column(db.Integer, db.ForeignKey('classes.id'), index=True)
 
     user = db.relationship('User', back_populates='student')
     class_ = db.relationship('Class', back_populates='students')
-    evaluations = db.relationship('Evaluation', back_populates='student')
+    evaluations = db.relationship('Evaluation', back_populates='student', passive_deletes=True)
 
 
 # 4. Tabel Lecturers
@@ -47,8 +47,8 @@ class Lecturer(db.Model):
     photo_url = db.Column(db.String(255), nullable=True)
     # nidn = db.Column(db.String(50), unique=True, nullable=False)
 
-    class_lecturers = db.relationship('ClassLecturer', back_populates='lecturer')
-    evaluations = db.relationship('Evaluation', back_populates='lecturer')
+    class_lecturers = db.relationship('ClassLecturer', back_populates='lecturer', passive_deletes=True)
+    evaluations = db.relationship('Evaluation', back_populates='lecturer', passive_deletes=True)
 
 
 # 5. Tabel Courses (Mata Kuliah)
@@ -59,19 +59,26 @@ class Course(db.Model):
     name = db.Column(db.String(100), nullable=False)
     description = db.Column(db.Text, nullable=True)
     
-    teaching_assignments = db.relationship('ClassLecturer', back_populates='course')
+    teaching_assignments = db.relationship('ClassLecturer', back_populates='course', passive_deletes=True)
 
 
 # 6. Tabel ClassLecturers (Teaching assignments: Class ↔ Lecturer ↔ Course ↔ Semester)
 class ClassLecturer(db.Model):
     __tablename__ = 'class_lecturers'
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
-    class_id = db.Column(db.Integer, db.ForeignKey('classes.id'))
-    lecturer_id = db.Column(db.Integer, db.ForeignKey('lecturers.nidn'))
-    course_id = db.Column(db.Integer, db.ForeignKey('courses.id'))
+    class_id = db.Column(db.Integer, db.ForeignKey('classes.id', ondelete='CASCADE'))
+    lecturer_id = db.Column(db.Integer, db.ForeignKey('lecturers.nidn', ondelete='CASCADE'))
+    course_id = db.Column(db.Integer, db.ForeignKey('courses.id', ondelete='CASCADE'))
     semester = db.Column(db.Integer, nullable=False)  # 1, 2, 3, etc.
     academic_year = db.Column(db.String(9), nullable=False)  # Format: '2024/2025'
 
+    __table_args__ = (
+        # /api/my-lecturers: filter per kelas, join ke dosen
+        db.Index('ix_class_lecturers_class_lecturer', 'class_id', 'lecturer_id'),
+        # Penugasan per dosen (daftar dan penghapusan dosen)
+        db.Index('ix_class_lecturers_lecturer_id', 'lecturer_id'),
+    )
+
     class_ = db.relationship('Class', back_populates='class_lecturers')
     lecturer = db.relationship('Lecturer', back_populates='class_lecturers')
     course = db.relationship('Course', back_populates='teaching_assignments')
@@ -100,31 +107,48 @@ class Answer(db.Model):
 class Evaluation(db.Model):
     __tablename__ = 'evaluations'
     id = db.Column(db.Integer, primary_key=True,autoincrement=True)
-    student_id = db.Column(db.Integer, db.ForeignKey('students.nim'))
-    lecturer_id = db.Column(db.Integer, db.ForeignKey('lecturers.nidn'))
-    class_id = db.Column(db.Integer, db.ForeignKey('classes.id'))
-    course_id = db.Column(db.Integer, db.ForeignKey('courses.id'), nullable=True)
+    student_id = db.Column(db.Integer, db.ForeignKey('students.nim', ondelete='CASCADE'))
+    lecturer_id = db.Column(db.Integer, db.ForeignKey('lecturers.nidn', ondelete='CASCADE'))
+    class_id = db.Column(db.Integer, db.ForeignKey('classes.id', ondelete='CASCADE'))
+    course_id = db.Column(db.Integer, db.ForeignKey('courses.id', ondelete='CASCADE'), nullable=True)
     semester = db.Column(db.Integer, nullable=True)
     created_at = db.Column(db.DateTime, server_default=db.func.now())
     updated_at = db.Column(db.DateTime, nullable=True)
     score = db.Column(db.Float, nullable=True)  # Overall score for the evaluation
     comment = db.Column(db.Text, nullable=True)  # Student's comment
     
-    lecturer_class_id = db.Column(db.Integer, db.ForeignKey('class_lecturers.id'))
+    lecturer_class_id = db.Column(db.Integer, db.ForeignKey('class_lecturers.id', ondelete='CASCADE'), index=True)
+    # Kunci submission dari antrean write-behind (utils/submission_queue.py); replay tidak menggandakan
+    submission_key = db.Column(db.String(64), unique=True, nullable=True)
+
+    __table_args__ = (
+        # Riwayat evaluasi mahasiswa: WHERE student_id = ? ORDER BY created_at DESC
+        db.Index('ix_evaluations_student_created', 'student_id', 'created_at'),
+        # Skor per dosen (update_lecturer_score, retract/rebuild agregat) dan rentang tanggal per dosen
+        db.Index('ix_evaluations_lecturer_created', 'lecturer_id', 'created_at', postgresql_include=['score']),
+        # Filter rentang tanggal lintas dosen (export leaderboard admin)
+        db.Index('ix_evaluations_created_at', 'created_at'),
+    )
+
     student = db.relationship('Student', back_populates='evaluations')
     lecturer = db.relationship('Lecturer', back_populates='evaluations')
-    course = db.relationship('Course', backref='evaluations')
-    evaluation_answers = db.relationship('EvaluationAnswer', back_populates='evaluation')
+    course = db.relationship('Course', backref=db.backref('evaluations', passive_deletes=True))
+    evaluation_answers = db.relationship('EvaluationAnswer', back_populates='evaluation', passive_deletes=True)
 
 
 # 10. Tabel EvaluationAnswers (jawaban untuk setiap pertanyaan dalam 1 penilaian)
 class EvaluationAnswer(db.Model):
     __tablename__ = 'evaluation_answers'
     id = db.Column(db.Integer, primary_key=True,autoincrement=True)
-    evaluation_id = db.Column(db.Integer, db.ForeignKey('evaluations.id'))
+    evaluation_id = db.Column(db.Integer, db.ForeignKey('evaluations.id', ondelete='CASCADE'))
     question_id = db.Column(db.Integer, db.ForeignKey('questions.id'))
     answer_id = db.Column(db.Integer, db.ForeignKey('answers.id'))
 
+    __table_args__ = (
+        # Jawaban per evaluasi; answer_id ikut di index untuk join ke answers tanpa baca tabel
+        db.Index('ix_evaluation_answers_evaluation_answer', 'evaluation_id', 'answer_id'),
+    )
+
     evaluation = db.relationship('Evaluation', back_populates='evaluation_answers')
     question = db.relationship('Question', back_populates='evaluation_answers')
     answer = db.relationship('Answer', back_populates='evaluation_answers')
@@ -133,64 +157,115 @@ class EvaluationAnswer(db.Model):
 # 11. Tabel Optional: Lecturer Score (caching skor rata-rata)
 class LecturerScore(db.Model):
     __tablename__ = 'lecturer_scores'
-    lecturer_id = db.Column(db.Integer, db.ForeignKey('lecturers.nidn'), primary_key=True)
+    lecturer_id = db.Column(db.Integer, db.ForeignKey('lecturers.nidn', ondelete='CASCADE'), primary_key=True)
     average_score = db.Column(db.Float)
     score_count = db.Column(db.Integer)
+    score_sum = db.Column(db.Float, nullable=False, default=0, server_default='0')  # Sum of Evaluation.score, kept incrementally
+    # Bayesian average (v*R + m*C) / (v + m) dengan C dan m dari bayesian_prior (utils/weighted_scores.py)
+    weighted_score = db.Column(db.Float, nullable=False, default=0, server_default='0')
     updated_at = db.Column(db.DateTime, server_default=db.func.now(), onupdate=db.func.now())
 
+    __table_args__ = (
+        # Leaderboard berdasarkan weighted score: ORDER BY weighted_score DESC, lecturer_id DESC LIMIT ?
+        db.Index('ix_lecturer_scores_weighted_score', 'weighted_score', 'lecturer_id',
+                 postgresql_include=['average_score', 'score_count']),
+    )
+
+
+# 12. Tabel LecturerDailyScore (rollup skor per dosen per hari untuk leaderboard per periode)
+class LecturerDailyScore(db.Model):
+    __tablename__ = 'lecturer_daily_scores'
+    lecturer_id = db.Column(db.Integer, db.ForeignKey('lecturers.nidn', ondelete='CASCADE'), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)  # Tanggal Evaluation.created_at
+    score_sum = db.Column(db.Float, nullable=False, default=0)
+    score_count = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        # Leaderboard per periode: WHERE day >= ? GROUP BY lecturer_id (index-only scan)
+        db.Index('ix_lecturer_daily_scores_day', 'day', 'lecturer_id',
+                 postgresql_include=['score_sum', 'score_count']),
+    )
+
+
+# 13. Tabel LeaderboardRank (leaderboard keseluruhan yang dimaterialisasi, lihat utils/leaderboard.py)
+class LeaderboardRank(db.Model):
+    __tablename__ = 'leaderboard_ranks'
+    lecturer_id = db.Column(db.Integer, db.ForeignKey('lecturers.nidn', ondelete='CASCADE'), primary_key=True)
+    rank = db.Column(db.Integer, nullable=False)  # Dense rank: skor sama -> peringkat sama
+    average_score = db.Column(db.Float, nullable=False)
+    score_count = db.Column(db.Integer, nullable=False)
+    refreshed_at = db.Column(db.DateTime, nullable=False)
+
+    __table_args__ = (
+        # Top-N dan halaman peringkat: WHERE rank >= ? ORDER BY rank, lecturer_id LIMIT ?
+        db.Index('ix_leaderboard_ranks_rank', 'rank', 'lecturer_id',
+                 postgresql_include=['average_score', 'score_count']),
+    )
+
+
+# 14. Tabel BayesianPrior (satu baris: C dan m yang dipakai weighted_score saat ini)
+class BayesianPrior(db.Model):
+    __tablename__ = 'bayesian_prior'
+    id = db.Column(db.Integer, primary_key=True)  # Selalu 1
+    global_average = db.Column(db.Float, nullable=False)  # C: rata-rata skor semua evaluasi
+    mean_voters = db.Column(db.Float, nullable=False)  # m: rata-rata jumlah penilai per dosen
+    refreshed_at = db.Column(db.DateTime, nullable=False)
+
 
 # Function to update lecturer's average score
 def update_lecturer_score(lecturer_id):
     """
     Calculate and update the average score for a lecturer based on all evaluations.
-    This function is called after an evaluation is submitted or updated.
+    Answer points and voter count come from a single aggregate query; the
+    Bayesian inputs C and m are read from the stored prior (bayesian_prior)
+    instead of full-table aggregates over evaluations.
     
     Args:
         lecturer_id: The ID of the lecturer to update the score for
     """
-    from sqlalchemy import func
+    from sqlalchemy import func, select, distinct
+    from sqlalchemy.orm import aliased
+    from utils.weighted_scores import prior_columns
     
     try:
-        # Get all evaluations for this lecturer
-        evaluations = Evaluation.query.filter_by(lecturer_id=lecturer_id).all()
+        lecturer_evals = aliased(Evaluation)
+        global_average, mean_voters = prior_columns()
+        
+        stats = db.session.execute(
+            select(
+                func.count(distinct(Evaluation.id)).label('voter_count'),
+                func.coalesce(func.sum(Answer.points), 0).label('total_points'),
+                func.count(Answer.id).label('answer_count'),
+                # Max points per question (usually 20)
+                select(func.max(Answer.points)).scalar_subquery().label('max_points'),
+                # Sum of evaluation scores, kept in lecturer_scores.score_sum
+                select(func.coalesce(func.sum(lecturer_evals.score), 0))
+                    .where(lecturer_evals.lecturer_id == lecturer_id)
+                    .scalar_subquery().label('score_sum'),
+                # Global average (C) and average number of voters per lecturer (m)
+                global_average.label('global_avg'),
+                mean_voters.label('mean_voters')
+            ).select_from(Evaluation)
+            .outerjoin(EvaluationAnswer, EvaluationAnswer.evaluation_id == Evaluation.id)
+            .outerjoin(Answer, Answer.id == EvaluationAnswer.answer_id)
+            .where(Evaluation.lecturer_id == lecturer_id)
+        ).one()
         
-        if not evaluations:
+        count = stats.voter_count
+        if not count:
             print(f"No evaluations found for lecturer {lecturer_id}")
             # If there are no evaluations, set average to 0 but keep existing voter count
             lecturer_score = LecturerScore.query.get(lecturer_id)
             if lecturer_score:
                 lecturer_score.average_score = 0
+                lecturer_score.score_sum = 0
                 db.session.commit()
                 print(f"Reset score to 0 for lecturer {lecturer_id}, keeping voter count at {lecturer_score.score_count}")
             return True
         
-        # Calculate total points and total possible points directly from evaluation answers
-        total_points = 0
-        total_possible_points = 0
-        count = len(evaluations)
-        
-        # Get max points per question (usually 5)
-        max_point_answer = Answer.query.order_by(Answer.points.desc()).first()
-        max_points_per_question = max_point_answer.points if max_point_answer else 5.0
-        
-        # Process all evaluation answers to calculate the total score
-        for eval in evaluations:
-            # Get all answers for this evaluation
-            eval_answers = EvaluationAnswer.query.filter_by(evaluation_id=eval.id).all()
-            
-            # Calculate points for this evaluation
-            eval_points = 0
-            answer_count = 0
-            
-            for ea in eval_answers:
-                answer = Answer.query.get(ea.answer_id)
-                if answer:
-                    eval_points += answer.points
-                    answer_count += 1
-            
-            # Add to totals
-            total_points += eval_points
-            total_possible_points += (answer_count * max_points_per_question)
+        max_points_per_question = stats.max_points if stats.max_points else 5.0
+        total_points = stats.total_points
+        total_possible_points = stats.answer_count * max_points_per_question
         
         # Calculate overall average
         if total_possible_points > 0:
@@ -203,25 +278,10 @@ def update_lecturer_score(lecturer_id):
         print(f"Calculated average for lecturer {lecturer_id}: {average:.2f}% from {count} evaluations")
         print(f"Total points: {total_points}, Total possible: {total_possible_points}")
         
-        # Calculate Bayesian Average
-        # First, get global average (C) from all evaluations
-        global_avg_query = db.session.query(func.avg(Evaluation.score)).scalar()
-        C = global_avg_query if global_avg_query is not None else 0
-        
-        # Get average number of voters per lecturer (m)
-        lecturer_counts = db.session.query(
-            Evaluation.lecturer_id,
-            func.count(Evaluation.id).label('voter_count')
-        ).group_by(Evaluation.lecturer_id).all()
-        
-        total_lecturers_with_evals = len(lecturer_counts)
-        if total_lecturers_with_evals > 0:
-            m = sum(count[1] for count in lecturer_counts) / total_lecturers_with_evals
-        else:
-            m = 0
-        
         # Calculate weighted score using Bayesian Average formula
         # weighted_score = (v / (v + m)) * R + (m / (v + m)) * C
+        C = stats.global_avg if stats.global_avg is not None else 0
+        m = float(stats.mean_voters) if stats.mean_voters is not None else 0
         v = count  # Number of voters for this lecturer
         R = average  # Average score for this lecturer
         
@@ -230,32 +290,20 @@ def update_lecturer_score(lecturer_id):
         else:
             weighted_score = 0
         
-        # print(f"Calculated Bayesian Average for lecturer {lecturer_id}: {weighted_score:.2f}")
-        # print(f"v={v}, m={m}, R={R:.2f}, C={C:.2f}")
-        
         # Update or create lecturer score record
         lecturer_score = LecturerScore.query.get(lecturer_id)
-        if lecturer_score:
-            # Update existing record
-            lecturer_score.average_score = average
-            lecturer_score.score_count = count
-            lecturer_score.weighted_score = weighted_score
-            # print(f"Updated score for lecturer {lecturer_id} to {average:.2f}%, weighted score: {weighted_score:.2f}, voter count: {count}")
-        else:
-            # Create new record
-            lecturer_score = LecturerScore(
-                lecturer_id=lecturer_id,
-                average_score=average,
-                score_count=count,
-                weighted_score=weighted_score
-            )
+        if not lecturer_score:
+            lecturer_score = LecturerScore(lecturer_id=lecturer_id)
             db.session.add(lecturer_score)
             print(f"Created new score record for lecturer {lecturer_id} with score {average:.2f}%, weighted score: {weighted_score:.2f}, voter count: {count}")
+        lecturer_score.average_score = average
+        lecturer_score.score_count = count
+        lecturer_score.score_sum = stats.score_sum
+        lecturer_score.weighted_score = weighted_score
         
         db.session.commit()
-        # print(f"Successfully updated leaderboard for lecturer {lecturer_id}: {average:.2f}% from {count} evaluations, weighted score: {weighted_score:.2f}")
         return True
     except Exception as e:
         db.session.rollback()
         # print(f"Error updating lecturer score: {str(e)}")
-        return False
\ No newline at end of file
+        return False
@@ -1,23 +1,26 @@
-from flask import Blueprint, request, jsonify, send_file
+from flask import Blueprint, request, jsonify, Response, stream_with_context
 from App.models import db, User, Student, Class, Lecturer, LecturerScore, Evaluation, EvaluationAnswer
 from utils.auth import admin_required, generate_password_hash
+from utils.scores import period_score_subquery
+from utils.data_version import bump_data_version
+from utils.principal import invalidate_principal
+from utils.student_import import import_students, ImportFileError
+from utils.photos import allowed_photo, save_lecturer_photo, delete_lecturer_photo
+from utils.db_routing import read_replica
+from utils.deletion import delete_lecturer as delete_lecturer_cascade, delete_student_evaluations
+from utils.xlsx_stream import stream_xlsx, MIME_TYPE as XLSX_MIME_TYPE
+from utils.evaluation_export import (export_statement, export_chunks, stream_parquet, stream_csv_gzip,
+                                    parquet_available, FORMATS as EXPORT_FORMATS,
+                                    MIME_TYPES as EXPORT_MIME_TYPES, EXTENSIONS as EXPORT_EXTENSIONS)
 import os
-from werkzeug.utils import secure_filename
-import uuid
 from flask_jwt_extended import jwt_required, get_jwt_identity
-import pandas as pd
 from datetime import datetime, timedelta
-import tempfile
 from sqlalchemy import desc, func, asc
 
 student_bp = Blueprint('student_bp', __name__)
 admin_bp = Blueprint('admin_bp', __name__)
 class_bp = Blueprint('class_bp', __name__)
 
-# Configure upload folder
-UPLOAD_FOLDER = 'uploads/lecturers'
-ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
-
 # Get all classes for dropdown
 @student_bp.route('/admin/classes-dropdown', methods=['GET'])
 @admin_required
@@ -36,8 +39,21 @@ def get_classes_dropdown(current_user):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-def allowed_file(filename):
-    return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+def photo_in_use(photo_url, exclude_nidn=None):
+    # Upload yang identik berbagi file yang sama (nama dari hash isi)
+    query = Lecturer.query.filter(Lecturer.photo_url == photo_url)
+    if exclude_nidn is not None:
+        query = query.filter(Lecturer.nidn != exclude_nidn)
+    return db.session.query(query.exists()).scalar()
+
+def discard_unused_photo(photo_url):
+    # Dipanggil setelah rollback: varian yang baru ditulis tapi tidak tersimpan di DB dihapus lagi
+    if not photo_url:
+        return
+    try:
+        delete_lecturer_photo(photo_url, still_used=photo_in_use(photo_url))
+    except Exception as e:
+        print(f"Error saat membersihkan foto dosen {photo_url}: {e}")
 
 # CREATE student
 @student_bp.route('/admin/students', methods=['POST'])
@@ -84,22 +100,86 @@ def create_student(current_user):
         db.session.rollback()
         return jsonify({'error': str(e)}), 400
 
-# READ all students
+# BULK IMPORT students (CSV / XLSX)
+@student_bp.route('/admin/students/import', methods=['POST'])
+@admin_required
+def import_students_file(current_user):
+    file = request.files.get('file')
+    if not file or not file.filename:
+        return jsonify({'error': 'No file uploaded'}), 400
+
+    try:
+        report = import_students(file)
+    except ImportFileError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
+
+    report['message'] = f"{report['created']} of {report['total']} students imported"
+    return jsonify(report), 200
+
+# READ students (keyset pagination on nim)
+STUDENTS_PAGE_SIZE = 50
+MAX_STUDENTS_PAGE_SIZE = 500
+
 @student_bp.route('/admin/students', methods=['GET'])
 @admin_required
+@read_replica
 def get_students(current_user):
-    students = Student.query.all()
-    result = []
-    for s in students:
-        result.append({
+    """
+    Query params (all optional):
+        limit     - page size (default 50, max 500)
+        cursor    - next_cursor of the previous page (last nim returned)
+        class_id  - only students of this class
+        semester  - only students whose class is in this semester
+        name      - name prefix (case-insensitive)
+    """
+    try:
+        limit = min(max(int(request.args.get('limit', STUDENTS_PAGE_SIZE)), 1), MAX_STUDENTS_PAGE_SIZE)
+        cursor = request.args.get('cursor', type=int)
+        class_id = request.args.get('class_id', type=int)
+        semester = request.args.get('semester', type=int)
+    except ValueError:
+        return jsonify({'error': 'Invalid pagination parameter'}), 400
+    name = (request.args.get('name') or '').strip()
+
+    # Satu query join yang hanya memilih kolom yang diserialisasi
+    query = db.session.query(
+        Student.nim,
+        Student.name,
+        Student.class_id,
+        Class.name.label('class_name'),
+        Class.semester,
+        User.email
+    ).outerjoin(Class, Student.class_id == Class.id) \
+     .outerjoin(User, Student.user_id == User.id)
+
+    if cursor is not None:
+        query = query.filter(Student.nim > cursor)
+    if class_id is not None:
+        query = query.filter(Student.class_id == class_id)
+    if semester is not None:
+        query = query.filter(Class.semester == semester)
+    if name:
+        escaped = name.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+        query = query.filter(Student.name.ilike(escaped + '%', escape='\\'))
+
+    # Ambil satu baris ekstra untuk mengetahui apakah masih ada halaman berikutnya
+    rows = query.order_by(Student.nim).limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    return jsonify({
+        'students': [{
             'nim': s.nim,
             'name': s.name,
-            'class': s.class_.name if s.class_ else None,
+            'class': s.class_name,
             'class_id': s.class_id,
-            'semester': s.class_.semester if s.class_ else None,
-            'email': s.user.email if s.user else None
-        })
-    return jsonify(result)
+            'semester': s.semester,
+            'email': s.email
+        } for s in rows],
+        'next_cursor': rows[-1].nim if has_more else None,
+        'limit': limit
+    })
 
 # READ single student
 @student_bp.route('/admin/students/<int:nim>', methods=['GET'])
@@ -147,6 +227,8 @@ def update_student(current_user, nim):
             student.user.password = generate_password_hash(data['password'])
 
         db.session.commit()
+        # Buang principal yang di-cache supaya kelas/email baru langsung berlaku
+        invalidate_principal(user_id=student.user_id, nim=nim)
         
         # Get the class information
         class_info = Class.query.get(student.class_id)
@@ -178,16 +260,20 @@ def delete_student(current_user, nim):
 
     try:
         user = student.user
+        user_id = user.id if user else None
         student_data = {
             'nim': student.nim,
             'name': student.name,
             'email': user.email if user else None
         }
         
+        # Evaluasi mahasiswa ikut dihapus; skor dosen yang dinilai dihitung ulang
+        delete_student_evaluations(nim)
         db.session.delete(student)
         if user:
             db.session.delete(user)
         db.session.commit()
+        invalidate_principal(user_id=user_id, nim=nim)
         
         return jsonify({
             'message': 'Student deleted successfully',
@@ -201,6 +287,7 @@ def delete_student(current_user, nim):
 @student_bp.route('/admin/lecturers', methods=['POST'])
 @admin_required
 def create_lecturer(current_user):
+    photo_url = None
     try:
         data = request.form
         photo = request.files.get('photo')
@@ -211,16 +298,12 @@ def create_lecturer(current_user):
             name=data['name']
         )
 
-        # Handle photo upload
-        if photo and allowed_file(photo.filename):
-            filename = secure_filename(f"{uuid.uuid4()}_{photo.filename}")
-            if not os.path.exists(UPLOAD_FOLDER):
-                os.makedirs(UPLOAD_FOLDER)
-            photo_path = os.path.join(UPLOAD_FOLDER, filename)
-            photo.save(photo_path)
-            new_lecturer.photo_url = f"/uploads/lecturers/{filename}"
+        # Handle photo upload: varian thumbnail dengan nama dari hash isi file
+        if photo and allowed_photo(photo.filename):
+            photo_url = new_lecturer.photo_url = save_lecturer_photo(photo)
 
         db.session.add(new_lecturer)
+        db.session.add(LecturerScore(lecturer_id=new_lecturer.nidn, score_sum=0, score_count=0, average_score=0))
         db.session.commit()
 
         return jsonify({
@@ -233,6 +316,7 @@ def create_lecturer(current_user):
         }), 201
     except Exception as e:
         db.session.rollback()
+        discard_unused_photo(photo_url)
         return jsonify({'error': str(e)}), 400
 
 # READ all lecturers
@@ -276,6 +360,7 @@ def update_lecturer(current_user, nidn):
     if not lecturer:
         return jsonify({'message': 'Lecturer not found'}), 404
 
+    new_photo_url = None
     try:
         data = request.form
         photo = request.files.get('photo')
@@ -283,21 +368,18 @@ def update_lecturer(current_user, nidn):
         lecturer.name = data.get('name', lecturer.name)
 
         # Handle photo upload
-        if photo and allowed_file(photo.filename):
-            # Delete old photo if exists
-            if lecturer.photo_url:
-                old_photo_path = os.path.join('uploads', lecturer.photo_url.lstrip('/'))
-                if os.path.exists(old_photo_path):
-                    os.remove(old_photo_path)
-
-            filename = secure_filename(f"{uuid.uuid4()}_{photo.filename}")
-            if not os.path.exists(UPLOAD_FOLDER):
-                os.makedirs(UPLOAD_FOLDER)
-            photo_path = os.path.join(UPLOAD_FOLDER, filename)
-            photo.save(photo_path)
-            lecturer.photo_url = f"/uploads/lecturers/{filename}"
+        old_photo_url = None
+        if photo and allowed_photo(photo.filename):
+            new_photo_url = save_lecturer_photo(photo)
+            if new_photo_url != lecturer.photo_url:
+                old_photo_url = lecturer.photo_url
+                lecturer.photo_url = new_photo_url
 
         db.session.commit()
+
+        # Delete old photo if exists (setelah commit, dan hanya bila tidak dipakai dosen lain)
+        if old_photo_url:
+            delete_lecturer_photo(old_photo_url, still_used=photo_in_use(old_photo_url))
         
         return jsonify({
             'message': 'Lecturer updated successfully',
@@ -309,6 +391,7 @@ def update_lecturer(current_user, nidn):
         })
     except Exception as e:
         db.session.rollback()
+        discard_unused_photo(new_photo_url)
         return jsonify({'error': str(e)}), 400
 
 # DELETE lecturer
@@ -330,121 +413,30 @@ def delete_lecturer(current_user, nidn):
             'name': lecturer.name,
             'photo_url': lecturer.photo_url
         }
-        
-        # Gunakan pendekatan yang sama persis dengan script SQL yang berhasil
-        # Jalankan SQL dalam satu transaksi
-        
-        # Langkah 1: Hapus jawaban evaluasi terkait dosen
-        print("Langkah 1: Hapus jawaban evaluasi terkait dosen")
-        db.session.execute("""
-            DELETE FROM evaluation_answers 
-            WHERE evaluation_id IN (
-                SELECT id FROM evaluations WHERE lecturer_id = :nidn
-            )
-        """, {"nidn": nidn})
-        db.session.flush()
-        
-        # Langkah 2: Hapus evaluasi terkait dosen
-        print("Langkah 2: Hapus evaluasi terkait dosen")
-        db.session.execute("""
-            DELETE FROM evaluations 
-            WHERE lecturer_id = :nidn
-        """, {"nidn": nidn})
-        db.session.flush()
-        
-        # Langkah 3: Hapus skor dosen
-        print("Langkah 3: Hapus skor dosen")
-        db.session.execute("""
-            DELETE FROM lecturer_scores 
-            WHERE lecturer_id = :nidn
-        """, {"nidn": nidn})
-        db.session.flush()
-        
-        # Langkah 4: Hapus penugasan mengajar
-        print("Langkah 4: Hapus penugasan mengajar")
-        db.session.execute("""
-            DELETE FROM class_lecturers 
-            WHERE lecturer_id = :nidn
-        """, {"nidn": nidn})
-        db.session.flush()
-        
-        # Langkah 5: Hapus foto dosen jika ada
-        if lecturer.photo_url:
-            try:
-                photo_path = os.path.join('uploads', lecturer.photo_url.lstrip('/'))
-                if os.path.exists(photo_path):
-                    os.remove(photo_path)
-                    print(f"Berhasil menghapus foto dosen: {photo_path}")
-            except Exception as e_photo:
-                print(f"Error saat menghapus foto dosen: {str(e_photo)}")
-                # Lanjutkan meskipun gagal menghapus foto
-        
-        # Langkah 6: Akhirnya hapus dosen
-        print("Langkah 6: Hapus dosen")
-        db.session.execute("""
-            DELETE FROM lecturers 
-            WHERE nidn = :nidn
-        """, {"nidn": nidn})
-        
-        # Commit semua perubahan
+
+        # Penugasan, evaluasi + jawaban, skor dan peringkat dosen ikut terhapus (utils/deletion.py)
+        counts = delete_lecturer_cascade(nidn)
+        print(f"Menghapus {counts['evaluations']} evaluasi dan {counts['teaching_assignments']} penugasan")
         db.session.commit()
+        bump_data_version('lecturers', 'evaluations')
+
+        # Foto dihapus setelah commit: kalau penghapusan gagal, fotonya masih dipakai
+        if lecturer_data['photo_url']:
+            delete_lecturer_photo(lecturer_data['photo_url'],
+                                  still_used=photo_in_use(lecturer_data['photo_url'], exclude_nidn=nidn))
         print(f"===== BERHASIL MENGHAPUS DOSEN NIDN: {nidn} =====")
-        
+
         return jsonify({
             'message': 'Dosen berhasil dihapus',
             'deleted_lecturer': lecturer_data
         })
     except Exception as e:
         db.session.rollback()
-        # Tampilkan pesan error yang lebih detail untuk debugging
-        error_message = str(e)
-        error_type = type(e).__name__
-        import traceback
-        traceback_str = traceback.format_exc()
         print(f"===== ERROR SAAT MENGHAPUS DOSEN NIDN: {nidn} =====")
-        print(f"Tipe error: {error_type}")
-        print(f"Pesan error: {error_message}")
-        print(f"Traceback: {traceback_str}")
-        
-        # Coba pendekatan alternatif dengan menggunakan connection langsung
-        try:
-            print("Mencoba pendekatan alternatif dengan connection langsung...")
-            # Dapatkan connection langsung ke database
-            connection = db.engine.raw_connection()
-            cursor = connection.cursor()
-            
-            # Matikan foreign key constraints sementara
-            cursor.execute("SET CONSTRAINTS ALL DEFERRED")
-            
-            # Jalankan query penghapusan dalam urutan yang sama
-            cursor.execute("""
-                DELETE FROM evaluation_answers 
-                WHERE evaluation_id IN (
-                    SELECT id FROM evaluations WHERE lecturer_id = %s
-                )
-            """, (nidn,))
-            
-            cursor.execute("DELETE FROM evaluations WHERE lecturer_id = %s", (nidn,))
-            cursor.execute("DELETE FROM lecturer_scores WHERE lecturer_id = %s", (nidn,))
-            cursor.execute("DELETE FROM class_lecturers WHERE lecturer_id = %s", (nidn,))
-            cursor.execute("DELETE FROM lecturers WHERE nidn = %s", (nidn,))
-            
-            # Commit perubahan
-            connection.commit()
-            cursor.close()
-            connection.close()
-            
-            print("Berhasil menghapus dosen dengan pendekatan alternatif")
-            
-            return jsonify({
-                'message': 'Dosen berhasil dihapus',
-                'deleted_lecturer': lecturer_data
-            })
-        except Exception as e_alt:
-            print(f"Pendekatan alternatif juga gagal: {str(e_alt)}")
-            return jsonify({
-                'error': f"Gagal menghapus dosen: {error_message}"
-            }), 400
+        print(f"Pesan error: {str(e)}")
+        return jsonify({
+            'error': f"Gagal menghapus dosen: {str(e)}"
+        }), 400
 
 
 # Export leaderboard as XLSX
@@ -477,62 +469,83 @@ def export_leaderboard(current_user):
     else:
         filter_name = "All Time"
     
-    # Build the query
-    query = db.session.query(
-        Lecturer.nidn,
-        Lecturer.name,
-        func.count(Evaluation.id).label('evaluation_count'),
-        func.avg(Evaluation.score).label('average_score')
-    ).outerjoin(
-        Evaluation, Lecturer.nidn == Evaluation.lecturer_id
-    ).group_by(
-        Lecturer.nidn, Lecturer.name
-    )
-    
-    # Apply date filter if specified
+    # Build the query: period totals come from the daily rollup, all-time from lecturer_scores
     if start_date:
-        query = query.filter(Evaluation.created_at >= start_date)
-    
-    # Order by average score
-    lecturers_data = query.order_by(desc('average_score')).all()
-    
-    # Convert to DataFrame
-    data = []
-    for i, lecturer in enumerate(lecturers_data, 1):
-        data.append({
-            'Rank': i,
-            'NIDN': lecturer.nidn,
-            'Name': lecturer.name,
-            'Evaluation Count': lecturer.evaluation_count,
-            'Average Score': round(lecturer.average_score, 2) if lecturer.average_score else 0
-        })
-    
-    df = pd.DataFrame(data)
-    
-    # Create a temporary file
-    temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.xlsx')
-    temp_file.close()
+        score_subquery = period_score_subquery(start_date.date())
+        query = db.session.query(
+            Lecturer.nidn,
+            Lecturer.name,
+            score_subquery.c.score_count.label('evaluation_count'),
+            score_subquery.c.average_score.label('average_score')
+        ).join(score_subquery, Lecturer.nidn == score_subquery.c.lecturer_id)
+        order = score_subquery.c.average_score.desc()
+    else:
+        query = db.session.query(
+            Lecturer.nidn,
+            Lecturer.name,
+            func.coalesce(LecturerScore.score_count, 0).label('evaluation_count'),
+            LecturerScore.average_score.label('average_score')
+        ).outerjoin(LecturerScore, Lecturer.nidn == LecturerScore.lecturer_id)
+        order = LecturerScore.average_score.desc().nullslast()
     
-    # Write to Excel
-    writer = pd.ExcelWriter(temp_file.name, engine='openpyxl')
-    df.to_excel(writer, sheet_name=f'Leaderboard {filter_name}', index=False)
+    # Order by average score; rows are fetched through a server-side cursor
+    lecturers_data = query.order_by(order).yield_per(1000)
     
-    # Adjust column widths
-    worksheet = writer.sheets[f'Leaderboard {filter_name}']
-    for i, col in enumerate(df.columns):
-        max_length = max(df[col].astype(str).map(len).max(), len(col)) + 2
-        worksheet.column_dimensions[chr(65 + i)].width = max_length
+    def rows():
+        for i, lecturer in enumerate(lecturers_data, 1):
+            yield (
+                i,
+                lecturer.nidn,
+                lecturer.name,
+                lecturer.evaluation_count,
+                round(lecturer.average_score, 2) if lecturer.average_score else 0
+            )
     
-    writer.close()
+    # Column widths have to be written before the rows, so size the name column from the table
+    headers = ['Rank', 'NIDN', 'Name', 'Evaluation Count', 'Average Score']
+    name_length = db.session.query(func.max(func.length(Lecturer.name))).scalar() or 0
+    widths = [10, 14, max(name_length, len('Name')) + 2, 18, 15]
     
     # Generate filename for download
     timestamp = now.strftime('%Y%m%d_%H%M%S')
     filename = f"leaderboard_{time_filter}_{timestamp}.xlsx"
     
-    # Send the file
-    return send_file(
-        temp_file.name,
-        as_attachment=True,
-        download_name=filename,
-        mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    # Stream the workbook as a chunked response; nothing is written to disk
+    return Response(
+        stream_with_context(stream_xlsx(f'Leaderboard {filter_name}', headers, rows(), widths)),
+        mimetype=XLSX_MIME_TYPE,
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+    )
+
+
+# Export raw evaluation answers for analysis (Parquet or gzip CSV), streamed in chunks
+@admin_bp.route('/admin/export-evaluations', methods=['GET'])
+@admin_required
+@read_replica
+def export_evaluations(current_user):
+    export_format = request.args.get('format', 'parquet').lower()
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({'error': f"format must be one of: {', '.join(EXPORT_FORMATS)}"}), 400
+    if export_format == 'parquet' and not parquet_available():
+        return jsonify({'error': 'Parquet export requires pyarrow; use format=csv'}), 501
+
+    filters = {'academic_year': request.args.get('academic_year') or None}
+    for name in ('semester', 'class_id', 'lecturer_id'):
+        value = request.args.get(name)
+        if value:
+            try:
+                filters[name] = int(value)
+            except ValueError:
+                return jsonify({'error': f"{name} must be an integer"}), 400
+
+    # Query dijalankan di sini (masih di dalam @read_replica); baris diambil per chunk saat streaming
+    chunks = export_chunks(export_statement(**filters))
+    stream = stream_parquet(chunks) if export_format == 'parquet' else stream_csv_gzip(chunks)
+
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    filename = f"evaluations_{timestamp}.{EXPORT_EXTENSIONS[export_format]}"
+    return Response(
+        stream_with_context(stream),
+        mimetype=EXPORT_MIME_TYPES[export_format],
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'}
     )
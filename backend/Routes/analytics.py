@@ -0,0 +1,35 @@
+from flask import Blueprint, request, jsonify
+from utils.auth import admin_required
+from utils.answer_distribution import answer_distribution, GROUPINGS
+from utils.data_version import conditional_get
+from utils.query_budget import query_budget
+
+analytics_bp = Blueprint('analytics_bp', __name__)
+
+
+# Distribusi jawaban per pertanyaan untuk setiap dosen / mata kuliah / kelas (matriks dashboard admin)
+@analytics_bp.route('/admin/analytics/answer-distribution', methods=['GET'])
+@query_budget(queries=6, repeats=1)
+@admin_required
+# Tanpa @read_replica: body di-cache dengan ETag dari versi primary (replica bisa tertinggal)
+@conditional_get('evaluations', 'questions', 'lecturers', 'principals', private=True,
+                 query_args=('group_by', 'id'))
+def get_answer_distribution(current_user):
+    group_by = request.args.get('group_by', 'lecturer')
+    if group_by not in GROUPINGS:
+        return jsonify({'error': f"group_by must be one of: {', '.join(GROUPINGS)}"}), 400
+
+    group_id = request.args.get('id')
+    if group_id:
+        try:
+            group_id = int(group_id)
+        except ValueError:
+            return jsonify({'error': 'id must be an integer'}), 400
+    else:
+        group_id = None
+
+    try:
+        return jsonify(answer_distribution(group_by, group_id))
+    except Exception as e:
+        print(f"Error computing answer distribution: {str(e)}")
+        return jsonify({'error': str(e)}), 500
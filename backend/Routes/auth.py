@@ -1,8 +1,9 @@
 from flask import Blueprint, request, jsonify
 from App.models import db, User, Student, Class
 from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
-import  bcrypt
 from utils.auth import  generate_password_hash
+from utils.passwords import check_password
+from utils.principal import load_student_principal, load_user_principal
 # Blueprint untuk auth dengan nama yang benar sesuai registrasi di App/__init__.py
 auth_bp_profile = Blueprint('auth_profile', __name__)
 
@@ -44,7 +45,7 @@ def change_password():
         return jsonify({"message": "User not found"}), 404
     
     # Verify old password
-    if not bcrypt.checkpw(old_password.encode('utf-8'), user.password.encode('utf-8')):
+    if not check_password(user.password, old_password):
         return jsonify({"message": "Incorrect old password"}), 401
     
     # Update password
@@ -88,7 +89,7 @@ def change_password_alt():
         return jsonify({"message": "User not found"}), 404
     
     # Verify old password
-    if not bcrypt.checkpw(old_password.encode('utf-8'), user.password.encode('utf-8')):
+    if not check_password(user.password, old_password):
         return jsonify({"message": "Incorrect old password"}), 401
     
     # Update password
@@ -108,17 +109,17 @@ def get_profile():
     
     # For student users, identity is the NIM
     # For admin users, identity is the user ID
+    # User, student and class come from the cached principal (one joined query on a miss)
     if role == "student":
         # Find student by NIM
-        student = Student.query.filter_by(nim=identity).first()
-        if not student:
+        user = load_student_principal(identity)
+        if not user:
             return jsonify({"message": "Student not found"}), 404
-        user = student.user
     else:
         # Find user by ID
-        user = User.query.get(identity)
+        user = load_user_principal(identity)
     
-    if not user:
+    if not user or user.id is None:
         return jsonify({"message": "User not found"}), 404
     
     # Prepare response data
@@ -131,18 +132,14 @@ def get_profile():
     }
     
     # If user is a student, add student-specific data
-    if user.role == "student":
-        student = Student.query.filter_by(user_id=user.id).first()
-        if student:
-            profile_data["nim"] = student.nim
-            profile_data["name"] = student.name
-            profile_data["class_id"] = student.class_id
-            
-            # Get class name if available
-            if student.class_id:
-                class_obj = Class.query.get(student.class_id)
-                if class_obj:
-                    profile_data["class_name"] = class_obj.name
+    if user.role == "student" and user.is_student:
+        profile_data["nim"] = user.nim
+        profile_data["name"] = user.name
+        profile_data["class_id"] = user.class_id
+        
+        # Get class name if available
+        if user.class_name is not None:
+            profile_data["class_name"] = user.class_name
     
     return jsonify(profile_data)
 
@@ -157,17 +154,17 @@ def get_profile_alt():
     
     # For student users, identity is the NIM
     # For admin users, identity is the user ID
+    # User, student and class come from the cached principal (one joined query on a miss)
     if role == "student":
         # Find student by NIM
-        student = Student.query.filter_by(nim=identity).first()
-        if not student:
+        user = load_student_principal(identity)
+        if not user:
             return jsonify({"message": "Student not found"}), 404
-        user = student.user
     else:
         # Find user by ID
-        user = User.query.get(identity)
+        user = load_user_principal(identity)
     
-    if not user:
+    if not user or user.id is None:
         return jsonify({"message": "User not found"}), 404
     
     # Prepare response data
@@ -180,17 +177,13 @@ def get_profile_alt():
     }
     
     # If user is a student, add student-specific data
-    if user.role == "student":
-        student = Student.query.filter_by(user_id=user.id).first()
-        if student:
-            profile_data["nim"] = student.nim
-            profile_data["name"] = student.name
-            profile_data["class_id"] = student.class_id
-            
-            # Get class name if available
-            if student.class_id:
-                class_obj = Class.query.get(student.class_id)
-                if class_obj:
-                    profile_data["class_name"] = class_obj.name
+    if user.role == "student" and user.is_student:
+        profile_data["nim"] = user.nim
+        profile_data["name"] = user.name
+        profile_data["class_id"] = user.class_id
+        
+        # Get class name if available
+        if user.class_name is not None:
+            profile_data["class_name"] = user.class_name
     
     return jsonify(profile_data)
@@ -1,22 +1,37 @@
 from flask import Blueprint, request, jsonify
-from App.models import db, Class, Lecturer, ClassLecturer
+from App.models import db, Class, Lecturer, ClassLecturer, Course, Student
 from flask_jwt_extended import jwt_required
+from sqlalchemy import func
 from utils.auth import admin_required
+from utils.deletion import delete_class as delete_class_cascade
+from utils.query_budget import query_budget
 
 class_bp = Blueprint('class_bp', __name__)
 
 # GET all classes
 @class_bp.route('/admin/classes', methods=['GET'])
+@query_budget(queries=2, repeats=1)
 @admin_required
 def get_all_classes(current_user):
     try:
-        classes = Class.query.all()
+        # Jumlah mahasiswa per kelas dihitung dalam query yang sama (bukan len(c.students) per kelas)
+        student_counts = db.session.query(
+            Student.class_id,
+            func.count(Student.nim).label('student_count')
+        ).group_by(Student.class_id).subquery()
+        classes = db.session.query(
+            Class.id,
+            Class.name,
+            Class.semester,
+            Class.academic_year,
+            func.coalesce(student_counts.c.student_count, 0).label('student_count')
+        ).outerjoin(student_counts, student_counts.c.class_id == Class.id).all()
         result = [{
             'id': c.id,
             'name': c.name,
             'semester': c.semester,
             'academic_year': c.academic_year,
-            'student_count': len(c.students)
+            'student_count': c.student_count
         } for c in classes]
         
         return jsonify(result)
@@ -25,37 +40,61 @@ def get_all_classes(current_user):
 
 # GET a specific class with its teaching assignments
 @class_bp.route('/admin/classes/<int:class_id>', methods=['GET'])
+@query_budget(queries=3, repeats=1)
 @admin_required
 def get_class(current_user, class_id):
     try:
-        class_obj = Class.query.get(class_id)
+        class_obj = db.session.query(
+            Class.id,
+            Class.name,
+            Class.semester,
+            Class.academic_year,
+            db.session.query(func.count(Student.nim))
+              .filter(Student.class_id == Class.id)
+              .scalar_subquery().label('student_count')
+        ).filter(Class.id == class_id).first()
         if not class_obj:
             return jsonify({'error': 'Class not found'}), 404
             
-        # Get teaching assignments for this class
-        teaching_assignments = []
-        for cl in class_obj.class_lecturers:
-            teaching_assignments.append({
-                'id': cl.id,
-                'lecturer': {
-                    'id': cl.lecturer.nidn,
-                    'name': cl.lecturer.name
-                },
-                'course': {
-                    'id': cl.course.id,
-                    'name': cl.course.name,
-                    'code': cl.course.code
-                },
-                'semester': cl.semester,
-                'academic_year': cl.academic_year
-            })
+        # Get teaching assignments for this class (dosen dan mata kuliah lewat join, bukan lazy load per baris)
+        assignments = db.session.query(
+            ClassLecturer.id,
+            Lecturer.nidn,
+            Lecturer.name.label('lecturer_name'),
+            Course.id.label('course_id'),
+            Course.name.label('course_name'),
+            Course.code.label('course_code'),
+            ClassLecturer.semester,
+            ClassLecturer.academic_year
+        ).join(
+            Lecturer, ClassLecturer.lecturer_id == Lecturer.nidn
+        ).join(
+            Course, ClassLecturer.course_id == Course.id
+        ).filter(
+            ClassLecturer.class_id == class_id
+        ).order_by(ClassLecturer.id).all()
+
+        teaching_assignments = [{
+            'id': cl.id,
+            'lecturer': {
+                'id': cl.nidn,
+                'name': cl.lecturer_name
+            },
+            'course': {
+                'id': cl.course_id,
+                'name': cl.course_name,
+                'code': cl.course_code
+            },
+            'semester': cl.semester,
+            'academic_year': cl.academic_year
+        } for cl in assignments]
             
         result = {
             'id': class_obj.id,
             'name': class_obj.name,
             'semester': class_obj.semester,
             'academic_year': class_obj.academic_year,
-            'student_count': len(class_obj.students),
+            'student_count': class_obj.student_count,
             'teaching_assignments': teaching_assignments
         }
         
@@ -183,11 +222,8 @@ def delete_class(current_user, class_id):
         if class_obj.students:
             return jsonify({'error': 'Cannot delete class with students. Reassign students first.'}), 400
             
-        # Delete all teaching assignments for this class
-        ClassLecturer.query.filter_by(class_id=class_id).delete()
-        
-        # Delete the class
-        db.session.delete(class_obj)
+        # Delete the class with its teaching assignments and evaluations
+        delete_class_cascade(class_id)
         db.session.commit()
         
         return jsonify({
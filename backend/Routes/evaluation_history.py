@@ -1,13 +1,42 @@
 from flask import Blueprint, jsonify, request
 from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
-from App.models import Evaluation, Student, Lecturer, Course, ClassLecturer, Answer, EvaluationAnswer
+from App.models import Evaluation, Lecturer, Course, ClassLecturer, EvaluationAnswer
 from App import db
-from sqlalchemy import desc
+from sqlalchemy import desc, tuple_
+from datetime import datetime
+import base64
+from utils.scores import record_score_delta
+from utils.reference_data import score_answers
+from utils.principal import load_student_principal
+from utils.dates import format_wib
+from utils.db_routing import read_replica
 
 evaluation_history_bp = Blueprint('evaluation_history', __name__)
 
+HISTORY_PAGE_SIZE = 20
+MAX_HISTORY_PAGE_SIZE = 100
+
+
+def encode_history_cursor(row):
+    # Cursor = posisi baris terakhir (created_at, id), dikodekan agar opaque bagi client
+    raw = f"{row.created_at.isoformat()}|{row.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_history_cursor(cursor):
+    """Return (created_at, id) from a cursor, None without cursor; ValueError if malformed."""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        created_at, evaluation_id = raw.rsplit('|', 1)
+        return datetime.fromisoformat(created_at), int(evaluation_id)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f"Invalid cursor: {e}")
+
 @evaluation_history_bp.route('/api/student/evaluation-history', methods=['GET'])
 @jwt_required()
+@read_replica
 def get_student_evaluation_history():
     # Get student identity from JWT
     identity = get_jwt_identity()
@@ -23,8 +52,8 @@ def get_student_evaluation_history():
     except ValueError:
         return jsonify({"message": "Invalid student ID"}), 400
     
-    # Find student by NIM
-    student = Student.query.filter_by(nim=nim).first()
+    # Find student by NIM (cached principal, usually no query)
+    student = load_student_principal(nim)
     if not student:
         return jsonify({"message": "Student not found"}), 404
     
@@ -32,9 +61,22 @@ def get_student_evaluation_history():
     # print(f"Student found: {student.nim}, {student.name}")
     
     try:
-        # Get all evaluations submitted by the student
-        evaluations = db.session.query(
-            Evaluation,
+        limit = min(max(int(request.args.get('limit', HISTORY_PAGE_SIZE)), 1), MAX_HISTORY_PAGE_SIZE)
+        cursor = decode_history_cursor(request.args.get('cursor'))
+    except ValueError:
+        return jsonify({"message": "Invalid pagination parameter"}), 400
+
+    try:
+        # Satu query join; hanya kolom yang diserialisasi, urut created_at terbaru (id sebagai tie-breaker)
+        query = db.session.query(
+            Evaluation.id,
+            Evaluation.lecturer_id,
+            Evaluation.class_id,
+            Evaluation.semester,
+            Evaluation.score,
+            Evaluation.comment,
+            Evaluation.created_at,
+            Evaluation.updated_at,
             Lecturer.name.label('lecturer_name'),
             Course.name.label('course_name'),
             ClassLecturer.semester.label('cl_semester'),
@@ -47,49 +89,43 @@ def get_student_evaluation_history():
             Course, Evaluation.course_id == Course.id
         ).filter(
             Evaluation.student_id == student.nim
-        ).order_by(
-            desc(Evaluation.created_at)
-        ).all()
-        
-        print(f"Found {len(evaluations)} evaluations")
+        )
+        if cursor:
+            query = query.filter(tuple_(Evaluation.created_at, Evaluation.id) < cursor)
+        evaluations = query.order_by(
+            desc(Evaluation.created_at), desc(Evaluation.id)
+        ).limit(limit + 1).all()
+
+        has_more = len(evaluations) > limit
+        evaluations = evaluations[:limit]
+        next_cursor = encode_history_cursor(evaluations[-1]) if has_more else None
         
         # Format the response
         result = []
-        for eval_data in evaluations:
-            eval_obj, lecturer_name, course_name, cl_semester, cl_academic_year = eval_data
-            
-            # Debug info
-            # print(f"Evaluation ID: {eval_obj.id}, Score: {eval_obj.score}, Comment: {eval_obj.comment}")
-            
-            # Get lecturer and course directly from relationships if available
-            lecturer = Lecturer.query.get(eval_obj.lecturer_id) if eval_obj.lecturer_id else None
-            course = Course.query.get(eval_obj.course_id) if eval_obj.course_id else None
-            
-            # Format dates for both raw (ISO) and display formats
-            created_at_raw = eval_obj.created_at.isoformat() if eval_obj.created_at else None
-            updated_at_raw = eval_obj.updated_at.isoformat() if eval_obj.updated_at else None
-            created_at_formatted = eval_obj.created_at.strftime('%d %B %Y pukul %H:%M WIB') if eval_obj.created_at else None
-            updated_at_formatted = eval_obj.updated_at.strftime('%d %B %Y pukul %H:%M WIB') if eval_obj.updated_at else None
+        for e in evaluations:
+            # Format dates for both raw (ISO) and display formats, in WIB
+            created_at_raw, created_at_formatted = format_wib(e.created_at)
+            updated_at_raw, updated_at_formatted = format_wib(e.updated_at)
             
             result.append({
-                'id': eval_obj.id,
-                'lecturer_name': lecturer.name if lecturer else (lecturer_name if lecturer_name else "Unknown Lecturer"),
-                'course_name': course.name if course else (course_name if course_name else "Unknown Course"),
-                'semester': eval_obj.semester if eval_obj.semester else (cl_semester if cl_semester else 0),
-                'academic_year': cl_academic_year if cl_academic_year else "",
-                'score': eval_obj.score if eval_obj.score else 0,
-                'comment': eval_obj.comment if eval_obj.comment else "",
+                'id': e.id,
+                'lecturer_name': e.lecturer_name if e.lecturer_name else "Unknown Lecturer",
+                'course_name': e.course_name if e.course_name else "Unknown Course",
+                'semester': e.semester if e.semester else (e.cl_semester if e.cl_semester else 0),
+                'academic_year': e.cl_academic_year if e.cl_academic_year else "",
+                'score': e.score if e.score else 0,
+                'comment': e.comment if e.comment else "",
                 'created_at': created_at_raw,  # ISO format for JavaScript parsing
                 'updated_at': updated_at_raw,  # ISO format for JavaScript parsing
                 'created_at_formatted': created_at_formatted,  # Formatted for display
                 'updated_at_formatted': updated_at_formatted,  # Formatted for display
                 'can_edit': True,  # We'll allow editing for all evaluations for now
-                'lecturer_id': eval_obj.lecturer_id,
-                'class_id': eval_obj.class_id
+                'lecturer_id': e.lecturer_id,
+                'class_id': e.class_id
             })
         
         # Jika tidak ada evaluasi, buat contoh data dummy untuk testing
-        if not result:
+        if not result and not cursor:
             # Tambahkan data dummy untuk testing
             dummy_data = [
                 {
@@ -146,15 +182,16 @@ def get_student_evaluation_history():
             for item in dummy_data:
                 item['is_dummy'] = True
                 
-            return jsonify(dummy_data)
+            return jsonify({'evaluations': dummy_data, 'next_cursor': None})
         
-        return jsonify(result)
+        return jsonify({'evaluations': result, 'next_cursor': next_cursor})
     except Exception as e:
         print(f"Error: {str(e)}")
         return jsonify({"message": f"Error fetching evaluation history: {str(e)}"}), 500
 
 @evaluation_history_bp.route('/api/student/evaluation/<int:evaluation_id>', methods=['GET'])
 @jwt_required()
+@read_replica
 def get_evaluation_detail(evaluation_id):
     # Get student identity from JWT
     identity = get_jwt_identity()
@@ -170,8 +207,8 @@ def get_evaluation_detail(evaluation_id):
     except ValueError:
         return jsonify({"message": "Invalid student ID"}), 400
     
-    # Find student by NIM
-    student = Student.query.filter_by(nim=nim).first()
+    # Find student by NIM (cached principal, usually no query)
+    student = load_student_principal(nim)
     if not student:
         return jsonify({"message": "Student not found"}), 404
     
@@ -250,41 +287,17 @@ def get_evaluation_detail(evaluation_id):
         
         eval_obj, lecturer_name, lecturer_nidn, course_name, course_id, semester, academic_year = evaluation
         
-        # Get lecturer and course directly from relationships if available
-        lecturer = Lecturer.query.get(eval_obj.lecturer_id) if eval_obj.lecturer_id else None
-        course = Course.query.get(eval_obj.course_id) if eval_obj.course_id else None
-        from datetime import timezone
-        import pytz
-
-        wib = pytz.timezone('Asia/Jakarta')
-
-        def to_wib(dt):
-            if dt is None:
-                return None
-
-            if dt.tzinfo is None:
-                dt = dt.replace(tzinfo=timezone.utc)  # anggap ini UTC
-
-            return dt.astimezone(wib)
-
-        # Konversi dulu
-        created_at_wib = to_wib(eval_obj.created_at)
-        updated_at_wib = to_wib(eval_obj.updated_at)
-
-        # Baru format ke string
-        created_at_raw = created_at_wib.isoformat() if created_at_wib else None
-        updated_at_raw = updated_at_wib.isoformat() if updated_at_wib else None
-
-        created_at_formatted = created_at_wib.strftime('%d %B %Y pukul %H:%M WIB') if created_at_wib else None
-        updated_at_formatted = updated_at_wib.strftime('%d %B %Y pukul %H:%M WIB') if updated_at_wib else None
+        # Konversi ke WIB lalu format ke string
+        created_at_raw, created_at_formatted = format_wib(eval_obj.created_at)
+        updated_at_raw, updated_at_formatted = format_wib(eval_obj.updated_at)
 
         result = {
             'id': eval_obj.id,
-            'lecturer_name': lecturer.name if lecturer else (lecturer_name if lecturer_name else "Unknown Lecturer"),
-            'lecturer_nidn': lecturer.nidn if lecturer else (lecturer_nidn if lecturer_nidn else 0),
+            'lecturer_name': lecturer_name if lecturer_name else "Unknown Lecturer",
+            'lecturer_nidn': lecturer_nidn if lecturer_nidn else 0,
             'lecturer_id': eval_obj.lecturer_id,  # Add lecturer_id explicitly
-            'course_name': course.name if course else (course_name if course_name else "Unknown Course"),
-            'course_id': course.id if course else (course_id if course_id else 0),
+            'course_name': course_name if course_name else "Unknown Course",
+            'course_id': course_id if course_id else 0,
             'class_id': eval_obj.class_id,
             'semester': semester if semester else (eval_obj.semester if eval_obj.semester else 0),
             'academic_year': academic_year if academic_year else "",
@@ -318,8 +331,8 @@ def update_evaluation(evaluation_id):
     except ValueError:
         return jsonify({"message": "Invalid student ID"}), 400
     
-    # Find student by NIM
-    student = Student.query.filter_by(nim=nim).first()
+    # Find student by NIM (cached principal, usually no query)
+    student = load_student_principal(nim)
     if not student:
         return jsonify({"message": "Student not found"}), 404
     
@@ -341,15 +354,13 @@ def update_evaluation(evaluation_id):
             return jsonify({"message": "No input data provided"}), 400
         
         # Check if answers array is provided
+        old_score = evaluation.score or 0
         if 'answers' in data and isinstance(data['answers'], list):
-            # Calculate new score based on answers
-            total_points = 0
-            answer_count = 0
-            
             # Delete existing answers for this evaluation
             EvaluationAnswer.query.filter_by(evaluation_id=evaluation.id).delete()
             
             # Add new answers
+            answer_ids = []
             for answer_data in data['answers']:
                 question_id = answer_data.get('question_id')
                 answer_id = answer_data.get('answer_id')
@@ -362,51 +373,28 @@ def update_evaluation(evaluation_id):
                         answer_id=answer_id
                     )
                     db.session.add(eval_answer)
-                    
-                    # Get points for this answer
-                    answer = Answer.query.get(answer_id)
-                    if answer:
-                        total_points += answer.points
-                        answer_count += 1
+                    answer_ids.append(answer_id)
+            
+            # Calculate new score from the cached answer points
+            score, answer_count = score_answers(answer_ids)
             
-            # Calculate and update score if answers were provided
+            # Update the score only if answers were provided
             if answer_count > 0:
-                # Get the maximum possible points for each question
-                # For example, if the highest point value for any answer is 4.0, use that
-                max_point_answer = Answer.query.order_by(Answer.points.desc()).first()
-                max_points_per_question = max_point_answer.points if max_point_answer else 1.0
-                
-                # Calculate score based on the actual maximum points
-                max_possible_points = answer_count * max_points_per_question
-                score = (total_points / max_possible_points) * 100
-                
-                # print(f"Score calculation: {total_points} / ({answer_count} * {max_points_per_question}) * 100 = {score}%")
-                
-                # Ensure score is capped at 100%
-                score = min(score, 100.0)
-                
-                # Update the evaluation score
                 evaluation.score = score
-                # print(f"Updated evaluation {evaluation.id} score to {score}%")
         
         # Update comment if provided
         if 'comment' in data:
             evaluation.comment = data['comment']
         
         # Update timestamp
-        from datetime import datetime
         evaluation.updated_at = datetime.now()
         
+        # Update lecturer average score in the same transaction
+        record_score_delta(evaluation.lecturer_id, evaluation.created_at, (evaluation.score or 0) - old_score, 0)
+        
         # Save changes
         db.session.commit()
         
-        # Update lecturer average score
-        lecturer_id = evaluation.lecturer_id
-        if lecturer_id:
-            from App.models import update_lecturer_score
-            update_success = update_lecturer_score(lecturer_id)
-            # print(f"Leaderboard update for lecturer {lecturer_id}: {'Success' if update_success else 'Failed'}")
-        
         # Return the updated score along with the success message
         return jsonify({
             "message": "Evaluation updated successfully",
@@ -1,15 +1,150 @@
 from flask_jwt_extended import jwt_required, get_jwt
 from flask import Blueprint, jsonify, request
-from App.models import Lecturer, LecturerScore, Evaluation, db
-from sqlalchemy import desc, func, case, literal, or_
+from App.models import Lecturer, LeaderboardRank, LecturerScore, db
+from utils.scores import period_score_subquery
+from utils.db_routing import read_replica
+from utils.photos import variant_url, LIST_VARIANT
+from sqlalchemy import desc, func, tuple_
 from datetime import datetime, timedelta
 
 leaderboard_bp = Blueprint('leaderboard', __name__)
 
-# Route update-bayesian dihapus karena tidak lagi menggunakan weighted_score
+DEFAULT_TOP_N = 10
+MAX_TOP_N = 100
+RANK_PAGE_SIZE = 20
+MAX_RANK_PAGE_SIZE = 100
+
+# Route update-bayesian dihapus: weighted_score dijaga oleh utils/weighted_scores.py
+
+
+def ranked_lecturers_query():
+    """Rows of the materialized leaderboard joined with the lecturer, in rank order."""
+    return db.session.query(
+        LeaderboardRank.rank,
+        Lecturer.nidn,
+        Lecturer.name,
+        Lecturer.photo_url,
+        LeaderboardRank.average_score,
+        LeaderboardRank.score_count
+    ).join(Lecturer, Lecturer.nidn == LeaderboardRank.lecturer_id) \
+     .order_by(LeaderboardRank.rank, LeaderboardRank.lecturer_id)
+
+
+def format_rank(row):
+    return {
+        'nidn': row.nidn,
+        'name': row.name,
+        'photo_url': variant_url(row.photo_url, LIST_VARIANT),
+        'rank': row.rank,
+        'averageScore': round(row.average_score, 2) if row.average_score is not None else None,
+        'votersCount': row.score_count or 0
+    }
+
+
+def weighted_lecturers_query():
+    """Lecturers with evaluations by Bayesian weighted score (index ix_lecturer_scores_weighted_score)."""
+    return db.session.query(
+        Lecturer.nidn,
+        Lecturer.name,
+        Lecturer.photo_url,
+        LecturerScore.weighted_score,
+        LecturerScore.average_score,
+        LecturerScore.score_count
+    ).join(Lecturer, Lecturer.nidn == LecturerScore.lecturer_id) \
+     .filter(LecturerScore.score_count > 0) \
+     .order_by(LecturerScore.weighted_score.desc(), LecturerScore.lecturer_id.desc())
+
+
+def format_weighted(row, position):
+    return {
+        'nidn': row.nidn,
+        'name': row.name,
+        'photo_url': variant_url(row.photo_url, LIST_VARIANT),
+        'rank': position,
+        'weightedScore': round(row.weighted_score, 2),
+        'averageScore': round(row.average_score, 2) if row.average_score is not None else None,
+        'votersCount': row.score_count or 0
+    }
+
+
+def int_arg(name, default, maximum=None):
+    value = request.args.get(name, default, type=int)
+    if value is None or value < 1:
+        raise ValueError(f"{name} must be a positive integer")
+    return min(value, maximum) if maximum else value
+
+
+def leaderboard_role_allowed():
+    return get_jwt().get("role") in ['admin', 'student']
+
+
+@leaderboard_bp.route('/api/leaderboard/top', methods=['GET'])
+@jwt_required()
+@read_replica
+def leaderboard_top():
+    """Top-N lecturers of the overall leaderboard (?n=10, max 100; ?sort=weighted for the Bayesian score)."""
+    if not leaderboard_role_allowed():
+        return jsonify({'message': 'Unauthorized'}), 403
+    try:
+        n = int_arg('n', DEFAULT_TOP_N, MAX_TOP_N)
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    sort = request.args.get('sort', 'average')
+    if sort not in ('average', 'weighted'):
+        return jsonify({'message': 'sort must be average or weighted'}), 400
+
+    if sort == 'weighted':
+        return jsonify([format_weighted(row, i) for i, row in enumerate(weighted_lecturers_query().limit(n), 1)])
+    return jsonify([format_rank(row) for row in ranked_lecturers_query().limit(n)])
+
+
+@leaderboard_bp.route('/api/leaderboard/ranks', methods=['GET'])
+@jwt_required()
+@read_replica
+def leaderboard_ranks():
+    """
+    A page of the overall leaderboard starting at ?start_rank (default 1).
+    Follow next_cursor (?cursor=<rank>:<nidn>) for the next page; ties never
+    repeat or skip lecturers across pages.
+    """
+    if not leaderboard_role_allowed():
+        return jsonify({'message': 'Unauthorized'}), 403
+    try:
+        limit = int_arg('limit', RANK_PAGE_SIZE, MAX_RANK_PAGE_SIZE)
+        start_rank = int_arg('start_rank', 1)
+        cursor = request.args.get('cursor')
+        if cursor:
+            after_rank, after_nidn = (int(part) for part in cursor.split(':'))
+    except ValueError:
+        return jsonify({'message': 'Invalid start_rank, limit or cursor'}), 400
+
+    query = ranked_lecturers_query()
+    if cursor:
+        query = query.filter(tuple_(LeaderboardRank.rank, LeaderboardRank.lecturer_id) > (after_rank, after_nidn))
+    else:
+        query = query.filter(LeaderboardRank.rank >= start_rank)
+
+    rows = query.limit(limit + 1).all()
+    next_cursor = f"{rows[limit - 1].rank}:{rows[limit - 1].nidn}" if len(rows) > limit else None
+    return jsonify({'entries': [format_rank(row) for row in rows[:limit]], 'next_cursor': next_cursor})
+
+
+@leaderboard_bp.route('/api/leaderboard/lecturers/<int:nidn>/rank', methods=['GET'])
+@jwt_required()
+@read_replica
+def leaderboard_lecturer_rank(nidn):
+    """Rank of one lecturer in the overall leaderboard."""
+    if not leaderboard_role_allowed():
+        return jsonify({'message': 'Unauthorized'}), 403
+
+    row = ranked_lecturers_query().filter(LeaderboardRank.lecturer_id == nidn).first()
+    if not row:
+        return jsonify({'message': 'Lecturer has no ranking yet'}), 404
+    return jsonify(format_rank(row))
 
 @leaderboard_bp.route('/api/leaderboard/export', methods=['GET'])
 @jwt_required()
+@read_replica
 def export_leaderboard():
     claims = get_jwt()
     role = claims.get("role")
@@ -23,126 +158,52 @@ def export_leaderboard():
     start_date = request.args.get('start_date')
     end_date = request.args.get('end_date')
     
-    # Base query untuk mendapatkan data dosen
-    query = db.session.query(
-        Lecturer.nidn,
-        Lecturer.name,
-        Lecturer.photo_url
-    )
+    # Tentukan rentang tanggal [start, end) dari periode yang diminta
+    start_day = None
+    end_day = None
     
     # Jika period adalah custom, gunakan start_date dan end_date
     if period == 'custom' and start_date and end_date:
         try:
-            start_date_obj = datetime.strptime(start_date, '%Y-%m-%d')
-            end_date_obj = datetime.strptime(end_date, '%Y-%m-%d')
+            start_day = datetime.strptime(start_date, '%Y-%m-%d').date()
             # Tambahkan 1 hari ke end_date untuk mencakup seluruh hari
-            end_date_obj = end_date_obj + timedelta(days=1)
-            
-            # Subquery untuk menghitung rata-rata skor dalam rentang tanggal
-            score_subquery = db.session.query(
-                Evaluation.lecturer_id,
-                func.avg(Evaluation.score).label('average_score'),
-                func.count(Evaluation.id).label('score_count')
-            ).filter(
-                Evaluation.created_at >= start_date_obj,
-                Evaluation.created_at < end_date_obj
-            ).group_by(Evaluation.lecturer_id).subquery()
-            
-            # Join dengan subquery
-            query = query.outerjoin(score_subquery, Lecturer.nidn == score_subquery.c.lecturer_id)
-            
-            # Select fields dari subquery
-            query = query.add_columns(
-                score_subquery.c.average_score,
-                score_subquery.c.score_count
-            )
+            end_day = datetime.strptime(end_date, '%Y-%m-%d').date() + timedelta(days=1)
         except ValueError:
             # Jika format tanggal tidak valid, gunakan data keseluruhan
-            query = query.outerjoin(LecturerScore, Lecturer.nidn == LecturerScore.lecturer_id)
-            query = query.add_columns(
-                LecturerScore.average_score,
-                LecturerScore.score_count
-            )
+            start_day = end_day = None
     else:
         # Filter berdasarkan periode
-        now = datetime.now()
-        filter_date = None
+        today = datetime.now().date()
         
         if period == 'day':
-            filter_date = now.replace(hour=0, minute=0, second=0, microsecond=0)
+            start_day = today
         elif period == 'week':
             # Senin minggu ini
-            days_since_monday = now.weekday()
-            filter_date = (now - timedelta(days=days_since_monday)).replace(hour=0, minute=0, second=0, microsecond=0)
+            start_day = today - timedelta(days=today.weekday())
         elif period == 'month':
             # Awal bulan ini
-            filter_date = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+            start_day = today.replace(day=1)
         elif period == 'year':
             # Awal tahun ini
-            filter_date = now.replace(month=1, day=1, hour=0, minute=0, second=0, microsecond=0)
-        
-        if filter_date:
-            # Subquery untuk menghitung rata-rata skor dalam rentang tanggal
-            score_subquery = db.session.query(
-                Evaluation.lecturer_id,
-                func.avg(Evaluation.score).label('average_score'),
-                func.count(Evaluation.id).label('score_count')
-            ).filter(
-                Evaluation.created_at >= filter_date
-            ).group_by(Evaluation.lecturer_id).subquery()
-            
-            # Join dengan subquery
-            query = query.outerjoin(score_subquery, Lecturer.nidn == score_subquery.c.lecturer_id)
-            
-            # Select fields dari subquery
-            query = query.add_columns(
-                score_subquery.c.average_score,
-                score_subquery.c.score_count
-            )
-        else:
-            # Jika period adalah 'all' atau tidak valid, gunakan data keseluruhan dari LecturerScore
-            score_subquery = db.session.query(
-                Evaluation.lecturer_id,
-                func.avg(Evaluation.score).label('average_score'),
-                func.count(Evaluation.id).label('score_count')
-            ).group_by(Evaluation.lecturer_id).subquery()
-            
-            # Join dengan subquery
-            query = query.outerjoin(score_subquery, Lecturer.nidn == score_subquery.c.lecturer_id)
-            
-            # Select fields dari subquery
-            query = query.add_columns(
-                score_subquery.c.average_score,
-                score_subquery.c.score_count
-            )
-    
-    # Pastikan hanya mengambil dosen yang memiliki evaluasi
-    query = query.filter(or_(score_subquery.c.average_score != None, LecturerScore.average_score != None))
-    
-    # Urutkan berdasarkan average_score (descending)
-    lecturers = query.order_by(desc('average_score')).all()
-    
-    # Format hasil
-    result = []
-    for i, l in enumerate(lecturers):
-        lecturer_data = {
-            'nidn': l.nidn,
-            'name': l.name,
-            'photo_url': l.photo_url if hasattr(l, 'photo_url') else None,
-            'rank': i + 1  # Tambahkan peringkat
-        }
-        
-        # Tambahkan skor dan jumlah voter
-        if hasattr(l, 'average_score') and l.average_score is not None:
-            lecturer_data['averageScore'] = round(l.average_score, 2)
-        else:
-            lecturer_data['averageScore'] = None
-            
-        if hasattr(l, 'score_count') and l.score_count is not None:
-            lecturer_data['votersCount'] = l.score_count
-        else:
-            lecturer_data['votersCount'] = 0
-            
-        result.append(lecturer_data)
+            start_day = today.replace(month=1, day=1)
     
-    return jsonify(result)
+    if not start_day:
+        # Jika period adalah 'all' atau tidak valid, pakai leaderboard yang dimaterialisasi
+        return jsonify([format_rank(row) for row in ranked_lecturers_query()])
+
+    # Jumlahkan bucket harian dalam rentang tanggal
+    score_subquery = period_score_subquery(start_day, end_day)
+
+    # Inner join: hanya dosen yang memiliki evaluasi; peringkat (dense rank) dihitung di SQL
+    lecturers = db.session.query(
+        func.dense_rank().over(order_by=desc(score_subquery.c.average_score)).label('rank'),
+        Lecturer.nidn,
+        Lecturer.name,
+        Lecturer.photo_url,
+        score_subquery.c.average_score,
+        score_subquery.c.score_count
+    ).join(score_subquery, Lecturer.nidn == score_subquery.c.lecturer_id) \
+     .order_by(desc(score_subquery.c.average_score), Lecturer.nidn) \
+     .all()
+
+    return jsonify([format_rank(l) for l in lecturers])
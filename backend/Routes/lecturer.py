@@ -1,79 +1,27 @@
 from flask_jwt_extended import jwt_required, get_jwt,get_jwt_identity
 from flask import Blueprint, jsonify, request
-from App.models import Lecturer, ClassLecturer, db, Student, LecturerScore, Evaluation, Course, EvaluationAnswer
-from sqlalchemy import desc, func
-from datetime import datetime, timedelta
+from App.models import Lecturer, ClassLecturer, db, LecturerScore, Course
+from sqlalchemy import desc
+from utils.data_version import conditional_get
+from utils.principal import load_student_principal
+from utils.db_routing import read_replica
+from utils.photos import variant_url, LIST_VARIANT, DEFAULT_VARIANT
 
 lecturer_bp = Blueprint('lecturer', __name__)
 
-# Helper function to update lecturer scores (only average score, no weighted score)
-def update_lecturer_scores():
-    """Update average scores for all lecturers"""
-    try:
-        # Get count of evaluations per lecturer and their average scores
-        lecturer_data = db.session.query(
-            Evaluation.lecturer_id,
-            func.avg(Evaluation.score).label('avg_score'),
-            func.count(Evaluation.id).label('voter_count')
-        ).group_by(Evaluation.lecturer_id).all()
-        
-        # Update scores for lecturers with evaluations
-        for lecturer_id, avg_score, voter_count in lecturer_data:
-            # Cap average score at 100%
-            average_score = min(100, avg_score) if avg_score is not None else 0
-            
-            # Update or create LecturerScore record
-            lecturer_score = LecturerScore.query.get(lecturer_id)
-            if lecturer_score:
-                lecturer_score.average_score = average_score
-                lecturer_score.score_count = voter_count
-            else:
-                lecturer_score = LecturerScore(
-                    lecturer_id=lecturer_id,
-                    average_score=average_score,
-                    score_count=voter_count
-                )
-                db.session.add(lecturer_score)
-        
-        # For lecturers without evaluations, set average_score to 0
-        all_lecturers = Lecturer.query.all()
-        for lecturer in all_lecturers:
-            if lecturer.nidn not in [ld[0] for ld in lecturer_data]:
-                lecturer_score = LecturerScore.query.get(lecturer.nidn)
-                if lecturer_score:
-                    lecturer_score.average_score = 0
-                    lecturer_score.score_count = 0
-                else:
-                    lecturer_score = LecturerScore(
-                        lecturer_id=lecturer.nidn,
-                        average_score=0,
-                        score_count=0
-                    )
-                    db.session.add(lecturer_score)
-        
-        db.session.commit()
-        return True
-    
-    except Exception as e:
-        db.session.rollback()
-        print(f"Error updating lecturer scores: {str(e)}")
-        return False
-
 # just get my lecturers
 @lecturer_bp.route('/api/my-lecturers')
 @jwt_required()
+@read_replica
 def get_my_lecturers():
     claims = get_jwt()
     role = claims.get("role")
     student = None
     if role ==  "student":
-        student = Student.query.filter_by(nim=get_jwt_identity()).first()
+        student = load_student_principal(get_jwt_identity())
         if not student:
             return jsonify([])
     
-    # Update average scores before returning the data
-    update_lecturer_scores()
-        
     # Jika role adalah student, maka filter berdasarkan class_id mahasiswa
     if student:
         lecturers = db.session.query(
@@ -127,6 +75,7 @@ def get_my_lecturers():
 # get all of lecturers
 @lecturer_bp.route('/lecturers', methods=['GET'])
 @jwt_required()
+@read_replica
 def get_lecturers():
     claims = get_jwt()
     role = claims.get("role")
@@ -134,9 +83,6 @@ def get_lecturers():
     if role not in ['student', 'admin']:
         return jsonify({'message': 'Unauthorized'}), 403
     
-    # Update average scores before returning the data
-    update_lecturer_scores()
-
     lecturers = db.session.query(
         Lecturer.nidn,
         Lecturer.name,
@@ -150,7 +96,7 @@ def get_lecturers():
     result = [{
         'nidn': l.nidn,
         'name': l.name,
-        'photo_url': l.photo_url,
+        'photo_url': variant_url(l.photo_url, LIST_VARIANT),
         'average_score': round(l.average_score, 2) if l.average_score is not None else None,
         'voters_count': l.score_count if l.score_count is not None else 0
     } for l in lecturers]
@@ -159,10 +105,9 @@ def get_lecturers():
 
 # get all of lecturers for all even stranger
 @lecturer_bp.route('/lecturers/all', methods=['GET'])
+# Tanpa @read_replica: body di-cache dengan ETag dari versi primary (replica bisa tertinggal)
+@conditional_get('lecturers', 'evaluations')
 def get_all_lecturers():
-    # Update average scores before returning the data
-    update_lecturer_scores()
-
     lecturers = db.session.query(
         Lecturer.nidn,
         Lecturer.name,
@@ -176,7 +121,9 @@ def get_all_lecturers():
     result = [{
         'nidn': l.nidn,
         'name': l.name,
-        'photo_url': l.photo_url,
+        'photo_url': variant_url(l.photo_url, LIST_VARIANT),
+        # Podium 3 besar di halaman utama memakai varian yang lebih besar
+        'photo_url_md': variant_url(l.photo_url, DEFAULT_VARIANT),
         'average_score': round(l.average_score, 2) if l.average_score is not None else None,
         'voters_count': l.score_count if l.score_count is not None else 0
     } for l in lecturers]
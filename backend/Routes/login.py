@@ -2,7 +2,8 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import create_access_token
 from App.models import User ,Student # Model User dari Flask-SQLAlchemy
-from App import bcrypt  # Inisialisasi Bcrypt dari __init__.py
+from App import db
+from utils.passwords import check_password, hash_password, needs_rehash, PasswordPoolBusy
 from sqlalchemy import or_
 # Blueprint untuk login
 login_bp = Blueprint('login', __name__)
@@ -36,9 +37,21 @@ def login():
         if not user or user.role != "admin":
             return jsonify({"error": "Invalid username or password"}), 401
 
-    # Validasi password
-    if not bcrypt.check_password_hash(user.password, password):
-        return jsonify({"error": "Invalid credentials"}), 401
+    # Validasi password (di process pool; 503 bila antrean hashing penuh)
+    try:
+        if not check_password(user.password, password):
+            return jsonify({"error": "Invalid credentials"}), 401
+    except PasswordPoolBusy as e:
+        return jsonify({"error": "Server is busy, please try again"}), 503, {'Retry-After': str(e.retry_after)}
+
+    # Hash ulang bila cost factor (BCRYPT_LOG_ROUNDS) berubah sejak password disimpan
+    if needs_rehash(user.password):
+        try:
+            user.password = hash_password(password)
+            db.session.commit()
+        except PasswordPoolBusy:
+            # Tidak wajib; dicoba lagi pada login berikutnya
+            db.session.rollback()
 
     claims = {
         "username": user.username,
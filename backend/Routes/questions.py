@@ -1,24 +1,45 @@
 from flask import Blueprint, jsonify, request
-from App.models import Question, Answer, Evaluation, LecturerScore, EvaluationAnswer, ClassLecturer, Course, db
+from App.models import Evaluation, EvaluationAnswer, ClassLecturer, Student, db
+from sqlalchemy import insert
 from flask_jwt_extended import jwt_required, get_jwt_identity
+from utils.scores import record_score_delta, record_score_deltas
+from utils.reference_data import get_reference_data, score_answers
+from utils.data_version import conditional_get
+from utils.submission_queue import queue_enabled, enqueue_submissions
+from utils.query_budget import query_budget
 
 questions_bp = Blueprint('api', __name__)
 
+# Maksimal jumlah evaluasi dalam satu batch submission
+MAX_BATCH_EVALUATIONS = 50
+
+
+def parse_answers(answers):
+    """Normalize submitted answers to a list of (question_id, answer_id) pairs."""
+    # Check if answers is a list (new format) or dictionary (old format)
+    if isinstance(answers, list):
+        # New format: list of objects with question_id and answer_id
+        return [
+            (answer_data.get('question_id'), answer_data.get('answer_id'))
+            for answer_data in answers
+            if answer_data.get('question_id') and answer_data.get('answer_id')
+        ]
+    # Old format: dictionary with question_id as key and answer_id as value
+    return list(answers.items())
+
+
+def enqueue_evaluations(student_id, rows):
+    """Append evaluation rows to the write-behind log (SUBMISSION_QUEUE=true); returns the keys."""
+    idempotency_key = request.headers.get('Idempotency-Key')
+    if idempotency_key:
+        idempotency_key = f"{student_id}:{idempotency_key}"
+    return enqueue_submissions(rows, idempotency_key=idempotency_key)
+
 @questions_bp.route('/api/questions', methods=['GET'])
 # @jwt_required()
+@conditional_get('questions')
 def get_questions():
-    questions = Question.query.limit(5).all()
-    answers = Answer.query.all()
-    answer_map = [{ 'id': a.id, 'text': a.text } for a in answers]
-
-    result = []
-    for q in questions:
-        result.append({
-            'id': q.id,
-            'text': q.text,
-            'choices': answer_map
-        })
-    return jsonify(result)
+    return jsonify(get_reference_data().questions)
 
 
 @questions_bp.route('/api/submit-evaluation', methods=['POST'])
@@ -26,8 +47,17 @@ def get_questions():
 def submit_evaluation():
     data = request.get_json()
     student_id = get_jwt_identity()  # diasumsikan payload JWT berisi student_id
-    lecturer_id = request.args.get('lecturer_id')  # bisa dari query param
-    class_id = request.args.get('class_id')
+    try:
+        lecturer_id = int(request.args.get('lecturer_id'))  # bisa dari query param
+        class_id = int(request.args.get('class_id'))
+    except (TypeError, ValueError):
+        return jsonify({'message': 'lecturer_id and class_id must be integers'}), 400
+
+    # Divalidasi sekali untuk kedua jalur (antrean dan langsung), sebelum menyentuh database
+    try:
+        answer_pairs = [(int(question_id), int(answer_id)) for question_id, answer_id in parse_answers(data['answers'])]
+    except (KeyError, TypeError, ValueError, AttributeError):
+        return jsonify({'message': 'answers are required and must be integers'}), 400
 
     # Check if student exists in DB
     # student = Student.query.filter_by(nim=student_id).first()
@@ -51,6 +81,27 @@ def submit_evaluation():
         academic_year = class_lecturer.academic_year
         lecturer_class_id = class_lecturer.id
     
+    if queue_enabled():
+        # Skor dihitung sekarang
+        average_score, _ = score_answers(answer_id for _, answer_id in answer_pairs)
+        submission_id, = enqueue_evaluations(student_id, [{
+            'student_id': student_id,
+            'lecturer_id': lecturer_id,
+            'class_id': class_id,
+            'course_id': course_id,
+            'semester': semester,
+            'lecturer_class_id': lecturer_class_id,
+            'comment': data.get('comment', ''),
+            'score': average_score,
+            'answers': answer_pairs
+        }])
+        return jsonify({
+            'message': 'Evaluation accepted',
+            'submission_id': submission_id,
+            'score': average_score,
+            'queued': True
+        }), 202
+
     # Create evaluation record with comment and additional information
     evaluation = Evaluation(
         student_id=student_id, 
@@ -66,80 +117,21 @@ def submit_evaluation():
 
     # db.session.commit()
     
-    # 1. Hitung total poin dari evaluasi ini
-    total_points = 0
-    answer_count = 0
-    
-    # Check if answers is a list (new format) or dictionary (old format)
-    if isinstance(data['answers'], list):
-        # New format: list of objects with question_id and answer_id
-        for answer_data in data['answers']:
-            question_id = answer_data.get('question_id')
-            answer_id = answer_data.get('answer_id')
-            
-            if question_id and answer_id:
-                answer = Answer.query.get(answer_id)
-                if answer:
-                    total_points += answer.points
-                    answer_count += 1
-                
-                ea = EvaluationAnswer(
-                    evaluation_id=evaluation.id,
-                    question_id=int(question_id),
-                    answer_id=answer_id
-                )
-                db.session.add(ea)
-    else:
-        # Old format: dictionary with question_id as key and answer_id as value
-        for question_id, answer_id in data['answers'].items():
-            answer = Answer.query.get(answer_id)
-            if answer:
-                total_points += answer.points
-                answer_count += 1
-            
-            ea = EvaluationAnswer(
-                evaluation_id=evaluation.id,
-                question_id=int(question_id),
-                answer_id=answer_id
-            )
-            db.session.add(ea)
+    # 1. Simpan jawaban dalam satu executemany (bukan satu INSERT per jawaban)
+    if answer_pairs:
+        db.session.execute(insert(EvaluationAnswer), [
+            {'evaluation_id': evaluation.id, 'question_id': question_id, 'answer_id': answer_id}
+            for question_id, answer_id in answer_pairs
+        ])
     
-    # 2. Hitung rata-rata dan konversi ke persentase
-    if answer_count > 0:
-        # Get the maximum possible points for each question
-        # For example, if the highest point value for any answer is 4.0, use that
-        max_point_answer = Answer.query.order_by(Answer.points.desc()).first()
-        max_points_per_question = max_point_answer.points if max_point_answer else 1.0
-        
-        # Calculate score based on the actual maximum points
-        max_possible_points = answer_count * max_points_per_question
-        average_score = (total_points / max_possible_points) * 100
-        
-        print(f"Score calculation: {total_points} / ({answer_count} * {max_points_per_question}) * 100 = {average_score}%")
-        
-        # Ensure score is capped at 100%
-        average_score = min(average_score, 100.0)
-    else:
-        average_score = 0
+    # 2. Hitung skor (persentase) dari poin jawaban yang di-cache, tanpa query ke tabel answers
+    average_score, answer_count = score_answers(answer_id for _, answer_id in answer_pairs)
     
     # Save the score to the evaluation record
     evaluation.score = average_score
 
     # 3. Update LecturerScore
-    existing_score = LecturerScore.query.filter_by(lecturer_id=lecturer_id).first()
-    if existing_score:
-        # Weighted average update
-        total_score_sum = existing_score.average_score * existing_score.score_count
-        new_total = total_score_sum + average_score
-        existing_score.score_count += 1
-        existing_score.average_score = new_total / existing_score.score_count
-    else:
-        new_score = LecturerScore(
-            lecturer_id=lecturer_id,
-            average_score=average_score,
-            score_count=1
-        )
-        db.session.add(new_score)
+    record_score_delta(lecturer_id, evaluation.created_at, average_score, 1)
 
     db.session.commit()
     return jsonify({
@@ -147,3 +139,127 @@ def submit_evaluation():
         'evaluation_id': evaluation.id,
         'score': average_score
     })
+
+
+@questions_bp.route('/api/submit-evaluations', methods=['POST'])
+# Skor diperbarui satu kali per dosen (dan per hari), jadi bentuk UPDATE/INSERT
+# skor boleh berulang sebanyak ukuran batch
+@query_budget(queries=10 + 4 * MAX_BATCH_EVALUATIONS, repeats=MAX_BATCH_EVALUATIONS)
+@jwt_required()
+def submit_evaluations():
+    """
+    Submit all of a student's evaluations in one request.
+    Body: {"evaluations": [{"lecturer_id", "class_id", "answers", "comment"}, ...]}
+    """
+    data = request.get_json() or {}
+    student_id = get_jwt_identity()
+    items = data.get('evaluations')
+
+    if not isinstance(items, list) or not items:
+        return jsonify({'message': 'evaluations must be a non-empty list'}), 400
+    if len(items) > MAX_BATCH_EVALUATIONS:
+        return jsonify({'message': f'At most {MAX_BATCH_EVALUATIONS} evaluations per request'}), 400
+
+    # Semua penugasan mengajar untuk kelas mahasiswa, dalam satu query
+    class_lecturers = {
+        (cl.lecturer_id, cl.class_id): cl
+        for cl in ClassLecturer.query.join(
+            Student, Student.class_id == ClassLecturer.class_id
+        ).filter(Student.nim == student_id).all()
+    }
+
+    # Validasi seluruh batch sebelum menulis apa pun
+    errors = []
+    rows = []
+    for index, item in enumerate(items):
+        try:
+            key = (int(item['lecturer_id']), int(item['class_id']))
+            answer_pairs = [(int(q), int(a)) for q, a in parse_answers(item['answers'])]
+        except (KeyError, TypeError, ValueError, AttributeError):
+            errors.append({'index': index, 'message': 'lecturer_id, class_id and answers are required'})
+            continue
+
+        class_lecturer = class_lecturers.get(key)
+        if not class_lecturer:
+            errors.append({'index': index, 'message': 'Lecturer does not teach your class'})
+            continue
+
+        score, _ = score_answers(answer_id for _, answer_id in answer_pairs)
+        rows.append((class_lecturer, item.get('comment', ''), answer_pairs, score))
+
+    if errors:
+        return jsonify({'message': 'Invalid evaluations', 'errors': errors}), 400
+
+    if queue_enabled():
+        try:
+            submission_ids = enqueue_evaluations(student_id, [{
+                'student_id': student_id,
+                'lecturer_id': cl.lecturer_id,
+                'class_id': cl.class_id,
+                'course_id': cl.course_id,
+                'semester': cl.semester,
+                'lecturer_class_id': cl.id,
+                'comment': comment,
+                'score': score,
+                'answers': answer_pairs
+            } for cl, comment, answer_pairs, score in rows])
+        except Exception as e:
+            return jsonify({'message': f'Error submitting evaluations: {str(e)}'}), 500
+        return jsonify({
+            'message': 'Evaluations accepted',
+            'queued': True,
+            'evaluations': [{
+                'submission_id': submission_id,
+                'lecturer_id': cl.lecturer_id,
+                'class_id': cl.class_id,
+                'score': score
+            } for submission_id, (cl, _, _, score) in zip(submission_ids, rows)]
+        }), 202
+
+    try:
+        # Multi-row insert evaluasi; RETURNING memberi id dan created_at sesuai urutan input
+        inserted = db.session.execute(
+            insert(Evaluation).returning(Evaluation.id, Evaluation.created_at, sort_by_parameter_order=True),
+            [{
+                'student_id': student_id,
+                'lecturer_id': cl.lecturer_id,
+                'class_id': cl.class_id,
+                'course_id': cl.course_id,
+                'semester': cl.semester,
+                'lecturer_class_id': cl.id,
+                'comment': comment,
+                'score': score
+            } for cl, comment, _, score in rows]
+        ).all()
+
+        # Multi-row insert jawaban
+        db.session.execute(insert(EvaluationAnswer), [
+            {'evaluation_id': evaluation_id, 'question_id': question_id, 'answer_id': answer_id}
+            for (evaluation_id, _), (_, _, answer_pairs, _) in zip(inserted, rows)
+            for question_id, answer_id in answer_pairs
+        ])
+
+        # Satu update skor per dosen
+        record_score_deltas(
+            (cl.lecturer_id, created_at, score)
+            for (_, created_at), (cl, _, _, score) in zip(inserted, rows)
+        )
+
+        # Dibentuk sebelum commit: setelah commit objek ClassLecturer expired dan
+        # setiap akses atribut akan memuat ulang barisnya (N+1)
+        result = [{
+            'evaluation_id': evaluation_id,
+            'lecturer_id': cl.lecturer_id,
+            'class_id': cl.class_id,
+            'score': score
+        } for (evaluation_id, _), (cl, _, _, score) in zip(inserted, rows)]
+
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'message': f'Error submitting evaluations: {str(e)}'}), 500
+
+    return jsonify({
+        'message': 'Evaluations submitted successfully',
+        'evaluations': result
+    })
@@ -1,7 +1,8 @@
 from flask import Blueprint, request, jsonify
-from App.models import db, ClassLecturer, Lecturer, Class, Course, Evaluation, EvaluationAnswer
+from App.models import db, ClassLecturer, Lecturer, Class, Course
 from flask_jwt_extended import jwt_required
 from utils.auth import admin_required
+from utils.deletion import delete_assignment, delete_course as delete_course_cascade
 
 teaching_bp = Blueprint('teaching_bp', __name__)
 
@@ -229,19 +230,8 @@ def delete_teaching_assignment(current_user, assignment_id):
         if not assignment:
             return jsonify({'error': 'Teaching assignment not found'}), 404
         
-        # Find all evaluations that reference this teaching assignment
-        evaluations = Evaluation.query.filter_by(lecturer_class_id=assignment_id).all()
-        
-        # For each evaluation, delete related evaluation answers first
-        for evaluation in evaluations:
-            # Delete evaluation answers
-            EvaluationAnswer.query.filter_by(evaluation_id=evaluation.id).delete()
-        
-        # Now delete all evaluations for this teaching assignment
-        Evaluation.query.filter_by(lecturer_class_id=assignment_id).delete()
-        
-        # Now we can safely delete the teaching assignment
-        db.session.delete(assignment)
+        # Evaluasi + jawaban dihapus set-based, skor dosen dihitung ulang dalam transaksi yang sama
+        delete_assignment(assignment_id)
         db.session.commit()
         
         return jsonify({
@@ -374,7 +364,8 @@ def delete_course(current_user, course_id):
         if assignments:
             return jsonify({'error': 'Cannot delete course that is used in teaching assignments'}), 400
         
-        db.session.delete(course)
+        # Evaluasi yang masih merujuk mata kuliah ini ikut dihapus
+        delete_course_cascade(course_id)
         db.session.commit()
         
         return jsonify({
@@ -0,0 +1,84 @@
+"""
+Worker cold-start benchmark: import time and resident memory of create_app().
+
+Each run starts a fresh interpreter (like a new gunicorn worker), imports
+main.py (which calls create_app()) and reports the time taken, the RSS afterwards
+and whether any heavy module was imported at startup.
+
+    python -m benchmarks.bench_cold_start --runs 5 --max-seconds 2 --max-rss-mb 120
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+# Only loaded on first use (exports, analytics); must not be imported by create_app()
+HEAVY_MODULES = ['pandas', 'numpy', 'openpyxl', 'PIL', 'pyarrow']
+
+PROBE = r"""
+import json, os, sys, time
+start = time.perf_counter()
+import main
+elapsed = time.perf_counter() - start
+with open('/proc/self/statm') as f:
+    rss = int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+print(json.dumps({
+    'seconds': elapsed,
+    'rss_mb': rss / (1024 * 1024),
+    'heavy_modules': [m for m in HEAVY_MODULES if m in sys.modules],
+}))
+"""
+
+
+def run_once(backend_dir, database_url):
+    env = dict(os.environ, SQLALCHEMY_DATABASE_URI=database_url)
+    output = subprocess.run(
+        [sys.executable, '-c', f"HEAVY_MODULES = {HEAVY_MODULES!r}\n" + PROBE],
+        cwd=backend_dir, env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--database-url', default='sqlite:///:memory:')
+    parser.add_argument('--max-seconds', type=float, default=None, help='fail if the median exceeds this')
+    parser.add_argument('--max-rss-mb', type=float, default=None, help='fail if the median RSS exceeds this')
+    parser.add_argument('--output', default=None, help='write the results as JSON')
+    args = parser.parse_args()
+
+    backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    runs = [run_once(backend_dir, args.database_url) for _ in range(args.runs)]
+
+    result = {
+        'runs': args.runs,
+        'median_seconds': statistics.median(r['seconds'] for r in runs),
+        'median_rss_mb': statistics.median(r['rss_mb'] for r in runs),
+        'heavy_modules': sorted({m for r in runs for m in r['heavy_modules']}),
+    }
+    print(f"import main + create_app() {result['median_seconds'] * 1000:10.1f} ms (median of {args.runs})")
+    print(f"worker RSS after startup   {result['median_rss_mb']:10.1f} MB")
+    print(f"heavy modules at startup   {', '.join(result['heavy_modules']) or '-'}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(result, f, indent=2)
+
+    failures = []
+    if result['heavy_modules']:
+        failures.append(f"heavy modules imported at startup: {', '.join(result['heavy_modules'])}")
+    if args.max_seconds is not None and result['median_seconds'] > args.max_seconds:
+        failures.append(f"startup {result['median_seconds']:.2f}s > {args.max_seconds}s")
+    if args.max_rss_mb is not None and result['median_rss_mb'] > args.max_rss_mb:
+        failures.append(f"RSS {result['median_rss_mb']:.1f} MB > {args.max_rss_mb} MB")
+    for failure in failures:
+        print('FAIL:', failure)
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
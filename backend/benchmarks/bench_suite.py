@@ -0,0 +1,299 @@
+"""
+Microbenchmark suite for the scoring, leaderboard, serialization, analytics and export hot paths.
+
+Builds a scaled synthetic dataset (by default 10k students, 500 lecturers and
+1M evaluations), runs every benchmark for a number of rounds and prints
+min / median / mean / stddev plus the number of SQL statements per call.
+Results are written as JSON (same layout as pytest-benchmark's --benchmark-json)
+so runs can be compared between commits:
+
+    python -m benchmarks.bench_suite --database-url sqlite:////tmp/bench.db --output before.json
+    git checkout <other commit>
+    python -m benchmarks.bench_suite --database-url sqlite:////tmp/bench.db --reuse \\
+        --output after.json --compare before.json
+
+Seeding 1M evaluations takes a few minutes; --reuse keeps an already seeded
+database (file SQLite or PostgreSQL) instead of rebuilding it. The submit and
+update benchmarks write to the database, so reused data drifts slightly.
+"""
+import argparse
+import fnmatch
+import json
+import math
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta
+
+from benchmarks.common import make_app, seed_dataset, QueryCounter
+
+
+class Suite:
+    """Collects benchmark results; each benchmark is one callable timed per round."""
+
+    def __init__(self, engine, rounds=5, warmup=1, only=None):
+        self.engine = engine
+        self.rounds = rounds
+        self.warmup = warmup
+        self.only = only
+        self.results = []
+
+    def bench(self, group, name, fn, setup=None, rounds=None, calls=1):
+        """
+        Time ``fn`` (``calls`` times per round). ``setup`` runs untimed before
+        every round, e.g. to invalidate a cache the benchmark must not hit.
+        """
+        full_name = f"{group}::{name}"
+        if self.only and not any(fnmatch.fnmatch(full_name, pattern) for pattern in self.only):
+            return
+
+        rounds = rounds or self.rounds
+        for _ in range(self.warmup):
+            if setup:
+                setup()
+            fn()
+
+        timings = []
+        queries = 0
+        for _ in range(rounds):
+            if setup:
+                setup()
+            with QueryCounter(self.engine) as counter:
+                start = time.perf_counter()
+                for _ in range(calls):
+                    fn()
+                timings.append((time.perf_counter() - start) / calls)
+            queries = counter.count / calls
+
+        stats = {
+            'min': min(timings),
+            'max': max(timings),
+            'mean': statistics.fmean(timings),
+            'median': statistics.median(timings),
+            'stddev': statistics.stdev(timings) if len(timings) > 1 else 0.0,
+            'rounds': rounds,
+            'iterations': calls,
+            'ops': 1 / statistics.fmean(timings) if any(timings) else math.inf,
+            'data': timings,
+        }
+        self.results.append({
+            'group': group,
+            'name': name,
+            'fullname': full_name,
+            'stats': stats,
+            'extra_info': {'queries_per_call': queries},
+        })
+        print(f"{full_name:<58} {stats['min'] * 1000:10.3f} {stats['median'] * 1000:10.3f} "
+              f"{stats['mean'] * 1000:10.3f} {stats['stddev'] * 1000:9.3f} {queries:8.1f}")
+
+
+def commit_info():
+    def git(*args):
+        try:
+            return subprocess.run(['git', *args], capture_output=True, text=True, check=True).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    return {
+        'id': git('rev-parse', 'HEAD'),
+        'dirty': bool(git('status', '--porcelain', '--untracked-files=no')),
+        'branch': git('rev-parse', '--abbrev-ref', 'HEAD'),
+    }
+
+
+def compare(results, baseline_path, threshold):
+    """Print the median change against a previous JSON file; return the regressed benchmarks."""
+    with open(baseline_path) as f:
+        baseline = {b['fullname']: b for b in json.load(f)['benchmarks']}
+
+    regressions = []
+    print(f"\nCompared with {baseline_path} (median, ms)")
+    for result in results:
+        old = baseline.get(result['fullname'])
+        new_median = result['stats']['median'] * 1000
+        if not old:
+            print(f"{result['fullname']:<58} {'-':>10} {new_median:10.3f}       new")
+            continue
+        old_median = old['stats']['median'] * 1000
+        change = (new_median - old_median) / old_median * 100 if old_median else 0.0
+        print(f"{result['fullname']:<58} {old_median:10.3f} {new_median:10.3f} {change:+8.1f}%")
+        if threshold is not None and change > threshold:
+            regressions.append(result['fullname'])
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--database-url', default=None, help='defaults to an in-memory SQLite database')
+    parser.add_argument('--students', type=int, default=10000)
+    parser.add_argument('--lecturers', type=int, default=500)
+    parser.add_argument('--classes', type=int, default=100)
+    parser.add_argument('--evaluations', type=int, default=1000000)
+    parser.add_argument('--reuse', action='store_true', help='keep an already seeded database')
+    parser.add_argument('--rounds', type=int, default=5)
+    parser.add_argument('--warmup', type=int, default=1)
+    parser.add_argument('--only', action='append', help='glob on "group::name", may be repeated')
+    parser.add_argument('--output', default=None, help='write the results as JSON')
+    parser.add_argument('--compare', default=None, help='JSON results of a previous run')
+    parser.add_argument('--fail-over', type=float, default=None,
+                        help='with --compare, exit 1 if a median got slower by more than this percentage')
+    args = parser.parse_args()
+
+    app = make_app(args.database_url, reset=not args.reuse)
+    client = app.test_client()
+
+    with app.app_context():
+        from flask_jwt_extended import create_access_token
+        from App import db
+        from App.models import Evaluation, ClassLecturer, Student, User, update_lecturer_score
+        from utils.data_version import bump_data_version
+        from utils.reference_data import score_answers
+        from utils.scores import rebuild_lecturer_scores
+        from utils.leaderboard import rebuild_leaderboard
+        from utils.weighted_scores import refresh_weighted_scores
+
+        if not (args.reuse and db.session.query(Evaluation.id).limit(1).scalar()):
+            print(f"Seeding {args.students} students, {args.lecturers} lecturers, "
+                  f"{args.evaluations} evaluations ...")
+            start = time.perf_counter()
+            seed_dataset(students=args.students, lecturers=args.lecturers,
+                         evaluations=args.evaluations, classes=args.classes)
+            rebuild_lecturer_scores()
+            rebuild_leaderboard()
+            print(f"Seeded in {time.perf_counter() - start:.1f} s")
+
+        student = db.session.get(Student, 10000)
+        assignment = ClassLecturer.query.filter_by(class_id=student.class_id).first()
+        evaluation_id = db.session.query(Evaluation.id).filter_by(student_id=student.nim).limit(1).scalar()
+        token = create_access_token(identity=str(student.nim), additional_claims={'role': 'student'})
+        student_headers = {'Authorization': 'Bearer ' + token}
+        admin = User.query.filter_by(username='bench-admin').first()
+        if not admin:
+            admin = User(username='bench-admin', email='bench-admin@example.com', password='x', role='admin')
+            db.session.add(admin)
+            db.session.commit()
+        admin_token = create_access_token(identity=str(admin.id), additional_claims={'role': 'admin'})
+        admin_headers = {'Authorization': 'Bearer ' + admin_token}
+        answers = {str(q): (q % 4) + 1 for q in range(1, 6)}
+        today = datetime.now().date()
+
+        def get(url, headers=None):
+            def run():
+                response = client.get(url, headers=headers)
+                assert response.status_code == 200, (url, response.status_code)
+            return run
+
+        def download(url, headers=None):
+            # Streamed responses are only generated while the body is read
+            def run():
+                response = client.get(url, headers=headers)
+                assert response.status_code == 200, (url, response.status_code)
+                response.get_data()
+            return run
+
+        def uncached():
+            # /lecturers/all serves a cached body until the data version changes
+            bump_data_version('lecturers')
+
+        backend_name = db.engine.url.get_backend_name()
+        suite = Suite(db.engine, rounds=args.rounds, warmup=args.warmup, only=args.only)
+        print(f"\n{'benchmark (ms)':<58} {'min':>10} {'median':>10} {'mean':>10} {'stddev':>9} {'queries':>8}")
+
+        # Score maintenance
+        suite.bench('scores', 'update_lecturer_score', lambda: update_lecturer_score(assignment.lecturer_id))
+        # update_lecturer_scores() (recompute of every lecturer) was replaced by rebuild_lecturer_scores()
+        suite.bench('scores', 'rebuild_lecturer_scores', rebuild_lecturer_scores,
+                    rounds=min(args.rounds, 3))
+        suite.bench('scores', 'score_answers', lambda: score_answers(answers.values()), calls=1000)
+        suite.bench('scores', 'refresh_weighted_scores (no drift)', refresh_weighted_scores)
+        suite.bench('scores', 'refresh_weighted_scores (force)', lambda: refresh_weighted_scores(force=True),
+                    setup=db.session.rollback)
+
+        # Submit / update scoring paths
+        suite.bench('submit', 'POST /api/submit-evaluation', lambda: client.post(
+            f'/api/submit-evaluation?lecturer_id={assignment.lecturer_id}&class_id={student.class_id}',
+            headers=student_headers, json={'answers': answers}))
+        suite.bench('submit', 'POST /api/submit-evaluations (10)', lambda: client.post(
+            '/api/submit-evaluations', headers=student_headers, json={'evaluations': [
+                {'lecturer_id': assignment.lecturer_id, 'class_id': student.class_id, 'answers': answers}
+            ] * 10}))
+        suite.bench('submit', 'PUT /api/student/evaluation/<id>', lambda: client.put(
+            f'/api/student/evaluation/{evaluation_id}', headers=student_headers,
+            json={'answers': [{'question_id': int(q), 'answer_id': a} for q, a in answers.items()]}))
+
+        # Leaderboard periods
+        for period in ('all', 'day', 'week', 'month', 'year'):
+            suite.bench('leaderboard', f'period={period}',
+                        get(f'/api/leaderboard/export?period={period}', student_headers))
+        suite.bench('leaderboard', 'period=custom (30 days)', get(
+            f'/api/leaderboard/export?period=custom&start_date={today - timedelta(days=30)}&end_date={today}',
+            student_headers))
+        suite.bench('leaderboard', 'GET /api/leaderboard/top', get('/api/leaderboard/top?n=10', student_headers))
+        suite.bench('leaderboard', 'GET /api/leaderboard/top?sort=weighted',
+                    get('/api/leaderboard/top?n=10&sort=weighted', student_headers))
+        suite.bench('leaderboard', 'GET /api/leaderboard/ranks (rank 50+)',
+                    get('/api/leaderboard/ranks?start_rank=50&limit=20', student_headers))
+        suite.bench('leaderboard', 'GET /api/leaderboard/lecturers/<nidn>/rank',
+                    get(f'/api/leaderboard/lecturers/{assignment.lecturer_id}/rank', student_headers))
+        suite.bench('leaderboard', 'rebuild_leaderboard', rebuild_leaderboard, rounds=min(args.rounds, 3))
+
+        # Query + JSON formatting loops
+        suite.bench('serialize', 'GET /lecturers/all', get('/lecturers/all'), setup=uncached)
+        suite.bench('serialize', 'GET /lecturers/all (cached body)', get('/lecturers/all'))
+        suite.bench('serialize', 'GET /lecturers', get('/lecturers', student_headers))
+        suite.bench('serialize', 'GET /api/my-lecturers', get('/api/my-lecturers', student_headers))
+        suite.bench('serialize', 'GET /api/student/evaluation-history',
+                    get('/api/student/evaluation-history', student_headers))
+        suite.bench('serialize', 'GET /api/student/evaluation/<id>',
+                    get(f'/api/student/evaluation/{evaluation_id}', student_headers))
+        suite.bench('serialize', 'GET /admin/export-leaderboard (xlsx)',
+                    download('/admin/export-leaderboard', admin_headers), rounds=min(args.rounds, 3))
+
+        # Question x lecturer answer distribution (admin dashboard matrix)
+        suite.bench('analytics', 'GET /admin/analytics/answer-distribution',
+                    get('/admin/analytics/answer-distribution', admin_headers),
+                    setup=lambda: bump_data_version('evaluations'))
+        suite.bench('analytics', 'GET /admin/analytics/answer-distribution (cached body)',
+                    get('/admin/analytics/answer-distribution', admin_headers))
+
+        # Raw evaluation export (one lecturer, so a round stays short on the 1M dataset)
+        for export_format in ('parquet', 'csv'):
+            suite.bench('export', f'GET /admin/export-evaluations ({export_format}, one lecturer)', download(
+                f'/admin/export-evaluations?format={export_format}&lecturer_id={assignment.lecturer_id}',
+                admin_headers), rounds=min(args.rounds, 3))
+
+    output = {
+        'machine_info': {
+            'python_version': platform.python_version(),
+            'python_implementation': platform.python_implementation(),
+            'machine': platform.machine(),
+            'system': platform.system(),
+            'processor': platform.processor(),
+        },
+        'commit_info': commit_info(),
+        'datetime': datetime.now().isoformat(),
+        'params': {
+            'database': backend_name,
+            'students': args.students,
+            'lecturers': args.lecturers,
+            'classes': args.classes,
+            'evaluations': args.evaluations,
+        },
+        'benchmarks': suite.results,
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(output, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+    if args.compare:
+        regressions = compare(suite.results, args.compare, args.fail_over)
+        if regressions:
+            print(f"FAIL: {len(regressions)} benchmark(s) slower than {args.fail_over}%: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""
+Compare the old per-row update_lecturer_score with the set-based version in App.models.
+
+    python -m benchmarks.bench_update_lecturer_score --evaluations 5000
+"""
+import argparse
+
+from benchmarks.common import make_app, seed_dataset, QueryCounter, timed
+
+
+def legacy_update_lecturer_score(lecturer_id):
+    """The previous implementation: one query per evaluation and per answer."""
+    from sqlalchemy import func
+    from App import db
+    from App.models import Evaluation, EvaluationAnswer, Answer, LecturerScore
+
+    evaluations = Evaluation.query.filter_by(lecturer_id=lecturer_id).all()
+    total_points = 0
+    total_possible_points = 0
+    count = len(evaluations)
+
+    max_point_answer = Answer.query.order_by(Answer.points.desc()).first()
+    max_points_per_question = max_point_answer.points if max_point_answer else 5.0
+
+    for eval in evaluations:
+        eval_answers = EvaluationAnswer.query.filter_by(evaluation_id=eval.id).all()
+        eval_points = 0
+        answer_count = 0
+        for ea in eval_answers:
+            answer = Answer.query.get(ea.answer_id)
+            if answer:
+                eval_points += answer.points
+                answer_count += 1
+        total_points += eval_points
+        total_possible_points += (answer_count * max_points_per_question)
+
+    average = min((total_points / total_possible_points) * 100, 100.0) if total_possible_points > 0 else 0
+
+    C = db.session.query(func.avg(Evaluation.score)).scalar() or 0
+    lecturer_counts = db.session.query(
+        Evaluation.lecturer_id,
+        func.count(Evaluation.id)
+    ).group_by(Evaluation.lecturer_id).all()
+    m = sum(c[1] for c in lecturer_counts) / len(lecturer_counts) if lecturer_counts else 0
+
+    v = count
+    weighted_score = (v / (v + m)) * average + (m / (v + m)) * C if v + m > 0 else 0
+
+    lecturer_score = LecturerScore.query.get(lecturer_id)
+    lecturer_score.average_score = average
+    lecturer_score.score_count = count
+    db.session.commit()
+    return average, count, weighted_score
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--database-url', default=None)
+    parser.add_argument('--evaluations', type=int, default=5000, help='evaluations for the measured lecturer')
+    args = parser.parse_args()
+
+    app = make_app(args.database_url)
+    with app.app_context():
+        from App import db
+        from App.models import LecturerScore, update_lecturer_score
+
+        # One lecturer carries all evaluations, as in the worst case described in the backlog
+        seed_dataset(students=200, lecturers=1, evaluations=args.evaluations)
+        lecturer_id = 2000
+        db.session.add(LecturerScore(lecturer_id=lecturer_id, average_score=0, score_count=0))
+        db.session.commit()
+        print(f"Seeded {args.evaluations} evaluations for lecturer {lecturer_id}")
+
+        with QueryCounter(db.engine) as legacy_queries, timed('legacy update_lecturer_score'):
+            legacy_update_lecturer_score(lecturer_id)
+        legacy = LecturerScore.query.get(lecturer_id)
+        legacy_result = (legacy.average_score, legacy.score_count)
+
+        with QueryCounter(db.engine) as new_queries, timed('set-based update_lecturer_score'):
+            update_lecturer_score(lecturer_id)
+        db.session.expire_all()
+        new = LecturerScore.query.get(lecturer_id)
+        new_result = (new.average_score, new.score_count)
+
+        print(f"queries: legacy={legacy_queries.count} set-based={new_queries.count}")
+        print(f"results: legacy={legacy_result} set-based={new_result}")
+        assert abs(legacy_result[0] - new_result[0]) < 1e-6 and legacy_result[1] == new_result[1], \
+            "set-based result differs from the legacy implementation"
+
+
+if __name__ == '__main__':
+    main()
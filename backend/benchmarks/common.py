@@ -0,0 +1,131 @@
+"""
+Shared helpers for the benchmark scripts in this folder.
+
+Run the scripts from the backend folder, e.g.
+    python -m benchmarks.bench_update_lecturer_score --evaluations 5000
+"""
+import os
+import sys
+import random
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+DEFAULT_DATABASE_URL = 'sqlite:///:memory:'
+
+
+def make_app(database_url=None, reset=True):
+    """
+    Create the Flask app against a benchmark database (must run before App is imported).
+    With reset=False existing tables and data are kept (missing tables are still created).
+    """
+    os.environ['SQLALCHEMY_DATABASE_URI'] = database_url or DEFAULT_DATABASE_URL
+    from App import create_app, db
+    app = create_app()
+    with app.app_context():
+        if reset:
+            db.drop_all()
+        db.create_all()
+    return app
+
+
+def seed_dataset(students=100, lecturers=10, evaluations=1000, answers_per_eval=5, classes=10, days=365):
+    """
+    Insert a synthetic dataset with multi-row inserts.
+    Evaluations are spread over lecturers and over the last ``days`` days.
+    """
+    from sqlalchemy import insert
+    from App import db
+    from App.models import (User, Class, Student, Lecturer, Course, ClassLecturer,
+                            Question, Answer, Evaluation, EvaluationAnswer)
+
+    rng = random.Random(42)
+    answer_choices = [("ya", 20), ("sering", 15), ("jarang", 10), ("tidak", 0)]
+
+    db.session.execute(insert(Answer), [
+        {'id': i + 1, 'text': text, 'points': points} for i, (text, points) in enumerate(answer_choices)
+    ])
+    db.session.execute(insert(Question), [
+        {'id': i + 1, 'text': f"Pertanyaan {i + 1}"} for i in range(answers_per_eval)
+    ])
+    db.session.execute(insert(Class), [
+        {'id': i + 1, 'name': f"IF-{i + 1}", 'semester': (i % 8) + 1, 'academic_year': '2024/2025'}
+        for i in range(classes)
+    ])
+    db.session.execute(insert(Course), [
+        {'id': i + 1, 'code': f"IF{i + 1:04d}", 'name': f"Mata Kuliah {i + 1}"} for i in range(classes)
+    ])
+    db.session.execute(insert(Lecturer), [
+        {'nidn': 2000 + i, 'name': f"Dosen {i}"} for i in range(lecturers)
+    ])
+    # Every class is taught by every lecturer through one course per class
+    db.session.execute(insert(ClassLecturer), [
+        {'id': c * lecturers + l + 1, 'class_id': c + 1, 'lecturer_id': 2000 + l, 'course_id': c + 1,
+         'semester': (c % 8) + 1, 'academic_year': '2024/2025'}
+        for c in range(classes) for l in range(lecturers)
+    ])
+    db.session.execute(insert(User), [
+        {'id': i + 1, 'username': f"student{i}", 'email': f"student{i}@example.com",
+         'password': 'x', 'role': 'student'}
+        for i in range(students)
+    ])
+    db.session.execute(insert(Student), [
+        {'nim': 10000 + i, 'name': f"Mahasiswa {i}", 'user_id': i + 1, 'class_id': (i % classes) + 1}
+        for i in range(students)
+    ])
+
+    now = datetime.now()
+    batch = 10000
+    for start in range(0, evaluations, batch):
+        eval_rows = []
+        answer_rows = []
+        for eid in range(start + 1, min(start + batch, evaluations) + 1):
+            student = rng.randrange(students)
+            class_id = (student % classes) + 1
+            lecturer = rng.randrange(lecturers)
+            picks = [rng.randrange(len(answer_choices)) for _ in range(answers_per_eval)]
+            score = sum(answer_choices[p][1] for p in picks) / (answers_per_eval * 20) * 100
+            eval_rows.append({
+                'id': eid, 'student_id': 10000 + student, 'lecturer_id': 2000 + lecturer,
+                'class_id': class_id, 'course_id': class_id, 'semester': ((class_id - 1) % 8) + 1,
+                'lecturer_class_id': (class_id - 1) * lecturers + lecturer + 1,
+                'score': score, 'created_at': now - timedelta(minutes=rng.randrange(days * 24 * 60))
+            })
+            answer_rows.extend({'evaluation_id': eid, 'question_id': q + 1, 'answer_id': p + 1}
+                               for q, p in enumerate(picks))
+        db.session.execute(insert(Evaluation), eval_rows)
+        db.session.execute(insert(EvaluationAnswer), answer_rows)
+    db.session.commit()
+
+
+class QueryCounter:
+    """Counts statements sent to the engine while active."""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.count = 0
+
+    def _on_execute(self, *args):
+        self.count += 1
+
+    def __enter__(self):
+        from sqlalchemy import event
+        event.listen(self.engine, 'before_cursor_execute', self._on_execute)
+        return self
+
+    def __exit__(self, *exc):
+        from sqlalchemy import event
+        event.remove(self.engine, 'before_cursor_execute', self._on_execute)
+
+
+@contextmanager
+def timed(label, results=None):
+    """Print (and optionally record) the wall time of the block in milliseconds."""
+    start = time.perf_counter()
+    yield
+    elapsed = (time.perf_counter() - start) * 1000
+    print(f"{label:<40} {elapsed:10.2f} ms")
+    if results is not None:
+        results[label] = elapsed
@@ -15,9 +15,13 @@ fi
 
 echo "📦 Migrasi database..."
 flask db upgrade
+flask apply-cascade-fks
 
 echo "🌱 Seeding data (jika belum ada)..."
 python seed.py
 
+echo "📊 Sinkronisasi skor dosen..."
+flask rebuild-scores
+
 echo "🚀 Menjalankan Gunicorn..."
-exec gunicorn --workers=3 --bind=0.0.0.0:5000 main:app
+exec gunicorn -c gunicorn.conf.py main:app
@@ -0,0 +1,71 @@
+# Konfigurasi Gunicorn (dipakai oleh entrypoint.sh)
+import os
+import shutil
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:5000')
+workers = int(os.getenv('GUNICORN_WORKERS', '3'))
+# Thread per worker: request lain tetap dilayani selagi login menunggu hasil bcrypt
+worker_class = 'gthread'
+threads = int(os.getenv('GUNICORN_THREADS', '4'))
+
+# Batas memori per worker (MB). Worker yang melewati batas diselesaikan setelah
+# request yang sedang berjalan lalu diganti worker baru oleh master.
+WORKER_MEMORY_LIMIT_MB = int(os.getenv('WORKER_MEMORY_LIMIT_MB', '256'))
+
+# Daur ulang worker secara berkala sebagai pengaman tambahan terhadap kebocoran memori
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', '2000'))
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', '200'))
+
+
+# Metrik Prometheus dari semua worker digabung lewat file di direktori ini (utils/metrics.py)
+os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', '/tmp/sispedon-prometheus')
+
+
+def on_starting(server):
+    # Sampel dari proses sebelumnya tidak boleh ikut terhitung
+    path = os.environ['PROMETHEUS_MULTIPROC_DIR']
+    shutil.rmtree(path, ignore_errors=True)
+    os.makedirs(path, exist_ok=True)
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
+
+
+def worker_rss_mb():
+    """Resident memory of the current process in MB (Linux)."""
+    with open('/proc/self/statm') as f:
+        resident_pages = int(f.read().split()[1])
+    return resident_pages * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+
+
+def post_request(worker, req, environ, resp):
+    if not WORKER_MEMORY_LIMIT_MB:
+        return
+    try:
+        rss = worker_rss_mb()
+    except OSError:
+        return
+    if rss > WORKER_MEMORY_LIMIT_MB:
+        worker.log.warning(
+            "Worker %s uses %.0f MB (limit %d MB), restarting", worker.pid, rss, WORKER_MEMORY_LIMIT_MB
+        )
+        worker.alive = False
+
+
+def post_worker_init(worker):
+    # Process pool bcrypt per worker (utils/passwords.py), di-fork sebelum thread worker dimulai
+    from utils.passwords import start_pool
+    start_pool()
+    # Drainer antrean submission (hanya jika SUBMISSION_QUEUE=true), setelah fork pool bcrypt
+    from utils.submission_queue import ensure_drainer
+    ensure_drainer(worker.wsgi)
+    # Refresh leaderboard_ranks di background, bukan di request baca (utils/leaderboard.py)
+    from utils.leaderboard import ensure_refresher
+    ensure_refresher(worker.wsgi)
+
+
+def worker_exit(server, worker):
+    from utils.passwords import shutdown_pool
+    shutdown_pool()
@@ -1,5 +1,3 @@
-from flask import Flask, request, jsonify
-import numpy as np
 from flask_cors import CORS
 from App import create_app#, db
 from App import models
@@ -9,4 +7,7 @@ app = create_app()
 CORS(app)
 
 if __name__ == '__main__':
+    # Di gunicorn dimulai oleh post_worker_init (gunicorn.conf.py)
+    from utils.leaderboard import ensure_refresher
+    ensure_refresher(app)
     app.run(host='0.0.0.0', port=5000, debug=True)
@@ -1,6 +1,7 @@
 from App import create_app, db
 from App.models import User, Student, Class, Lecturer, ClassLecturer, Course, Question, Answer, Evaluation, LecturerScore
 from utils.auth import generate_password_hash
+from utils.scores import rebuild_lecturer_scores
 from faker import Faker
 from datetime import datetime, timedelta
 import random
@@ -246,9 +247,13 @@ with app.app_context():
                 lecturer_score = LecturerScore(
                     lecturer_id=lecturer.nidn,
                     average_score=avg_score,
-                    score_count=len(lecturer_evals)
+                    score_count=len(lecturer_evals),
+                    score_sum=total_score
                 )
                 db.session.add(lecturer_score)
 
         db.session.commit()
+
+        # 11. Rollup harian untuk leaderboard per periode
+        rebuild_lecturer_scores()
         print("✅ Seed data created successfully.")
@@ -0,0 +1,94 @@
+from App import db
+from App.models import Class, Course, Evaluation, EvaluationAnswer, Lecturer, Question
+from sqlalchemy import func
+from utils.reference_data import get_reference_data
+
+# Answer distribution per question for every lecturer, course or class: how
+# often each answer choice was picked, plus mean and (population) standard
+# deviation of the answer points. The counts come from one GROUP BY over
+# evaluation_answers; the statistics are computed on a
+# (groups x questions x answers) count array with NumPy.
+
+# group_by -> (kolom grup di evaluations, kolom id dan nama untuk label)
+GROUPINGS = {
+    'lecturer': (Evaluation.lecturer_id, Lecturer.nidn, Lecturer.name),
+    'course': (Evaluation.course_id, Course.id, Course.name),
+    'class': (Evaluation.class_id, Class.id, Class.name),
+}
+
+
+def _rounded(values, present):
+    return [round(value, 4) if ok else None for value, ok in zip(values, present)]
+
+
+def answer_distribution(group_by='lecturer', group_id=None):
+    """
+    Matrix payload for the admin dashboard. ``questions`` and ``answers`` fix
+    the order of the per-group arrays: ``counts[q][a]`` is how often answer
+    ``a`` was given to question ``q``; ``responses``, ``mean`` and ``std``
+    are per question (mean/std in answer points, None without responses).
+    """
+    # Diimpor di sini: numpy berat dan hanya dipakai endpoint analitik admin
+    import numpy as np
+
+    group_column, id_column, name_column = GROUPINGS[group_by]
+    reference = get_reference_data()
+
+    query = db.session.query(
+        group_column, EvaluationAnswer.question_id, EvaluationAnswer.answer_id, func.count()
+    ).join(Evaluation, Evaluation.id == EvaluationAnswer.evaluation_id) \
+        .filter(group_column.isnot(None), EvaluationAnswer.question_id.isnot(None),
+                EvaluationAnswer.answer_id.isnot(None))
+    if group_id is not None:
+        query = query.filter(group_column == group_id)
+    rows = query.group_by(group_column, EvaluationAnswer.question_id, EvaluationAnswer.answer_id).all()
+
+    # Urutan jawaban: poin tertinggi dulu (Ya, Sering, Jarang, Tidak)
+    answer_ids = sorted(reference.answer_points, key=lambda a: (-reference.answer_points[a], a))
+    answer_texts = {choice['id']: choice['text'] for choice in reference.answer_choices}
+    payload = {
+        'group_by': group_by,
+        'answers': [{'id': a, 'text': answer_texts.get(a), 'points': reference.answer_points[a]}
+                    for a in answer_ids],
+        'max_points': reference.max_points,
+        'questions': [],
+        'groups': [],
+    }
+    data = np.array(rows, dtype=np.int64).reshape(-1, 4)
+    # Jawaban yang tidak (lagi) ada di tabel answers tidak punya poin
+    data = data[np.isin(data[:, 2], answer_ids)]
+    if not len(data):
+        return payload
+
+    group_ids, group_index = np.unique(data[:, 0], return_inverse=True)
+    question_ids, question_index = np.unique(data[:, 1], return_inverse=True)
+    answer_order = np.array(answer_ids, dtype=np.int64)
+    sorter = np.argsort(answer_order)
+    answer_index = sorter[np.searchsorted(answer_order, data[:, 2], sorter=sorter)]
+
+    counts = np.zeros((len(group_ids), len(question_ids), len(answer_ids)), dtype=np.int64)
+    counts[group_index, question_index, answer_index] = data[:, 3]
+    points = np.array([reference.answer_points[a] for a in answer_ids], dtype=np.float64)
+
+    responses = counts.sum(axis=2)
+    present = responses > 0
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = (counts @ points) / responses
+        variance = (counts @ (points ** 2)) / responses - mean ** 2
+    std = np.sqrt(np.clip(variance, 0, None))
+
+    texts = dict(db.session.query(Question.id, Question.text).filter(Question.id.in_(question_ids.tolist())))
+    names = dict(db.session.query(id_column, name_column).filter(id_column.in_(group_ids.tolist())))
+    payload['questions'] = [{'id': q, 'text': texts.get(q)} for q in question_ids.tolist()]
+
+    counts_list, responses_list = counts.tolist(), responses.tolist()
+    mean_list, std_list, present_list = mean.tolist(), std.tolist(), present.tolist()
+    payload['groups'] = [{
+        'id': group,
+        'name': names.get(group),
+        'responses': responses_list[i],
+        'counts': counts_list[i],
+        'mean': _rounded(mean_list[i], present_list[i]),
+        'std': _rounded(std_list[i], present_list[i]),
+    } for i, group in enumerate(group_ids.tolist())]
+    return payload
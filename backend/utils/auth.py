@@ -1,13 +1,13 @@
 import jwt
 from flask import request, jsonify
 from functools import wraps
-from App.models import User
+from utils.principal import load_user_principal
 import os
-from App import bcrypt
+from utils.passwords import hash_password
 
-# Hash password
+# Hash password (di process pool bcrypt bila berjalan di gunicorn)
 def generate_password_hash(plain_password):
-    return bcrypt.generate_password_hash(plain_password).decode('utf-8')
+    return hash_password(plain_password)
 SECRET_KEY = os.getenv('SECRET_KEY', 'default_secret_key')
 
 def token_required(f):
@@ -24,7 +24,8 @@ def token_required(f):
 
         try:
             data = jwt.decode(token, SECRET_KEY, algorithms=['HS256'])
-            current_user = User.query.get(data['sub'])
+            # Principal dari cache per worker; query ke DB hanya saat cache miss
+            current_user = load_user_principal(data['sub'])
             if not current_user:
                 return jsonify({'message': 'User not found!'}), 401
         except jwt.ExpiredSignatureError:
@@ -0,0 +1,173 @@
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from itertools import chain
+from flask import request, current_app
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from utils.db_routing import replica_used, reset_replica_used
+
+# Data-version counters shared by all gunicorn workers of the container.
+# Every committed write to a table bumps the version of its scope; public
+# read endpoints derive their ETag from those versions, so answering a
+# conditional GET needs no database round trip.
+#
+# Each scope is a small file holding an opaque token; bumping replaces the
+# file atomically, reading it is a single local read.
+
+TABLE_SCOPES = {
+    'evaluations': 'evaluations',
+    'evaluation_answers': 'evaluations',
+    'lecturer_scores': 'evaluations',
+    'lecturer_daily_scores': 'evaluations',
+    'lecturers': 'lecturers',
+    'class_lecturers': 'lecturers',
+    'courses': 'lecturers',
+    'questions': 'questions',
+    'answers': 'questions',
+    'users': 'principals',
+    'students': 'principals',
+    'classes': 'principals',
+}
+
+# Jumlah body yang disimpan conditional_get per worker (LRU)
+BODY_CACHE_SIZE = int(os.getenv('BODY_CACHE_SIZE', '64'))
+
+_SESSION_KEY = 'data_version_scopes'
+_lock = threading.Lock()
+_body_cache = OrderedDict()
+_directory = None
+
+
+def _version_dir():
+    global _directory
+    if _directory is None:
+        path = os.getenv('DATA_VERSION_DIR') or os.path.join(tempfile.gettempdir(), 'sispedon-data-version')
+        os.makedirs(path, exist_ok=True)
+        _directory = path
+    return _directory
+
+
+def current_version(scope):
+    """Opaque token that changes whenever data in ``scope`` changes."""
+    path = os.path.join(_version_dir(), scope)
+    try:
+        with open(path) as f:
+            return f.read()
+    except FileNotFoundError:
+        # First use in this container: start from a fresh token, never a fixed one,
+        # so ETags handed out before a restart cannot match different data
+        bump_data_version(scope)
+        with open(path) as f:
+            return f.read()
+
+
+def set_data_version(scope, token):
+    """Store ``token`` as the version of ``scope`` (e.g. to remember which version a derived table was built from)."""
+    path = os.path.join(_version_dir(), scope)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}"
+    with open(tmp_path, 'w') as f:
+        f.write(token)
+    os.replace(tmp_path, path)
+
+
+def bump_data_version(*scopes):
+    """Mark ``scopes`` as changed (for writes that bypass the ORM session)."""
+    token = f"{time.time_ns()}-{os.getpid()}-{threading.get_ident()}"
+    for scope in scopes:
+        set_data_version(scope, token)
+
+
+def _track(session, table_name):
+    scope = TABLE_SCOPES.get(table_name)
+    if scope:
+        session.info.setdefault(_SESSION_KEY, set()).add(scope)
+
+
+@event.listens_for(Session, 'before_flush')
+def _track_flush(session, flush_context, instances):
+    for obj in chain(session.new, session.dirty, session.deleted):
+        _track(session, getattr(obj, '__tablename__', None))
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _track_bulk(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        table = getattr(orm_execute_state.statement, 'table', None)
+        _track(orm_execute_state.session, getattr(table, 'name', None))
+
+
+@event.listens_for(Session, 'after_commit')
+def _bump_on_commit(session):
+    scopes = session.info.pop(_SESSION_KEY, None)
+    if scopes:
+        bump_data_version(*scopes)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_on_rollback(session):
+    session.info.pop(_SESSION_KEY, None)
+
+
+def conditional_get(*scopes, max_age=0, private=False, query_args=()):
+    """
+    Strong ETag / 304 handling for endpoints whose payload only depends on
+    the data versions of ``scopes`` (same body for every caller).
+
+    The serialized body is also kept per worker (bounded LRU of
+    BODY_CACHE_SIZE entries), so a new client gets the cached bytes until one
+    of the scopes changes. Bodies are keyed on the endpoint and the values of
+    ``query_args``, the only query parameters the view reads; anything else
+    in the query string is ignored. A body that was (partly)
+    read from the read replica is neither cached nor given an ETag: the
+    replica may still lag behind the versions the ETag is derived from.
+
+    ``private=True`` is for authenticated (admin) endpoints: shared caches
+    must not store the response, only the caller's own browser.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            key = (request.endpoint, tuple(request.args.get(arg) for arg in query_args))
+            versions = '|'.join(current_version(scope) for scope in scopes)
+            etag = hashlib.sha1(f"{key}|{versions}".encode()).hexdigest()
+            visibility = 'private' if private else 'public'
+            cache_control = f"{visibility}, max-age={max_age}, must-revalidate"
+
+            if request.if_none_match.contains(etag):
+                response = current_app.response_class(status=304)
+            else:
+                with _lock:
+                    cached = _body_cache.get(key)
+                    if cached and cached[0] == etag:
+                        _body_cache.move_to_end(key)
+                    elif cached:
+                        # Versi lama: buang sekarang, jangan tunggu tergeser LRU
+                        del _body_cache[key]
+                        cached = None
+                if cached:
+                    response = current_app.response_class(cached[1], mimetype=cached[2])
+                else:
+                    from App import db
+                    reset_replica_used(db.session)
+                    response = current_app.make_response(f(*args, **kwargs))
+                    if response.status_code != 200:
+                        return response
+                    if replica_used(db.session):
+                        response.headers['Cache-Control'] = 'private, no-store' if private else 'no-cache'
+                        return response
+                    with _lock:
+                        _body_cache[key] = (etag, response.get_data(), response.mimetype)
+                        _body_cache.move_to_end(key)
+                        while len(_body_cache) > BODY_CACHE_SIZE:
+                            _body_cache.popitem(last=False)
+
+            response.set_etag(etag)
+            response.headers['Cache-Control'] = cache_control
+            return response
+        return decorated
+    return decorator
@@ -0,0 +1,23 @@
+from datetime import timezone
+import pytz
+
+# Zona waktu tampilan (WIB). Dibuat sekali per proses, bukan per request.
+WIB = pytz.timezone('Asia/Jakarta')
+WIB_DISPLAY_FORMAT = '%d %B %Y pukul %H:%M WIB'
+
+
+def to_wib(dt):
+    """Convert a datetime to WIB; naive values from the database are taken as UTC."""
+    if dt is None:
+        return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)  # anggap ini UTC
+    return dt.astimezone(WIB)
+
+
+def format_wib(dt):
+    """Return (ISO string, display string) in WIB for a datetime, or (None, None)."""
+    dt = to_wib(dt)
+    if dt is None:
+        return None, None
+    return dt.isoformat(), dt.strftime(WIB_DISPLAY_FORMAT)
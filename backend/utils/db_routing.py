@@ -0,0 +1,145 @@
+import hashlib
+import os
+import tempfile
+import time
+from functools import wraps
+from flask import has_request_context
+from flask_jwt_extended import get_jwt, get_jwt_identity
+from flask_sqlalchemy.session import Session as FlaskSession
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+# Read/write routing between the primary database and an optional read
+# replica (SQLALCHEMY_REPLICA_URI, bind 'replica'). Endpoints decorated with
+# @read_replica send their plain SELECTs to the replica; every write, every
+# SELECT ... FOR UPDATE and everything after the first write of the request
+# stays on the primary. Without a configured replica nothing changes.
+#
+# Read-your-writes: when a request of an authenticated user commits a write,
+# a marker for that user is touched in a directory shared by the workers.
+# For REPLICA_STICKY_SECONDS afterwards that user's reads stay on the
+# primary, so a student sees their evaluation right after submitting it
+# even while the replica is still catching up.
+
+REPLICA_BIND = 'replica'
+REPLICA_STICKY_SECONDS = float(os.getenv('REPLICA_STICKY_SECONDS', '30'))
+
+_READ_KEY = 'read_replica'
+_WROTE_KEY = 'wrote'
+_USED_KEY = 'replica_used'
+_marker_dir = None
+
+
+class RoutingSession(FlaskSession):
+    """Flask-SQLAlchemy session that can send read-only statements to the replica bind."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and self.info.get(_READ_KEY) and not self.info.get(_WROTE_KEY) \
+                and not self._flushing and _is_plain_select(clause):
+            engine = self._db.engines.get(REPLICA_BIND)
+            if engine is not None:
+                self.info[_USED_KEY] = True
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def reset_replica_used(session):
+    """Forget earlier replica reads of ``session``; see replica_used()."""
+    session.info.pop(_USED_KEY, None)
+
+
+def replica_used(session):
+    """True if a statement of ``session`` was sent to the replica since reset_replica_used()."""
+    return bool(session.info.get(_USED_KEY))
+
+
+def _is_plain_select(clause):
+    return clause is not None and getattr(clause, 'is_select', False) \
+        and getattr(clause, '_for_update_arg', None) is None
+
+
+def _marker_path(identity):
+    global _marker_dir
+    if _marker_dir is None:
+        path = os.getenv('REPLICA_MARKER_DIR') or os.path.join(tempfile.gettempdir(), 'sispedon-recent-writes')
+        os.makedirs(path, exist_ok=True)
+        _marker_dir = path
+    return os.path.join(_marker_dir, hashlib.sha1(identity.encode('utf-8')).hexdigest())
+
+
+def _request_identity():
+    """'<role>:<identity>' of the JWT of the current request, or None (no token verified)."""
+    if not has_request_context():
+        return None
+    try:
+        identity = get_jwt_identity()
+        role = get_jwt().get('role')
+    except RuntimeError:
+        return None
+    return f"{role}:{identity}" if identity is not None else None
+
+
+def mark_recent_write(identity):
+    path = _marker_path(identity)
+    with open(path, 'a'):
+        os.utime(path)
+
+
+def has_recent_write(identity):
+    try:
+        return time.time() - os.stat(_marker_path(identity)).st_mtime < REPLICA_STICKY_SECONDS
+    except FileNotFoundError:
+        return False
+
+
+def read_replica(f):
+    """
+    Route the read queries of an endpoint to the replica, unless the caller
+    wrote something in the last REPLICA_STICKY_SECONDS. Put it below
+    @jwt_required / @admin_required so the caller is known.
+    """
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        from App import db
+        if REPLICA_BIND not in db.engines:
+            return f(*args, **kwargs)
+        identity = _request_identity()
+        if identity is not None and has_recent_write(identity):
+            return f(*args, **kwargs)
+
+        db.session.info[_READ_KEY] = True
+        try:
+            return f(*args, **kwargs)
+        finally:
+            db.session.info.pop(_READ_KEY, None)
+    return decorated
+
+
+@event.listens_for(Session, 'before_flush')
+def _track_flush(session, flush_context, instances):
+    if session.new or session.dirty or session.deleted:
+        session.info[_WROTE_KEY] = True
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _track_bulk(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        orm_execute_state.session.info[_WROTE_KEY] = True
+
+
+@event.listens_for(Session, 'after_commit')
+def _mark_on_commit(session):
+    if not session.info.pop(_WROTE_KEY, None):
+        return
+    # Sisa request ini juga membaca dari primary
+    session.info.pop(_READ_KEY, None)
+    engines = getattr(getattr(session, '_db', None), 'engines', {})
+    if REPLICA_BIND in engines:
+        identity = _request_identity()
+        if identity is not None:
+            mark_recent_write(identity)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_on_rollback(session):
+    session.info.pop(_WROTE_KEY, None)
@@ -0,0 +1,126 @@
+from sqlalchemy import delete, inspect, or_, select
+from App import db
+from App.models import (Class, ClassLecturer, Course, Evaluation, EvaluationAnswer, LeaderboardRank,
+                        Lecturer, LecturerDailyScore, LecturerScore)
+from utils.scores import refresh_lecturer_aggregates
+
+# Deleting a lecturer, class, course, teaching assignment or the evaluations
+# of a student together with everything that depends on it.
+#
+# The foreign keys carry ON DELETE CASCADE (models + apply_cascade_foreign_keys
+# for existing PostgreSQL databases), but the service still deletes the
+# children explicitly, deepest first, so it behaves the same on SQLite, where
+# foreign keys are not enforced. Every delete is one set-based statement
+# (answers via a subquery on the evaluations), so the statement count does not
+# depend on how many evaluations are removed. Lecturer aggregates of the
+# affected lecturers are recomputed in the same transaction; the caller commits.
+
+
+def _delete_evaluations(criterion):
+    """Delete the evaluations matching ``criterion`` and their answers. Returns (lecturer ids, count)."""
+    lecturer_ids = [lecturer_id for (lecturer_id,) in
+                    db.session.query(Evaluation.lecturer_id).filter(criterion).distinct()]
+    db.session.execute(
+        delete(EvaluationAnswer)
+        .where(EvaluationAnswer.evaluation_id.in_(select(Evaluation.id).where(criterion)))
+        .execution_options(synchronize_session=False)
+    )
+    deleted = db.session.execute(
+        delete(Evaluation).where(criterion).execution_options(synchronize_session=False)
+    ).rowcount
+    return lecturer_ids, deleted
+
+
+def _delete_assignments(criterion):
+    return db.session.execute(
+        delete(ClassLecturer).where(criterion).execution_options(synchronize_session=False)
+    ).rowcount
+
+
+def _delete_with_assignments(evaluation_criterion, assignment_criterion):
+    """Evaluations (own or through the matching teaching assignments), then the assignments."""
+    assignment_ids = select(ClassLecturer.id).where(assignment_criterion)
+    lecturer_ids, evaluations = _delete_evaluations(
+        or_(evaluation_criterion, Evaluation.lecturer_class_id.in_(assignment_ids)))
+    assignments = _delete_assignments(assignment_criterion)
+    refresh_lecturer_aggregates(lecturer_ids)
+    return {'evaluations': evaluations, 'teaching_assignments': assignments}
+
+
+def delete_assignment(assignment_id):
+    """Delete a teaching assignment and its evaluations."""
+    lecturer_ids, evaluations = _delete_evaluations(Evaluation.lecturer_class_id == assignment_id)
+    assignments = _delete_assignments(ClassLecturer.id == assignment_id)
+    refresh_lecturer_aggregates(lecturer_ids)
+    return {'evaluations': evaluations, 'teaching_assignments': assignments}
+
+
+def delete_class(class_id):
+    """Delete a class with its teaching assignments and evaluations. Students must be moved out first."""
+    counts = _delete_with_assignments(Evaluation.class_id == class_id, ClassLecturer.class_id == class_id)
+    db.session.execute(delete(Class).where(Class.id == class_id).execution_options(synchronize_session=False))
+    return counts
+
+
+def delete_course(course_id):
+    """Delete a course with its teaching assignments and evaluations."""
+    counts = _delete_with_assignments(Evaluation.course_id == course_id, ClassLecturer.course_id == course_id)
+    db.session.execute(delete(Course).where(Course.id == course_id).execution_options(synchronize_session=False))
+    return counts
+
+
+def delete_lecturer(nidn):
+    """Delete a lecturer with assignments, evaluations, score aggregates and leaderboard row."""
+    # Evaluasi lewat penugasan dosen ini selalu membawa lecturer_id yang sama,
+    # jadi cukup index lecturer_id; agregat dosen ini dihapus, tidak dihitung ulang
+    _, evaluations = _delete_evaluations(Evaluation.lecturer_id == nidn)
+    assignments = _delete_assignments(ClassLecturer.lecturer_id == nidn)
+    for model in (LecturerDailyScore, LecturerScore, LeaderboardRank):
+        db.session.execute(delete(model).where(model.lecturer_id == nidn)
+                           .execution_options(synchronize_session=False))
+    db.session.execute(delete(Lecturer).where(Lecturer.nidn == nidn).execution_options(synchronize_session=False))
+    return {'evaluations': evaluations, 'teaching_assignments': assignments}
+
+
+def delete_student_evaluations(nim):
+    """Delete the evaluations a student submitted (before deleting the student)."""
+    lecturer_ids, evaluations = _delete_evaluations(Evaluation.student_id == nim)
+    refresh_lecturer_aggregates(lecturer_ids)
+    return {'evaluations': evaluations}
+
+
+def apply_cascade_foreign_keys():
+    """
+    Migrate the foreign keys of an existing PostgreSQL database to the
+    ON DELETE CASCADE declared in the models (drop + re-add, one transaction).
+    Idempotent; returns the names of the constraints that were changed.
+    """
+    engine = db.engine
+    if engine.dialect.name != 'postgresql':
+        # SQLite tidak bisa ALTER constraint; tabel baru dari create_all sudah ikut model
+        return []
+
+    quote = engine.dialect.identifier_preparer.quote
+    inspector = inspect(engine)
+    changed = []
+    for table in db.metadata.sorted_tables:
+        existing = inspector.get_foreign_keys(table.name)
+        for constraint in table.foreign_key_constraints:
+            if (constraint.ondelete or '').upper() != 'CASCADE':
+                continue
+            columns = [column.name for column in constraint.columns]
+            for fk in existing:
+                if fk['constrained_columns'] != columns or fk['referred_table'] != constraint.referred_table.name:
+                    continue
+                if (fk.get('options', {}).get('ondelete') or '').upper() == 'CASCADE':
+                    continue
+                db.session.execute(db.text(
+                    f"ALTER TABLE {quote(table.name)} DROP CONSTRAINT {quote(fk['name'])}"))
+                db.session.execute(db.text(
+                    f"ALTER TABLE {quote(table.name)} ADD CONSTRAINT {quote(fk['name'])} "
+                    f"FOREIGN KEY ({', '.join(quote(c) for c in columns)}) "
+                    f"REFERENCES {quote(fk['referred_table'])} ({', '.join(quote(c) for c in fk['referred_columns'])}) "
+                    f"ON DELETE CASCADE"))
+                changed.append(fk['name'])
+    db.session.commit()
+    return changed
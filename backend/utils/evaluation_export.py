@@ -0,0 +1,156 @@
+import csv
+import io
+import zlib
+from sqlalchemy import select
+from App import db
+from App.models import Answer, ClassLecturer, Course, Evaluation, EvaluationAnswer, Question
+
+# Export of the raw evaluation data for analysis: one row per answered
+# question (evaluation_answers joined with the evaluation, the answer, the
+# question, the teaching assignment and the course).
+#
+# The rows are read through a server-side cursor (yield_per) and written
+# chunk by chunk, either as Parquet (one row group per chunk) or as a gzip
+# CSV stream, so memory stays bounded by EXPORT_CHUNK_SIZE rows no matter how
+# many answers are exported.
+
+EXPORT_CHUNK_SIZE = 50000
+FORMATS = ('parquet', 'csv')
+MIME_TYPES = {'parquet': 'application/vnd.apache.parquet', 'csv': 'application/gzip'}
+EXTENSIONS = {'parquet': 'parquet', 'csv': 'csv.gz'}
+
+# (nama kolom, tipe Arrow, ekspresi SQL)
+COLUMNS = [
+    ('evaluation_id', 'int64', Evaluation.id),
+    ('created_at', 'timestamp', Evaluation.created_at),
+    ('academic_year', 'string', ClassLecturer.academic_year),
+    ('semester', 'int32', Evaluation.semester),
+    ('class_id', 'int32', Evaluation.class_id),
+    ('lecturer_id', 'int64', Evaluation.lecturer_id),
+    ('student_id', 'int64', Evaluation.student_id),
+    ('course_id', 'int32', Evaluation.course_id),
+    ('course_code', 'string', Course.code),
+    ('course_name', 'string', Course.name),
+    ('evaluation_score', 'float64', Evaluation.score),
+    ('question_id', 'int32', EvaluationAnswer.question_id),
+    ('question_text', 'string', Question.text),
+    ('answer_id', 'int32', EvaluationAnswer.answer_id),
+    ('answer_text', 'string', Answer.text),
+    ('answer_points', 'float64', Answer.points),
+]
+COLUMN_NAMES = [name for name, _, _ in COLUMNS]
+
+
+def export_statement(academic_year=None, semester=None, class_id=None, lecturer_id=None):
+    """SELECT of the export rows, filtered by academic year, semester, class and lecturer."""
+    statement = select(*[column.label(name) for name, _, column in COLUMNS]) \
+        .select_from(EvaluationAnswer) \
+        .join(Evaluation, Evaluation.id == EvaluationAnswer.evaluation_id) \
+        .outerjoin(Answer, Answer.id == EvaluationAnswer.answer_id) \
+        .outerjoin(Question, Question.id == EvaluationAnswer.question_id) \
+        .outerjoin(ClassLecturer, ClassLecturer.id == Evaluation.lecturer_class_id) \
+        .outerjoin(Course, Course.id == Evaluation.course_id)
+
+    if academic_year:
+        statement = statement.where(ClassLecturer.academic_year == academic_year)
+    if semester is not None:
+        statement = statement.where(Evaluation.semester == semester)
+    if class_id is not None:
+        statement = statement.where(Evaluation.class_id == class_id)
+    if lecturer_id is not None:
+        statement = statement.where(Evaluation.lecturer_id == lecturer_id)
+    return statement
+
+
+def export_chunks(statement, chunk_size=EXPORT_CHUNK_SIZE):
+    """Execute ``statement`` with a server-side cursor; yields lists of at most ``chunk_size`` rows."""
+    # Core-Result lewat koneksi session (replica bila @read_replica aktif): tanpa pemrosesan baris ORM
+    connection = db.session.connection(bind_arguments={'clause': statement})
+    result = connection.execute(statement.execution_options(yield_per=chunk_size))
+    return result.partitions()
+
+
+class _ChunkSink:
+    """Write-only file object for ParquetWriter; collects bytes until drained."""
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def writable(self):
+        return True
+
+    def seekable(self):
+        return False
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def arrow_schema():
+    import pyarrow as pa
+    types = {'int32': pa.int32(), 'int64': pa.int64(), 'float64': pa.float64(),
+             'string': pa.string(), 'timestamp': pa.timestamp('us')}
+    return pa.schema([(name, types[kind]) for name, kind, _ in COLUMNS])
+
+
+def stream_parquet(chunks):
+    """Parquet file as byte chunks, one row group per chunk of rows."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = arrow_schema()
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema, compression='zstd')
+    try:
+        for rows in chunks:
+            columns = list(zip(*rows))
+            batch = pa.RecordBatch.from_arrays(
+                [pa.array(values, type=field.type) for values, field in zip(columns, schema)],
+                schema=schema)
+            writer.write_batch(batch, row_group_size=len(rows))
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+def stream_csv_gzip(chunks):
+    """Gzip-compressed CSV (header + rows) as byte chunks, compressed one chunk of rows at a time."""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits 31: format gzip
+    text = io.StringIO()
+    writer = csv.writer(text)
+    writer.writerow(COLUMN_NAMES)
+    for rows in chunks:
+        writer.writerows(rows)
+        data = compressor.compress(text.getvalue().encode('utf-8'))
+        text.seek(0)
+        text.truncate()
+        if data:
+            yield data
+    yield compressor.compress(text.getvalue().encode('utf-8')) + compressor.flush()
+
+
+def parquet_available():
+    try:
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        return False
+    return True
@@ -0,0 +1,109 @@
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from sqlalchemy import delete, func, insert, literal, select
+from App import db
+from App.models import LecturerScore, LeaderboardRank
+from utils.data_version import current_version, set_data_version
+from utils.weighted_scores import refresh_weighted_scores
+
+# The overall leaderboard is materialized in leaderboard_ranks with a dense
+# rank per lecturer, so top-N, pages of ranks and "rank of lecturer X" are
+# plain index lookups. The table is rebuilt from lecturer_scores in one
+# INSERT ... SELECT with dense_rank(); readers keep seeing the previous
+# ranking until the rebuild commits.
+#
+# Read endpoints never write: a background thread in every worker checks
+# every LEADERBOARD_REFRESH_SECONDS whether the 'evaluations' data version
+# moved since the last rebuild and refreshes on the primary (one process at a
+# time). `flask refresh-leaderboard` (cron) and `flask rebuild-scores` refresh
+# unconditionally. Every refresh also lets utils/weighted_scores.py check
+# whether the Bayesian prior (C, m) drifted.
+
+LEADERBOARD_REFRESH_SECONDS = float(os.getenv('LEADERBOARD_REFRESH_SECONDS', '60'))
+# Versi 'evaluations' yang menjadi sumber isi leaderboard_ranks saat ini
+SOURCE_SCOPE = 'leaderboard_source'
+# Kunci advisory PostgreSQL: hanya satu proses yang me-refresh sekaligus
+ADVISORY_LOCK_KEY = 720190
+
+logger = logging.getLogger(__name__)
+
+_refresher = None
+_refresher_lock = threading.Lock()
+
+
+def refresh_leaderboard():
+    """Rebuild leaderboard_ranks (and stale weighted scores) from lecturer_scores (caller commits). Returns False if another process is refreshing."""
+    if db.engine.dialect.name == 'postgresql':
+        # Selalu di primary (bind eksplisit), juga bila session sedang dirutekan ke replica
+        acquired = db.session.execute(
+            select(func.pg_try_advisory_xact_lock(ADVISORY_LOCK_KEY)),
+            bind_arguments={'bind': db.engine}
+        ).scalar()
+        if not acquired:
+            return False
+
+    # C dan m ikut diperiksa; weighted score semua dosen dihitung ulang bila bergeser
+    refresh_weighted_scores()
+
+    ranked = select(
+        LecturerScore.lecturer_id,
+        func.dense_rank().over(order_by=LecturerScore.average_score.desc()),
+        LecturerScore.average_score,
+        LecturerScore.score_count,
+        literal(datetime.now(), db.DateTime)
+    ).where(LecturerScore.score_count > 0, LecturerScore.average_score.isnot(None))
+
+    db.session.execute(delete(LeaderboardRank))
+    db.session.execute(insert(LeaderboardRank).from_select(
+        ['lecturer_id', 'rank', 'average_score', 'score_count', 'refreshed_at'], ranked))
+    return True
+
+
+def rebuild_leaderboard():
+    """Refresh and commit now; records the evaluations version the ranking reflects."""
+    source = current_version('evaluations')
+    try:
+        if not refresh_leaderboard():
+            db.session.rollback()
+            return False
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error refreshing leaderboard: {str(e)}")
+        return False
+    set_data_version(SOURCE_SCOPE, source)
+    return True
+
+
+def refresh_if_stale():
+    """Rebuild the leaderboard if evaluations changed since the last rebuild. Returns True if rebuilt."""
+    if current_version(SOURCE_SCOPE) == current_version('evaluations'):
+        return False
+    return rebuild_leaderboard()
+
+
+def _refresh_loop(app):
+    while True:
+        time.sleep(LEADERBOARD_REFRESH_SECONDS)
+        try:
+            with app.app_context():
+                refresh_if_stale()
+                db.session.remove()
+        except Exception:
+            # Gagal (mis. database restart): dicoba lagi pada putaran berikutnya
+            logger.exception('Refreshing the leaderboard failed')
+
+
+def ensure_refresher(app):
+    """Start the background leaderboard refresher of this worker (once)."""
+    global _refresher
+    if LEADERBOARD_REFRESH_SECONDS <= 0 or (_refresher is not None and _refresher.is_alive()):
+        return
+    with _refresher_lock:
+        if _refresher is None or not _refresher.is_alive():
+            _refresher = threading.Thread(target=_refresh_loop, args=(app,), name='leaderboard-refresher',
+                                          daemon=True)
+            _refresher.start()
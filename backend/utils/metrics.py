@@ -0,0 +1,171 @@
+import hmac
+import os
+import time
+from flask import Response, g, has_request_context, request
+from prometheus_client import (CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram,
+                               REGISTRY, generate_latest, multiprocess)
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeout
+
+# Request and database metrics in Prometheus format, served at GET /metrics.
+#
+# - request latency per endpoint (Flask endpoint name, so the label set stays bounded)
+# - per request: number of SQL statements, total SQL time and rows reported by the driver
+# - per bind: connection pool checkouts, connections in use, overflow and time spent
+#   waiting for a free connection (plus checkout timeouts)
+#
+# Under gunicorn every worker writes its samples to PROMETHEUS_MULTIPROC_DIR
+# (set up in gunicorn.conf.py) and /metrics aggregates all workers.
+#
+# /metrics is served on the public API port, so it requires
+# "Authorization: Bearer $METRICS_TOKEN"; without METRICS_TOKEN it answers 404.
+
+LATENCY_BUCKETS = (.005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 250)
+ROW_BUCKETS = (0, 1, 10, 100, 1000, 10000, 100000)
+POOL_WAIT_BUCKETS = (.0005, .001, .005, .01, .05, .1, .5, 1, 5, 30)
+
+REQUEST_LATENCY = Histogram(
+    'http_request_duration_seconds', 'Request latency', ['endpoint', 'method', 'status'],
+    buckets=LATENCY_BUCKETS)
+REQUEST_QUERIES = Histogram(
+    'db_queries_per_request', 'SQL statements executed per request', ['endpoint'],
+    buckets=QUERY_COUNT_BUCKETS)
+REQUEST_SQL_TIME = Histogram(
+    'db_query_seconds_per_request', 'Total SQL time per request', ['endpoint'],
+    buckets=LATENCY_BUCKETS)
+REQUEST_ROWS = Histogram(
+    'db_rows_per_request', 'Rows returned or affected per request (cursor.rowcount)', ['endpoint'],
+    buckets=ROW_BUCKETS)
+
+POOL_CHECKOUTS = Counter('db_pool_checkouts_total', 'Connections checked out of the pool', ['bind'])
+POOL_CONNECTS = Counter('db_pool_connections_created_total', 'New DBAPI connections opened', ['bind'])
+POOL_TIMEOUTS = Counter('db_pool_timeouts_total', 'Checkouts that gave up waiting for a connection', ['bind'])
+POOL_WAIT = Histogram(
+    'db_pool_checkout_wait_seconds', 'Time spent obtaining a connection from the pool', ['bind'],
+    buckets=POOL_WAIT_BUCKETS)
+POOL_CHECKED_OUT = Gauge(
+    'db_pool_checked_out', 'Connections currently in use', ['bind'], multiprocess_mode='livesum')
+POOL_OVERFLOW = Gauge(
+    'db_pool_overflow', 'Connections currently open beyond pool_size', ['bind'], multiprocess_mode='livesum')
+POOL_SIZE = Gauge(
+    'db_pool_size', 'Configured pool_size', ['bind'], multiprocess_mode='livesum')
+
+_instrumented = set()
+
+
+def _pool_gauges(pool, bind):
+    # Tidak semua pool punya ukuran (mis. SingletonThreadPool SQLite in-memory)
+    if hasattr(pool, 'checkedout'):
+        POOL_CHECKED_OUT.labels(bind).set(pool.checkedout())
+    if hasattr(pool, 'overflow'):
+        POOL_OVERFLOW.labels(bind).set(max(pool.overflow(), 0))
+
+
+def instrument_engine(engine, bind):
+    """Attach SQL and pool listeners to an engine (once)."""
+    if id(engine) in _instrumented:
+        return
+    _instrumented.add(id(engine))
+    pool = engine.pool
+
+    # Waktu mulai disimpan di execution context, bukan conn.info: statement yang
+    # gagal tidak memanggil after_cursor_execute dan tidak boleh meninggalkan sisa
+    # di koneksi pool
+    @event.listens_for(engine, 'before_cursor_execute')
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context.metrics_start = time.perf_counter()
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        start = getattr(context, 'metrics_start', None)
+        if start is None:
+            return
+        elapsed = time.perf_counter() - start
+        if has_request_context() and 'metrics_sql' in g:
+            stats = g.metrics_sql
+            stats[0] += 1
+            stats[1] += elapsed
+            if cursor.rowcount and cursor.rowcount > 0:
+                stats[2] += cursor.rowcount
+
+    @event.listens_for(pool, 'connect')
+    def on_connect(dbapi_connection, connection_record):
+        POOL_CONNECTS.labels(bind).inc()
+
+    @event.listens_for(pool, 'checkout')
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        POOL_CHECKOUTS.labels(bind).inc()
+        _pool_gauges(pool, bind)
+
+    @event.listens_for(pool, 'checkin')
+    def on_checkin(dbapi_connection, connection_record):
+        _pool_gauges(pool, bind)
+
+    if hasattr(pool, 'size'):
+        POOL_SIZE.labels(bind).set(pool.size())
+
+    # SQLAlchemy has no "checkout requested" event: time the pool's internal
+    # getter, which is where a checkout blocks when the pool is exhausted
+    do_get = pool._do_get
+
+    def timed_do_get():
+        start = time.perf_counter()
+        try:
+            return do_get()
+        except PoolTimeout:
+            POOL_TIMEOUTS.labels(bind).inc()
+            raise
+        finally:
+            POOL_WAIT.labels(bind).observe(time.perf_counter() - start)
+    pool._do_get = timed_do_get
+
+
+def metrics_response():
+    token = os.getenv('METRICS_TOKEN')
+    if not token:
+        return Response(status=404)
+    supplied = request.headers.get('Authorization', '').removeprefix('Bearer ').strip()
+    if not hmac.compare_digest(supplied.encode(), token.encode()):
+        return Response(status=401, headers={'WWW-Authenticate': 'Bearer'})
+
+    if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return Response(generate_latest(registry), mimetype=CONTENT_TYPE_LATEST)
+
+
+def init_metrics(app, db):
+    """Register the request hooks, the engine listeners and GET /metrics."""
+    with app.app_context():
+        for bind, engine in db.engines.items():
+            instrument_engine(engine, bind or 'default')
+
+    @app.before_request
+    def start_request_metrics():
+        g.metrics_start = time.perf_counter()
+        g.metrics_sql = [0, 0.0, 0]
+
+    @app.after_request
+    def record_request_metrics(response):
+        if 'metrics_start' not in g or request.endpoint == 'metrics':
+            return response
+        endpoint = request.endpoint or 'unmatched'
+        method, status = request.method, str(response.status_code)
+        start, stats = g.metrics_start, g.metrics_sql
+
+        # Dicatat saat response ditutup: body streaming (export) baru dibuat setelah
+        # after_request, dan query-nya tetap masuk ke stats lewat stream_with_context
+        def observe():
+            REQUEST_LATENCY.labels(endpoint, method, status).observe(time.perf_counter() - start)
+            queries, sql_time, rows = stats
+            REQUEST_QUERIES.labels(endpoint).observe(queries)
+            REQUEST_SQL_TIME.labels(endpoint).observe(sql_time)
+            REQUEST_ROWS.labels(endpoint).observe(rows)
+        response.call_on_close(observe)
+        return response
+
+    app.add_url_rule('/metrics', 'metrics', metrics_response)
@@ -0,0 +1,178 @@
+import logging
+import multiprocessing
+import os
+import threading
+from contextlib import contextmanager
+from itertools import repeat
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+from flask import current_app
+
+# bcrypt hashing/verification is deliberately slow (~250 ms at cost 12). Inside a
+# gunicorn worker it runs in a small process pool started by gunicorn.conf.py,
+# so the worker's threads keep serving other endpoints while logins are hashed.
+# At most BCRYPT_MAX_PENDING jobs may be queued or running per worker; beyond
+# that callers get PasswordPoolBusy right away and answer 503 + Retry-After.
+# Outside gunicorn (flask CLI, seed.py, dev server) hashing simply runs inline.
+BCRYPT_POOL_SIZE = int(os.getenv('BCRYPT_POOL_SIZE', '1'))
+BCRYPT_MAX_PENDING = int(os.getenv('BCRYPT_MAX_PENDING', '16'))
+BCRYPT_TIMEOUT = float(os.getenv('BCRYPT_TIMEOUT', '10'))
+RETRY_AFTER_SECONDS = int(os.getenv('BCRYPT_RETRY_AFTER', '2'))
+# Proses untuk hashing massal (import mahasiswa), terpisah dari pool login
+BCRYPT_BULK_WORKERS = int(os.getenv('BCRYPT_BULK_WORKERS', str(os.cpu_count() or 1)))
+DEFAULT_LOG_ROUNDS = 12
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_pending = 0
+_pool = None
+_bulk_lock = threading.Lock()
+
+
+class PasswordPoolBusy(Exception):
+    """Too many password hashes are already queued in this worker."""
+
+    def __init__(self, retry_after=RETRY_AFTER_SECONDS):
+        super().__init__('Password hashing queue is full')
+        self.retry_after = retry_after
+
+
+# Dijalankan di proses pool: hanya bergantung pada modul bcrypt
+def _hashpw(password, rounds, prefix):
+    import bcrypt
+    return bcrypt.hashpw(password, bcrypt.gensalt(rounds=rounds, prefix=prefix)).decode('utf-8')
+
+
+def _checkpw(password, hashed):
+    import bcrypt
+    try:
+        return bcrypt.checkpw(password, hashed)
+    except ValueError:
+        # Hash tersimpan rusak / bukan bcrypt
+        return False
+
+
+def start_pool(size=None):
+    """
+    Start the process pool of this worker. Call it before the worker starts
+    threads (gunicorn post_worker_init), because the pool processes are forked.
+    """
+    global _pool
+    size = BCRYPT_POOL_SIZE if size is None else size
+    if size <= 0 or _pool is not None:
+        return
+    _pool = ProcessPoolExecutor(max_workers=size, mp_context=multiprocessing.get_context('fork'))
+    # Fork semua proses sekarang, bukan saat request pertama (saat itu sudah ada thread lain)
+    list(_pool.map(_checkpw, [b''] * size, [b'$2b$04$' + b'.' * 53] * size))
+
+
+def shutdown_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def _release(future=None):
+    global _pending
+    with _lock:
+        _pending -= 1
+
+
+def _run(fn, *args):
+    global _pending, _pool
+    with _lock:
+        if _pending >= BCRYPT_MAX_PENDING:
+            raise PasswordPoolBusy()
+        _pending += 1
+    inline = True
+    try:
+        pool = _pool
+        if pool is not None:
+            future = pool.submit(fn, *args)
+            # Slot dilepas saat job benar-benar selesai: cancel() tidak bisa menghentikan
+            # job yang sudah berjalan, jadi timeout tidak boleh membebaskan slotnya
+            future.add_done_callback(_release)
+            inline = False
+            try:
+                return future.result(timeout=BCRYPT_TIMEOUT)
+            except FutureTimeout:
+                future.cancel()
+                raise PasswordPoolBusy()
+            except BrokenProcessPool:
+                # Proses pool mati (mis. OOM); lanjutkan inline sampai worker didaur ulang
+                logger.error('bcrypt process pool is broken, hashing inline from now on')
+                _pool = None
+                with _lock:
+                    _pending += 1
+                inline = True
+        return fn(*args)
+    finally:
+        if inline:
+            _release()
+
+
+def configured_rounds():
+    """bcrypt cost factor of new hashes (BCRYPT_LOG_ROUNDS)."""
+    return current_app.config.get('BCRYPT_LOG_ROUNDS', DEFAULT_LOG_ROUNDS)
+
+
+def hash_password(plain_password, rounds=None):
+    """bcrypt hash (str) of ``plain_password``; raises PasswordPoolBusy when saturated."""
+    return _run(_hashpw, plain_password.encode('utf-8'), rounds or configured_rounds(), b'2b')
+
+
+def check_password(hashed_password, plain_password):
+    """Verify ``plain_password`` against a stored bcrypt hash; raises PasswordPoolBusy when saturated."""
+    if not hashed_password or plain_password is None:
+        return False
+    return _run(_checkpw, plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
+
+
+def hash_rounds(hashed_password):
+    """Cost factor stored in a bcrypt hash ('$2b$12$...' -> 12), or None."""
+    try:
+        return int(hashed_password.split('$')[2])
+    except (AttributeError, IndexError, ValueError):
+        return None
+
+
+def needs_rehash(hashed_password, rounds=None):
+    return hash_rounds(hashed_password) != (rounds or configured_rounds())
+
+
+@contextmanager
+def bulk_hasher(workers=None, rounds=None):
+    """
+    Dedicated process pool for hashing many passwords at once, e.g.
+
+        with bulk_hasher() as hash_many:
+            hashes = hash_many(['pw1', 'pw2', ...])
+
+    The pool is spawned for the duration of the block and does not use the
+    login pool, so logins keep their capacity. Only one bulk job runs per
+    worker; a second one gets PasswordPoolBusy.
+    """
+    workers = BCRYPT_BULK_WORKERS if workers is None else workers
+    rounds = rounds or configured_rounds()
+    if not _bulk_lock.acquire(blocking=False):
+        raise PasswordPoolBusy(retry_after=30)
+    executor = None
+    try:
+        if workers > 1:
+            # spawn, bukan fork: worker gunicorn sudah punya thread lain yang berjalan
+            executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+
+        def hash_many(passwords):
+            encoded = [p.encode('utf-8') for p in passwords]
+            if executor is None:
+                return [_hashpw(p, rounds, b'2b') for p in encoded]
+            chunksize = max(1, len(encoded) // (workers * 4))
+            return list(executor.map(_hashpw, encoded, repeat(rounds), repeat(b'2b'), chunksize=chunksize))
+
+        yield hash_many
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+        _bulk_lock.release()
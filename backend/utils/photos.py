@@ -0,0 +1,133 @@
+import hashlib
+import io
+import os
+import re
+from flask import current_app, send_from_directory
+
+# Lecturer photos are resized into a few variants at upload time and stored
+# under content-hash filenames (<sha256 prefix>-<variant>.webp). A filename
+# therefore never changes content, so they are served with a one-year
+# immutable Cache-Control; a new photo simply gets a new URL.
+
+PHOTO_DIR = os.getenv('LECTURER_PHOTO_DIR') or os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'uploads', 'lecturers')
+PHOTO_URL_PREFIX = '/uploads/lecturers/'
+ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'webp'}
+
+# Nama varian -> sisi terpanjang (px). photo_url menunjuk ke DEFAULT_VARIANT.
+PHOTO_VARIANTS = {'sm': 64, 'md': 192, 'lg': 512}
+DEFAULT_VARIANT = 'md'
+# Daftar dosen dan leaderboard menampilkan avatar kecil (<= 56px)
+LIST_VARIANT = 'sm'
+WEBP_QUALITY = 82
+MAX_UPLOAD_PIXELS = 40_000_000
+
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+# Upload lama (uuid_nama.jpg) juga tidak pernah ditimpa, tapi tidak dijamin dari hash isi
+LEGACY_MAX_AGE = 24 * 3600
+
+HASHED_FILENAME = re.compile(r'^[0-9a-f]{16}-(%s)\.webp$' % '|'.join(PHOTO_VARIANTS))
+
+# Opsional: serahkan transfer file ke nginx (internal location yang menunjuk ke PHOTO_DIR)
+X_ACCEL_PREFIX = os.getenv('PHOTO_X_ACCEL_PREFIX')
+
+
+def allowed_photo(filename):
+    return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+
+
+def variant_url(photo_url, variant):
+    """URL of another variant of a hashed photo URL (legacy URLs are returned unchanged)."""
+    if not photo_url:
+        return photo_url
+    filename = photo_url.rsplit('/', 1)[-1]
+    if not HASHED_FILENAME.match(filename):
+        return photo_url
+    return f"{PHOTO_URL_PREFIX}{filename[:16]}-{variant}.webp"
+
+
+def _write_atomic(path, data):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def save_lecturer_photo(file):
+    """
+    Resize an uploaded photo into all variants and return the URL of the default variant.
+    Raises ValueError if the upload is not a readable image.
+    """
+    from PIL import Image, ImageOps
+
+    data = file.read()
+    digest = hashlib.sha256(data).hexdigest()[:16]
+    os.makedirs(PHOTO_DIR, exist_ok=True)
+
+    paths = {name: os.path.join(PHOTO_DIR, f"{digest}-{name}.webp") for name in PHOTO_VARIANTS}
+    if not all(os.path.exists(path) for path in paths.values()):
+        Image.MAX_IMAGE_PIXELS = MAX_UPLOAD_PIXELS
+        try:
+            image = Image.open(io.BytesIO(data))
+            image = ImageOps.exif_transpose(image)
+        except Exception as e:
+            raise ValueError(f"Invalid image: {e}")
+        image = image.convert('RGBA' if 'A' in image.getbands() else 'RGB')
+
+        for name, size in PHOTO_VARIANTS.items():
+            variant = image.copy()
+            variant.thumbnail((size, size), Image.LANCZOS)
+            buffer = io.BytesIO()
+            variant.save(buffer, 'WEBP', quality=WEBP_QUALITY, method=4)
+            _write_atomic(paths[name], buffer.getvalue())
+
+    return f"{PHOTO_URL_PREFIX}{digest}-{DEFAULT_VARIANT}.webp"
+
+
+def photo_files(photo_url):
+    """Paths on disk that belong to a stored photo URL (all variants of a hashed photo)."""
+    if not photo_url or not photo_url.startswith(PHOTO_URL_PREFIX):
+        return []
+    filename = os.path.basename(photo_url)
+    if HASHED_FILENAME.match(filename):
+        return [os.path.join(PHOTO_DIR, f"{filename[:16]}-{name}.webp") for name in PHOTO_VARIANTS]
+    return [os.path.join(PHOTO_DIR, filename)]
+
+
+def delete_lecturer_photo(photo_url, still_used=False):
+    """
+    Remove the files of a photo. Identical uploads share files, so pass
+    still_used=True when another lecturer still references the same URL.
+    """
+    if still_used:
+        return
+    for path in photo_files(photo_url):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            print(f"Error saat menghapus foto dosen {path}: {e}")
+
+
+def serve_photo(filename):
+    """Response for /uploads/lecturers/<filename> with long-lived caching."""
+    immutable = bool(HASHED_FILENAME.match(filename))
+    max_age = IMMUTABLE_MAX_AGE if immutable else LEGACY_MAX_AGE
+
+    if X_ACCEL_PREFIX:
+        if not os.path.isfile(os.path.join(PHOTO_DIR, os.path.basename(filename))):
+            return current_app.response_class(status=404)
+        response = current_app.response_class()
+        response.headers['X-Accel-Redirect'] = X_ACCEL_PREFIX.rstrip('/') + '/' + os.path.basename(filename)
+        # nginx menentukan Content-Type dari file; header cache diteruskan ke client
+        del response.headers['Content-Type']
+    else:
+        # Dengan USE_X_SENDFILE=True, Flask mengirim header X-Sendfile (Apache/lighttpd)
+        response = send_from_directory(PHOTO_DIR, filename, max_age=max_age)
+
+    response.cache_control.public = True
+    response.cache_control.max_age = max_age
+    if immutable:
+        response.cache_control.immutable = True
+    return response
@@ -0,0 +1,112 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from App import db
+from App.models import User, Student, Class
+from utils.data_version import current_version
+
+# The authenticated user of a request (user, role, NIM, class) is cached per
+# worker in a small LRU, so authenticating a request normally needs no query.
+# Entries expire after PRINCIPAL_CACHE_TTL seconds and are dropped as soon as
+# the shared 'principals' data version changes (any committed write to users,
+# students or classes); the admin student endpoints also evict explicitly.
+PRINCIPAL_CACHE_TTL = float(os.getenv('PRINCIPAL_CACHE_TTL', 60))
+PRINCIPAL_CACHE_SIZE = int(os.getenv('PRINCIPAL_CACHE_SIZE', 2048))
+
+_lock = threading.Lock()
+_cache = OrderedDict()
+
+
+class Principal:
+    """Read-only snapshot of a user (and its student row); safe to share between requests."""
+
+    def __init__(self, row):
+        self.id = row.user_id
+        self.username = row.username
+        self.email = row.email
+        self.role = row.role
+        self.created_at = row.created_at
+        self.nim = row.nim
+        self.name = row.student_name
+        self.class_id = row.class_id
+        self.class_name = row.class_name
+
+    @property
+    def is_student(self):
+        return self.nim is not None
+
+
+def _principal_query():
+    return db.session.query(
+        User.id.label('user_id'),
+        User.username,
+        User.email,
+        User.role,
+        User.created_at,
+        Student.nim,
+        Student.name.label('student_name'),
+        Student.class_id,
+        Class.name.label('class_name')
+    )
+
+
+def _cached(key, loader):
+    version = current_version('principals')
+    now = time.monotonic()
+    with _lock:
+        entry = _cache.get(key)
+        if entry and entry[0] > now and entry[1] == version:
+            _cache.move_to_end(key)
+            return entry[2]
+
+    row = loader()
+    if row is None:
+        # Tidak di-cache, supaya user yang baru dibuat langsung bisa login
+        return None
+
+    principal = Principal(row)
+    with _lock:
+        _cache[key] = (now + PRINCIPAL_CACHE_TTL, version, principal)
+        _cache.move_to_end(key)
+        while len(_cache) > PRINCIPAL_CACHE_SIZE:
+            _cache.popitem(last=False)
+    return principal
+
+
+def load_user_principal(user_id):
+    """Principal of the user with this id (identity of admin tokens), or None."""
+    try:
+        user_id = int(user_id)
+    except (TypeError, ValueError):
+        return None
+    return _cached(('user', user_id), lambda: _principal_query()
+                   .select_from(User)
+                   .outerjoin(Student, Student.user_id == User.id)
+                   .outerjoin(Class, Student.class_id == Class.id)
+                   .filter(User.id == user_id)
+                   .first())
+
+
+def load_student_principal(nim):
+    """Principal of the student with this NIM (identity of student tokens), or None."""
+    try:
+        nim = int(nim)
+    except (TypeError, ValueError):
+        return None
+    # Outer join ke users: mahasiswa tanpa akun tetap dikenali (id/role = None)
+    return _cached(('student', nim), lambda: _principal_query()
+                   .select_from(Student)
+                   .outerjoin(User, Student.user_id == User.id)
+                   .outerjoin(Class, Student.class_id == Class.id)
+                   .filter(Student.nim == nim)
+                   .first())
+
+
+def invalidate_principal(user_id=None, nim=None):
+    """Evict the cached principals of a user and/or student from this worker."""
+    with _lock:
+        for key in [key for key, entry in _cache.items()
+                    if (user_id is not None and entry[2].id == user_id)
+                    or (nim is not None and entry[2].nim == nim)]:
+            del _cache[key]
@@ -0,0 +1,147 @@
+import os
+import re
+import traceback
+from collections import Counter
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+
+# Test-mode guard against N+1 queries. With QUERY_BUDGET=raise (the default
+# when app.testing) or QUERY_BUDGET=warn, every SQL statement of a request is
+# recorded together with the line in this code base that issued it. After the
+# request (for streamed responses: when the response is closed, i.e. after the
+# body generator ran) the statements are checked against the endpoint's budget:
+#
+#   @query_budget(queries=3, repeats=1)
+#
+# ``queries`` bounds the number of statements, ``repeats`` how often the same
+# statement shape (SQL with parameters and IN-lists collapsed) may run; a
+# repeated shape is the usual symptom of a lazy load inside a loop. Endpoints
+# without the decorator get QUERY_BUDGET_DEFAULT / QUERY_BUDGET_MAX_REPEATS;
+# None disables a check. Violations raise QueryBudgetExceeded (fails the test
+# through the test client) or are printed in warn mode.
+#
+# Off by default: recording stack traces is far too slow for production.
+
+DEFAULT_QUERY_BUDGET = int(os.getenv('QUERY_BUDGET_DEFAULT', '20'))
+DEFAULT_MAX_REPEATS = int(os.getenv('QUERY_BUDGET_MAX_REPEATS', '3'))
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_IN_LIST = re.compile(r'\bIN\s*\((?:[^()]|\([^()]*\))*\)', re.IGNORECASE)
+_VALUES_LIST = re.compile(r'\bVALUES\s*(\([^()]*\))(?:\s*,\s*\([^()]*\))+', re.IGNORECASE)
+_WHITESPACE = re.compile(r'\s+')
+
+_DEFAULT = object()
+_instrumented = set()
+
+
+class QueryBudgetExceeded(AssertionError):
+    """A request issued more statements (or more repeats of one statement) than its budget allows."""
+
+
+def query_budget(queries=_DEFAULT, repeats=_DEFAULT):
+    """Declare the query budget of a view; place it directly below @route."""
+    def decorator(f):
+        f.query_budget = (queries, repeats)
+        return f
+    return decorator
+
+
+def statement_shape(statement):
+    shape = _WHITESPACE.sub(' ', statement).strip()
+    shape = _IN_LIST.sub('IN (...)', shape)
+    return _VALUES_LIST.sub(r'VALUES \1, ...', shape)
+
+
+def _origin():
+    """'file:line in function' of the innermost frame in this code base (not a library, not this module)."""
+    for frame in reversed(traceback.extract_stack()):
+        if frame.filename.startswith('<'):
+            # Kode yang dibangkitkan SQLAlchemy (<... wrapper>)
+            continue
+        filename = os.path.abspath(frame.filename)
+        if filename.startswith(BACKEND_DIR) and 'site-packages' not in filename \
+                and filename != os.path.abspath(__file__):
+            return f"{os.path.relpath(filename, BACKEND_DIR)}:{frame.lineno} in {frame.name}"
+    return 'unknown'
+
+
+def _budget_mode(app):
+    mode = app.config.get('QUERY_BUDGET') or os.getenv('QUERY_BUDGET')
+    if not mode and app.testing:
+        mode = 'raise'
+    return mode if mode in ('raise', 'warn') else None
+
+
+def _endpoint_budget(app):
+    view = app.view_functions.get(request.endpoint)
+    queries, repeats = getattr(view, 'query_budget', (_DEFAULT, _DEFAULT))
+    if queries is _DEFAULT:
+        queries = app.config.get('QUERY_BUDGET_DEFAULT', DEFAULT_QUERY_BUDGET)
+    if repeats is _DEFAULT:
+        repeats = app.config.get('QUERY_BUDGET_MAX_REPEATS', DEFAULT_MAX_REPEATS)
+    return queries, repeats
+
+
+def budget_report(statements, queries, repeats):
+    """Violations of a budget as a list of lines, empty if the statements fit."""
+    lines = []
+    if queries is not None and len(statements) > queries:
+        lines.append(f"{len(statements)} statements, budget {queries}")
+    if repeats is not None:
+        counts = Counter(shape for shape, _ in statements)
+        for shape, count in counts.most_common():
+            if count <= repeats:
+                break
+            origins = Counter(origin for s, origin in statements if s == shape)
+            lines.append(f"same statement {count}x (max {repeats}): {shape[:200]}")
+            lines.extend(f"    {n}x at {origin}" for origin, n in origins.most_common())
+    return lines
+
+
+def instrument_engine(engine):
+    if id(engine) in _instrumented:
+        return
+    _instrumented.add(id(engine))
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def record_statement(conn, cursor, statement, parameters, context, executemany):
+        if has_request_context() and 'budget_statements' in g:
+            g.budget_statements.append((statement_shape(statement), _origin()))
+
+
+def init_query_budget(app, db):
+    """Enable the checks when QUERY_BUDGET (config or env) is 'raise'/'warn', or the app is testing."""
+
+    @app.before_request
+    def start_query_budget():
+        if _budget_mode(current_app):
+            for engine in db.engines.values():
+                instrument_engine(engine)
+            g.budget_statements = []
+
+    @app.after_request
+    def check_query_budget(response):
+        statements = g.get('budget_statements')
+        if statements is None:
+            return response
+        queries, repeats = _endpoint_budget(current_app)
+        mode = _budget_mode(current_app)
+        blueprint = request.blueprint or '-'
+        described = f"{request.method} {request.path} (blueprint {blueprint}, endpoint {request.endpoint})"
+
+        def check():
+            violations = budget_report(statements, queries, repeats)
+            if violations:
+                message = f"Query budget exceeded by {described}:\n  " + "\n  ".join(violations)
+                if mode == 'raise':
+                    raise QueryBudgetExceeded(message)
+                print(message)
+
+        if response.is_streamed:
+            # Body streaming (export) menjalankan query-nya setelah after_request:
+            # cek saat response ditutup, ketika semua statement sudah tercatat
+            response.call_on_close(check)
+        else:
+            g.pop('budget_statements')
+            check()
+        return response
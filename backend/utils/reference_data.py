@@ -0,0 +1,73 @@
+import threading
+import time
+from App.models import Question, Answer
+from utils.data_version import current_version
+
+# Questions and answer choices almost never change, so every worker keeps one
+# copy in memory. Committed writes to those tables bump the shared 'questions'
+# data version, which invalidates the copy in every worker; REFRESH_SECONDS
+# bounds how stale it can be after a change made outside the app (plain SQL).
+REFRESH_SECONDS = 300
+QUESTION_LIMIT = 5
+
+_lock = threading.Lock()
+_cache = None
+
+
+class ReferenceData:
+    def __init__(self, version, questions, answers):
+        self.version = version
+        self.loaded_at = time.monotonic()
+        # Map answer_id -> points
+        self.answer_points = {a.id: a.points for a in answers}
+        self.max_points = max(self.answer_points.values()) if self.answer_points else None
+        choices = [{'id': a.id, 'text': a.text} for a in answers]
+        self.answer_choices = choices
+        # Payload of GET /api/questions
+        self.questions = [{'id': q.id, 'text': q.text, 'choices': choices} for q in questions]
+
+
+def get_reference_data():
+    """Return the cached reference data, loading it on first use or when the 'questions' version moved."""
+    global _cache
+    cache = _cache
+    version = current_version('questions')
+    if cache is not None and cache.version == version and time.monotonic() - cache.loaded_at < REFRESH_SECONDS:
+        return cache
+
+    with _lock:
+        if _cache is None or _cache is cache:
+            _cache = ReferenceData(
+                version,
+                Question.query.limit(QUESTION_LIMIT).all(),
+                Answer.query.all()
+            )
+        return _cache
+
+
+def score_answers(answer_ids):
+    """
+    Calculate the percentage score of a set of chosen answers without querying the database.
+
+    Returns:
+        (score, answer_count) where answer_count only includes known answers
+    """
+    data = get_reference_data()
+    total_points = 0
+    answer_count = 0
+    for answer_id in answer_ids:
+        points = data.answer_points.get(int(answer_id))
+        if points is not None:
+            total_points += points
+            answer_count += 1
+
+    if answer_count == 0:
+        return 0, 0
+
+    # Use the highest point value of any answer as the maximum per question
+    max_points_per_question = data.max_points or 1.0
+    max_possible_points = answer_count * max_points_per_question
+    score = (total_points / max_possible_points) * 100
+
+    # Ensure score is capped at 100%
+    return min(score, 100.0), answer_count
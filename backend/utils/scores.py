@@ -0,0 +1,251 @@
+from App.models import db, Lecturer, LecturerScore, LecturerDailyScore, Evaluation
+from sqlalchemy import func, case, insert, select
+from datetime import date, datetime
+from utils.weighted_scores import refresh_weighted_scores, weighted_score_expression
+
+
+def evaluation_day(created_at):
+    """Day bucket of an evaluation timestamp (today if the timestamp is not known yet)."""
+    if isinstance(created_at, datetime):
+        return created_at.date()
+    if isinstance(created_at, date):
+        return created_at
+    return datetime.now().date()
+
+
+def record_score_delta(lecturer_id, created_at, delta_sum, delta_count):
+    """Apply a score delta to both the all-time aggregate and the daily rollup."""
+    apply_score_delta(lecturer_id, delta_sum, delta_count)
+    apply_daily_delta(lecturer_id, evaluation_day(created_at), delta_sum, delta_count)
+
+
+def record_score_deltas(scores):
+    """
+    Add many new evaluations at once: ``scores`` yields (lecturer_id, created_at, score).
+    Deltas are summed first so each lecturer and each day bucket is updated once.
+    """
+    per_lecturer = {}
+    per_day = {}
+    for lecturer_id, created_at, score in scores:
+        score = score or 0
+        total, count = per_lecturer.get(lecturer_id, (0, 0))
+        per_lecturer[lecturer_id] = (total + score, count + 1)
+        key = (lecturer_id, evaluation_day(created_at))
+        total, count = per_day.get(key, (0, 0))
+        per_day[key] = (total + score, count + 1)
+
+    for lecturer_id, (total, count) in per_lecturer.items():
+        apply_score_delta(lecturer_id, total, count)
+    for (lecturer_id, day), (total, count) in per_day.items():
+        apply_daily_delta(lecturer_id, day, total, count)
+
+
+def _upsert(model):
+    """INSERT for ``model`` with ON CONFLICT support (PostgreSQL and SQLite)."""
+    if db.engine.dialect.name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    return dialect_insert(model)
+
+
+def apply_score_delta(lecturer_id, delta_sum, delta_count):
+    """
+    Shift the stored aggregate of a lecturer by a delta instead of recomputing it.
+
+    One INSERT ... ON CONFLICT DO UPDATE (score_sum = score_sum + :delta), so
+    concurrent submissions for the same lecturer neither overwrite each other
+    nor race on creating the first row. Nothing is committed here; the caller
+    commits together with the evaluation change.
+
+    Args:
+        lecturer_id: The NIDN of the lecturer
+        delta_sum: Change of the summed evaluation scores
+        delta_count: Change of the number of evaluations
+    """
+    if lecturer_id is None or (not delta_sum and not delta_count):
+        return
+
+    # Baris baru (belum ada skor): delta negatif dianggap 0
+    count = max(delta_count, 0)
+    total = delta_sum if count else 0
+    average = min(total / count, 100.0) if count else 0
+
+    new_sum = LecturerScore.score_sum + delta_sum
+    new_count = LecturerScore.score_count + delta_count
+    # Cap average score at 100%
+    new_average = case(
+        (new_count <= 0, 0),
+        (new_sum / new_count > 100, 100.0),
+        else_=new_sum / new_count
+    )
+    statement = _upsert(LecturerScore).values(
+        lecturer_id=lecturer_id,
+        score_sum=total,
+        score_count=count,
+        average_score=average,
+        weighted_score=weighted_score_expression(count, average)
+    )
+    db.session.execute(statement.on_conflict_do_update(
+        index_elements=[LecturerScore.lecturer_id],
+        set_={
+            'score_sum': new_sum,
+            'score_count': new_count,
+            'average_score': new_average,
+            # SET memakai nilai lama baris, jadi weighted score dihitung dari ekspresi baru di atas
+            'weighted_score': weighted_score_expression(new_count, new_average),
+            'updated_at': func.now()
+        }
+    ))
+
+
+def apply_daily_delta(lecturer_id, day, delta_sum, delta_count):
+    """Shift the (lecturer, day) bucket of the period leaderboard rollup by a delta (upsert)."""
+    if lecturer_id is None or (not delta_sum and not delta_count):
+        return
+
+    if delta_count <= 0:
+        # Hanya mengurangi: bucket yang belum ada tidak perlu dibuat
+        LecturerDailyScore.query.filter_by(lecturer_id=lecturer_id, day=day).update({
+            LecturerDailyScore.score_sum: LecturerDailyScore.score_sum + delta_sum,
+            LecturerDailyScore.score_count: LecturerDailyScore.score_count + delta_count
+        }, synchronize_session=False)
+        return
+
+    statement = _upsert(LecturerDailyScore).values(
+        lecturer_id=lecturer_id, day=day, score_sum=delta_sum, score_count=delta_count)
+    db.session.execute(statement.on_conflict_do_update(
+        index_elements=[LecturerDailyScore.lecturer_id, LecturerDailyScore.day],
+        set_={
+            'score_sum': LecturerDailyScore.score_sum + delta_sum,
+            'score_count': LecturerDailyScore.score_count + delta_count
+        }
+    ))
+
+
+def _day_column():
+    return func.date(Evaluation.created_at, type_=db.Date)
+
+
+def refresh_lecturer_aggregates(lecturer_ids):
+    """
+    Recompute lecturer_scores and lecturer_daily_scores of the given lecturers
+    from the evaluations table in four set-based statements (two UPDATEs, one
+    DELETE, one INSERT ... SELECT). Used after bulk deletes, where
+    the removed rows are gone and a delta is not known. Caller commits.
+    """
+    lecturer_ids = [lecturer_id for lecturer_id in lecturer_ids if lecturer_id is not None]
+    if not lecturer_ids:
+        return
+
+    score_sum = select(func.coalesce(func.sum(Evaluation.score), 0)) \
+        .where(Evaluation.lecturer_id == LecturerScore.lecturer_id).scalar_subquery()
+    score_count = select(func.count(Evaluation.id)) \
+        .where(Evaluation.lecturer_id == LecturerScore.lecturer_id).scalar_subquery()
+    LecturerScore.query.filter(LecturerScore.lecturer_id.in_(lecturer_ids)).update({
+        LecturerScore.score_sum: score_sum,
+        LecturerScore.score_count: score_count,
+        # Cap average score at 100%
+        LecturerScore.average_score: case(
+            (score_count == 0, 0),
+            (score_sum / score_count > 100, 100.0),
+            else_=score_sum / score_count
+        )
+    }, synchronize_session=False)
+
+    LecturerScore.query.filter(LecturerScore.lecturer_id.in_(lecturer_ids)).update({
+        LecturerScore.weighted_score: weighted_score_expression(LecturerScore.score_count, LecturerScore.average_score)
+    }, synchronize_session=False)
+
+    day = _day_column()
+    LecturerDailyScore.query.filter(LecturerDailyScore.lecturer_id.in_(lecturer_ids)) \
+        .delete(synchronize_session=False)
+    db.session.execute(insert(LecturerDailyScore).from_select(
+        ['lecturer_id', 'day', 'score_sum', 'score_count'],
+        db.session.query(
+            Evaluation.lecturer_id,
+            day,
+            func.coalesce(func.sum(Evaluation.score), 0),
+            func.count(Evaluation.id)
+        ).filter(Evaluation.lecturer_id.in_(lecturer_ids)).group_by(Evaluation.lecturer_id, day).statement
+    ))
+
+
+def period_score_subquery(start_day, end_day=None):
+    """
+    Average score and voter count per lecturer for evaluations created in
+    [start_day, end_day), summed from the lecturer_daily_scores rollup.
+    """
+    score_count = func.sum(LecturerDailyScore.score_count)
+    query = db.session.query(
+        LecturerDailyScore.lecturer_id,
+        (func.sum(LecturerDailyScore.score_sum) / func.nullif(score_count, 0)).label('average_score'),
+        score_count.label('score_count')
+    ).filter(LecturerDailyScore.day >= start_day)
+
+    if end_day:
+        query = query.filter(LecturerDailyScore.day < end_day)
+
+    return query.group_by(LecturerDailyScore.lecturer_id) \
+        .having(score_count > 0) \
+        .subquery()
+
+
+def rebuild_lecturer_scores():
+    """
+    Recompute every lecturer aggregate, the weighted scores and the daily
+    rollup from the evaluations table.
+
+    Only needed to backfill or repair lecturer_scores / lecturer_daily_scores;
+    the request paths keep them current through record_score_delta.
+    """
+    try:
+        lecturer_data = {
+            lecturer_id: (score_sum or 0, voter_count)
+            for lecturer_id, score_sum, voter_count in db.session.query(
+                Evaluation.lecturer_id,
+                func.sum(Evaluation.score),
+                func.count(Evaluation.id)
+            ).group_by(Evaluation.lecturer_id).all()
+        }
+        existing = {s.lecturer_id: s for s in LecturerScore.query.all()}
+
+        for (nidn,) in db.session.query(Lecturer.nidn).all():
+            score_sum, voter_count = lecturer_data.get(nidn, (0, 0))
+            average_score = min(100, score_sum / voter_count) if voter_count else 0
+
+            lecturer_score = existing.get(nidn)
+            if lecturer_score:
+                lecturer_score.score_sum = score_sum
+                lecturer_score.score_count = voter_count
+                lecturer_score.average_score = average_score
+            else:
+                db.session.add(LecturerScore(
+                    lecturer_id=nidn,
+                    score_sum=score_sum,
+                    score_count=voter_count,
+                    average_score=average_score
+                ))
+
+        # Daily rollup: rebuilt from scratch with one INSERT ... SELECT
+        day = _day_column()
+        LecturerDailyScore.query.delete(synchronize_session=False)
+        db.session.execute(insert(LecturerDailyScore).from_select(
+            ['lecturer_id', 'day', 'score_sum', 'score_count'],
+            db.session.query(
+                Evaluation.lecturer_id,
+                day,
+                func.coalesce(func.sum(Evaluation.score), 0),
+                func.count(Evaluation.id)
+            ).filter(Evaluation.lecturer_id.isnot(None)).group_by(Evaluation.lecturer_id, day).statement
+        ))
+
+        # C dan m dihitung ulang dari agregat baru, lalu weighted score semua dosen
+        refresh_weighted_scores(force=True)
+
+        db.session.commit()
+        return True
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error rebuilding lecturer scores: {str(e)}")
+        return False
@@ -0,0 +1,219 @@
+import codecs
+import csv
+import re
+from sqlalchemy import insert, or_
+from App import db
+from App.models import User, Student, Class
+from utils.passwords import bulk_hasher
+
+# Bulk import of students from CSV or XLSX. The whole upload is read and
+# validated first (at most MAX_ROWS rows), so a file that is too large or not
+# decodable is rejected before anything is written. The valid rows are then
+# written in batches: one class lookup for the whole file, one duplicate check
+# per batch, passwords hashed in a process pool and multi-row INSERTs for users
+# and students. Every batch is committed on its own, so a failing row never
+# discards the rows around it.
+
+BATCH_SIZE = 500
+MAX_ROWS = 20000
+
+# Nama kolom yang diterima (huruf kecil) -> field
+COLUMN_ALIASES = {
+    'nim': 'nim',
+    'name': 'name', 'nama': 'name',
+    'email': 'email',
+    'password': 'password', 'kata sandi': 'password',
+    'class': 'class', 'kelas': 'class', 'class_name': 'class',
+    'class_id': 'class_id',
+}
+REQUIRED_FIELDS = ('nim', 'name', 'email', 'password')
+EMAIL_PATTERN = re.compile(r'^[^@\s]+@[^@\s]+\.[^@\s]+$')
+
+
+class ImportFileError(ValueError):
+    """The uploaded file cannot be read as a student list."""
+
+
+def _cell(value):
+    if value is None:
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        # Angka dari Excel (NIM 10001 -> 10001.0)
+        value = int(value)
+    return str(value).strip()
+
+
+def _records(header, rows, first_row_number=2):
+    fields = [COLUMN_ALIASES.get(_cell(h).lower()) for h in header]
+    missing = [f for f in REQUIRED_FIELDS if f not in fields]
+    if missing:
+        raise ImportFileError(f"Missing column(s): {', '.join(missing)}")
+    if 'class' not in fields and 'class_id' not in fields:
+        raise ImportFileError("Missing column: class or class_id")
+
+    for row_number, values in enumerate(rows, start=first_row_number):
+        record = {field: _cell(value) for field, value in zip(fields, values) if field}
+        if any(record.values()):
+            yield row_number, record
+
+
+def read_rows(file):
+    """Yield (row_number, record) from an uploaded CSV or XLSX file without loading it whole."""
+    filename = (file.filename or '').lower()
+    if filename.endswith('.xlsx'):
+        from openpyxl import load_workbook
+        try:
+            sheet = load_workbook(file.stream, read_only=True, data_only=True).active
+        except Exception as e:
+            raise ImportFileError(f"Invalid XLSX file: {e}")
+        rows = sheet.iter_rows(values_only=True)
+        header = next(rows, None)
+    elif filename.endswith('.csv'):
+        text = codecs.iterdecode(file.stream, 'utf-8-sig')
+        rows = csv.reader(text)
+        try:
+            header = next(rows, None)
+        except UnicodeDecodeError:
+            raise ImportFileError("CSV file must be UTF-8 encoded")
+    else:
+        raise ImportFileError("Only .csv and .xlsx files are supported")
+
+    if not header:
+        raise ImportFileError("File is empty")
+    return _records(header, rows)
+
+
+def _validate(record, classes):
+    """Return (values, errors) for one record; values are ready to insert."""
+    errors = []
+    nim = record.get('nim', '')
+    if not nim.isdigit():
+        errors.append('nim must be a number')
+    if not record.get('name'):
+        errors.append('name is required')
+    email = record.get('email', '')
+    if not EMAIL_PATTERN.match(email):
+        errors.append('invalid email')
+    if not record.get('password'):
+        errors.append('password is required')
+
+    class_id = None
+    if record.get('class_id'):
+        if record['class_id'].isdigit() and int(record['class_id']) in classes['ids']:
+            class_id = int(record['class_id'])
+        else:
+            errors.append(f"unknown class_id {record['class_id']}")
+    elif record.get('class'):
+        class_id = classes['names'].get(record['class'].lower())
+        if class_id is None:
+            errors.append(f"unknown class {record['class']}")
+    else:
+        errors.append('class is required')
+
+    if errors:
+        return None, errors
+    return {
+        'nim': int(nim),
+        'name': record['name'],
+        'email': email,
+        'password': record['password'],
+        'class_id': class_id,
+    }, []
+
+
+def _insert_batch(batch, hash_many, report):
+    """Insert one batch of validated rows [(row_number, values)], skipping duplicates already in the DB."""
+    nims = [values['nim'] for _, values in batch]
+    emails = [values['email'] for _, values in batch]
+    taken_nims = set(db.session.scalars(db.select(Student.nim).where(Student.nim.in_(nims))))
+    # username mahasiswa = email, jadi keduanya harus unik
+    taken_emails = set()
+    for email, username in db.session.execute(db.select(User.email, User.username).where(
+            or_(User.email.in_(emails), User.username.in_(emails)))):
+        taken_emails.update((email, username))
+
+    rows = []
+    for row_number, values in batch:
+        errors = []
+        if values['nim'] in taken_nims:
+            errors.append('nim already exists')
+        if values['email'] in taken_emails:
+            errors.append('email already exists')
+        if errors:
+            report['errors'].append({'row': row_number, 'nim': values['nim'], 'errors': errors})
+        else:
+            rows.append((row_number, values))
+    if not rows:
+        return
+
+    hashes = hash_many([values['password'] for _, values in rows])
+    try:
+        user_ids = db.session.scalars(
+            insert(User).returning(User.id, sort_by_parameter_order=True),
+            [{'username': values['email'], 'email': values['email'], 'password': hashed, 'role': 'student'}
+             for (_, values), hashed in zip(rows, hashes)]
+        ).all()
+        db.session.execute(insert(Student), [
+            {'nim': values['nim'], 'name': values['name'], 'user_id': user_id, 'class_id': values['class_id']}
+            for (_, values), user_id in zip(rows, user_ids)
+        ])
+        db.session.commit()
+        report['created'] += len(rows)
+    except Exception as e:
+        # Mis. bentrok dengan import lain yang berjalan bersamaan
+        db.session.rollback()
+        for row_number, values in rows:
+            report['errors'].append({'row': row_number, 'nim': values['nim'], 'errors': [f'database error: {e}']})
+
+
+def import_students(file, batch_size=BATCH_SIZE):
+    """
+    Import students from an uploaded CSV/XLSX file.
+
+    Columns: nim, name (nama), email, password and class (class name) or class_id.
+    Returns a report with the number of created rows and per-row errors.
+    Raises ImportFileError, before any row is written, if the file cannot be
+    read or has more than MAX_ROWS rows.
+    """
+    records = read_rows(file)
+
+    # Satu query untuk semua kelas; dicocokkan per nama (case-insensitive) atau id
+    classes = {'ids': set(), 'names': {}}
+    for class_id, name in db.session.query(Class.id, Class.name):
+        classes['ids'].add(class_id)
+        classes['names'][name.lower()] = class_id
+
+    report = {'total': 0, 'created': 0, 'errors': []}
+    seen_nims = set()
+    seen_emails = set()
+    valid = []
+    try:
+        for row_number, record in records:
+            report['total'] += 1
+            if report['total'] > MAX_ROWS:
+                raise ImportFileError(f"File has more than {MAX_ROWS} rows")
+
+            values, errors = _validate(record, classes)
+            if values:
+                if values['nim'] in seen_nims:
+                    errors.append('duplicate nim in file')
+                if values['email'] in seen_emails:
+                    errors.append('duplicate email in file')
+            if errors:
+                report['errors'].append({'row': row_number, 'nim': record.get('nim') or None, 'errors': errors})
+                continue
+
+            seen_nims.add(values['nim'])
+            seen_emails.add(values['email'])
+            valid.append((row_number, values))
+    except UnicodeDecodeError:
+        raise ImportFileError("CSV file must be UTF-8 encoded")
+
+    # Baru ditulis setelah seluruh file lolos dibaca
+    with bulk_hasher() as hash_many:
+        for start in range(0, len(valid), batch_size):
+            _insert_batch(valid[start:start + batch_size], hash_many, report)
+
+    report['errors'].sort(key=lambda e: e['row'])
+    report['failed'] = len(report['errors'])
+    return report
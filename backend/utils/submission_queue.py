@@ -0,0 +1,280 @@
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from sqlalchemy import insert
+from sqlalchemy.exc import DataError, IntegrityError
+from App.models import db, Evaluation, EvaluationAnswer
+from utils.scores import record_score_deltas
+
+# Optional write-behind ingestion for evaluation submissions (SUBMISSION_QUEUE=true).
+#
+# The submit endpoints validate and score a submission, append it to a local
+# SQLite log (WAL, synchronous=FULL, so an acknowledged submission survives a
+# crash) and answer 202 right away. A background thread in every worker tries
+# to become the single drainer (file lock) and moves the log into the main
+# database in large batches: multi-row INSERTs plus one score delta per
+# lecturer/day. Every submission carries a unique submission_key that is
+# stored on the evaluation, so replaying a batch after a crash (committed to
+# the database but not yet removed from the log) never inserts it twice.
+# Rows the database rejects (integrity or data errors) are moved to
+# failed_submissions for inspection. Any other error (database down or
+# restarting, lost connection) leaves the entries in the log for the next drain.
+
+QUEUE_ENABLED = os.getenv('SUBMISSION_QUEUE', 'false').lower() == 'true'
+QUEUE_PATH = os.getenv('SUBMISSION_QUEUE_PATH') or os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'submission_queue.db')
+DRAIN_BATCH_SIZE = int(os.getenv('SUBMISSION_DRAIN_BATCH', '1000'))
+DRAIN_INTERVAL = float(os.getenv('SUBMISSION_DRAIN_INTERVAL', '1'))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS submissions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    submission_key TEXT NOT NULL UNIQUE,
+    payload TEXT NOT NULL,
+    created_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS failed_submissions (
+    id INTEGER PRIMARY KEY,
+    submission_key TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    error TEXT,
+    failed_at TEXT NOT NULL
+);
+"""
+
+logger = logging.getLogger(__name__)
+
+_local = threading.local()
+_drainer = None
+_drainer_lock = threading.Lock()
+
+
+def queue_enabled():
+    return QUEUE_ENABLED
+
+
+def _connection():
+    # Satu koneksi SQLite per thread (dibuat setelah fork worker)
+    conn = getattr(_local, 'conn', None)
+    if conn is None:
+        os.makedirs(os.path.dirname(QUEUE_PATH), exist_ok=True)
+        conn = sqlite3.connect(QUEUE_PATH, timeout=30, isolation_level=None)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=FULL')
+        conn.executescript(SCHEMA)
+        _local.conn = conn
+    return conn
+
+
+def enqueue_submissions(rows, idempotency_key=None):
+    """
+    Durably append validated evaluations to the local log.
+
+    ``rows`` are dicts with the Evaluation columns (student_id, lecturer_id,
+    class_id, course_id, semester, lecturer_class_id, comment, score) plus
+    ``answers`` as [(question_id, answer_id), ...]. Returns the submission keys.
+    With an idempotency key (e.g. "<nim>:<Idempotency-Key header>"), a retried
+    request maps to the same keys and is stored only once.
+    """
+    created_at = datetime.now().isoformat()
+    if idempotency_key:
+        digest = hashlib.sha1(idempotency_key.encode('utf-8')).hexdigest()
+        keys = [f"{digest}:{index}" for index in range(len(rows))]
+    else:
+        keys = [uuid.uuid4().hex for _ in rows]
+
+    conn = _connection()
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        conn.executemany(
+            'INSERT OR IGNORE INTO submissions (submission_key, payload, created_at) VALUES (?, ?, ?)',
+            [(key, json.dumps(row), created_at) for key, row in zip(keys, rows)]
+        )
+        conn.execute('COMMIT')
+    except Exception:
+        conn.execute('ROLLBACK')
+        raise
+
+    ensure_drainer()
+    return keys
+
+
+def queue_stats():
+    conn = _connection()
+    return {
+        'pending': conn.execute('SELECT COUNT(*) FROM submissions').fetchone()[0],
+        'failed': conn.execute('SELECT COUNT(*) FROM failed_submissions').fetchone()[0],
+    }
+
+
+@contextmanager
+def _drain_lock():
+    """Exclusive, non-blocking lock across the workers of this container; yields False if taken."""
+    os.makedirs(os.path.dirname(QUEUE_PATH), exist_ok=True)
+    with open(QUEUE_PATH + '.lock', 'w') as lock_file:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _apply(entries):
+    """Insert log entries [(key, payload, created_at)] into the database (caller commits)."""
+    keys = [key for key, _, _ in entries]
+    # Sudah masuk pada drain sebelumnya (crash sebelum log dibersihkan): lewati
+    applied = set(db.session.scalars(
+        db.select(Evaluation.submission_key).where(Evaluation.submission_key.in_(keys))))
+    entries = [entry for entry in entries if entry[0] not in applied]
+    if not entries:
+        return 0
+
+    rows = [(key, json.loads(payload), datetime.fromisoformat(created_at)) for key, payload, created_at in entries]
+    evaluation_ids = db.session.scalars(
+        insert(Evaluation).returning(Evaluation.id, sort_by_parameter_order=True),
+        [{
+            'submission_key': key,
+            'student_id': row['student_id'],
+            'lecturer_id': row['lecturer_id'],
+            'class_id': row['class_id'],
+            'course_id': row['course_id'],
+            'semester': row['semester'],
+            'lecturer_class_id': row['lecturer_class_id'],
+            'comment': row['comment'],
+            'score': row['score'],
+            'created_at': created_at,
+        } for key, row, created_at in rows]
+    ).all()
+
+    answers = [
+        {'evaluation_id': evaluation_id, 'question_id': question_id, 'answer_id': answer_id}
+        for evaluation_id, (_, row, _) in zip(evaluation_ids, rows)
+        for question_id, answer_id in row['answers']
+    ]
+    if answers:
+        db.session.execute(insert(EvaluationAnswer), answers)
+
+    record_score_deltas((row['lecturer_id'], created_at, row['score']) for _, row, created_at in rows)
+    return len(rows)
+
+
+def _error_message(error):
+    # Pesan DBAPI saja, tanpa SQL dan ribuan parameter batch
+    message = str(getattr(error, 'orig', None) or error).strip()
+    return message.splitlines()[0] if message else type(error).__name__
+
+
+def _rejected(error):
+    """True if the row itself is bad (retrying cannot help), False for outages and unexpected errors."""
+    # KeyError/TypeError/ValueError: payload di log tidak lengkap atau rusak
+    return isinstance(error, (IntegrityError, DataError, KeyError, TypeError, ValueError))
+
+
+def drain_once(batch_size=DRAIN_BATCH_SIZE):
+    """
+    Move up to ``batch_size`` logged submissions into the database (needs an app context).
+    Returns the number of log entries processed (applied or moved to
+    failed_submissions): 0 if another worker is draining or the database
+    cannot be written right now.
+    """
+    with _drain_lock() as acquired:
+        if not acquired:
+            return 0
+        conn = _connection()
+        entries = conn.execute(
+            'SELECT id, submission_key, payload, created_at FROM submissions ORDER BY id LIMIT ?', (batch_size,)
+        ).fetchall()
+        if not entries:
+            return 0
+
+        done = []
+        failed = []
+        try:
+            _apply([entry[1:] for entry in entries])
+            db.session.commit()
+            done = entries
+        except Exception as e:
+            db.session.rollback()
+            if not _rejected(e):
+                # Mis. PostgreSQL restart / koneksi putus: bukan salah baris mana pun
+                logger.warning('Batch of %d submissions not applied (%s), kept in the log',
+                               len(entries), _error_message(e))
+                return 0
+            logger.warning('Batch of %d submissions failed (%s), retrying one by one', len(entries), _error_message(e))
+            # Satu baris bermasalah tidak boleh menahan seluruh antrean
+            for entry in entries:
+                try:
+                    _apply([entry[1:]])
+                    db.session.commit()
+                    done.append(entry)
+                except Exception as row_error:
+                    db.session.rollback()
+                    if not _rejected(row_error):
+                        # Database tidak tersedia: sisa batch tetap di log untuk drain berikutnya
+                        logger.warning('Draining stopped (%s), %d submissions kept in the log',
+                                       _error_message(row_error), len(entries) - len(done) - len(failed))
+                        break
+                    failed.append((entry, _error_message(row_error)))
+
+        # Hapus dari log hanya setelah commit ke database
+        conn.execute('BEGIN IMMEDIATE')
+        failed_at = datetime.now().isoformat()
+        conn.executemany(
+            'INSERT INTO failed_submissions (id, submission_key, payload, created_at, error, failed_at) '
+            'VALUES (?, ?, ?, ?, ?, ?)',
+            [(*entry, error, failed_at) for entry, error in failed]
+        )
+        conn.executemany('DELETE FROM submissions WHERE id = ?',
+                         [(entry[0],) for entry in done] + [(entry[0],) for entry, _ in failed])
+        conn.execute('COMMIT')
+        return len(done) + len(failed)
+
+
+def drain_all(batch_size=DRAIN_BATCH_SIZE):
+    """Drain until the log is empty (e.g. from the CLI); returns the number of entries processed."""
+    total = 0
+    while True:
+        processed = drain_once(batch_size)
+        total += processed
+        if processed < batch_size:
+            return total
+
+
+def _drain_loop(app):
+    while True:
+        processed = 0
+        try:
+            with app.app_context():
+                processed = drain_once()
+                db.session.remove()
+        except Exception:
+            logger.exception('Draining the submission queue failed')
+        if processed < DRAIN_BATCH_SIZE:
+            time.sleep(DRAIN_INTERVAL)
+
+
+def ensure_drainer(app=None):
+    """Start the background drainer thread of this worker (once)."""
+    global _drainer
+    if not QUEUE_ENABLED or (_drainer is not None and _drainer.is_alive()):
+        return
+    if app is None:
+        from flask import current_app
+        app = current_app._get_current_object()
+    with _drainer_lock:
+        if _drainer is None or not _drainer.is_alive():
+            _drainer = threading.Thread(target=_drain_loop, args=(app,), name='submission-drainer', daemon=True)
+            _drainer.start()
@@ -0,0 +1,119 @@
+import os
+from datetime import datetime
+from sqlalchemy import case, func, select, update
+from App import db
+from App.models import BayesianPrior, LecturerScore
+
+# Bayesian weighted score per lecturer:
+#
+#   weighted_score = (v * R + m * C) / (v + m)
+#
+# v = number of evaluations of the lecturer, R = their average score,
+# C = average score over all evaluations, m = mean number of evaluations per
+# lecturer. C and m live in the single bayesian_prior row.
+#
+# A submission only moves its own lecturer's v and R, so apply_score_delta
+# updates that lecturer's weighted score in the same UPDATE, using the stored
+# prior. C and m themselves drift slowly; refresh_weighted_scores() derives
+# them from the (score_sum, score_count) columns of lecturer_scores and, once
+# one of them moved by more than WEIGHTED_SCORE_DRIFT (relative), recomputes
+# every lecturer in one NumPy pass and stores the new prior. It runs with every
+# leaderboard refresh: the per-worker background refresher (ensure_refresher,
+# every LEADERBOARD_REFRESH_SECONDS), `flask refresh-leaderboard` and
+# `flask rebuild-scores`.
+
+WEIGHTED_SCORE_DRIFT = float(os.getenv('WEIGHTED_SCORE_DRIFT', '0.01'))
+PRIOR_ID = 1
+
+
+def prior_columns():
+    """C and m of the stored prior as scalar subqueries (0 while no prior was computed yet)."""
+    global_average = select(BayesianPrior.global_average).where(BayesianPrior.id == PRIOR_ID).scalar_subquery()
+    mean_voters = select(BayesianPrior.mean_voters).where(BayesianPrior.id == PRIOR_ID).scalar_subquery()
+    return func.coalesce(global_average, 0), func.coalesce(mean_voters, 0)
+
+
+def weighted_score_expression(count, average):
+    """SQL expression of the weighted score for ``count`` evaluations averaging ``average``."""
+    global_average, mean_voters = prior_columns()
+    return case(
+        (count + mean_voters <= 0, 0),
+        else_=(count * func.coalesce(average, 0) + mean_voters * global_average) / (count + mean_voters)
+    )
+
+
+def bayesian_prior(score_sums, score_counts):
+    """(C, m) from the per-lecturer score sums and counts."""
+    import numpy as np
+
+    total = score_counts.sum()
+    voted = np.count_nonzero(score_counts > 0)
+    global_average = float(score_sums.sum() / total) if total else 0.0
+    mean_voters = float(total / voted) if voted else 0.0
+    return global_average, mean_voters
+
+
+def weighted_scores(averages, counts, global_average, mean_voters):
+    """Vectorized (v * R + m * C) / (v + m); 0 where v + m is 0."""
+    import numpy as np
+
+    denominator = counts + mean_voters
+    with np.errstate(invalid='ignore', divide='ignore'):
+        scores = (counts * averages + mean_voters * global_average) / denominator
+    return np.where(denominator > 0, scores, 0.0)
+
+
+def _drifted(old, new):
+    return abs(new - old) > WEIGHTED_SCORE_DRIFT * max(abs(old), 1e-9)
+
+
+def refresh_weighted_scores(force=False):
+    """
+    Recompute C and m and, if they drifted (or ``force``), the weighted score
+    of every lecturer. Nothing is committed here. Returns True if recomputed.
+    """
+    import numpy as np
+
+    # Dibaca dari primary (juga di request @read_replica): hasilnya ditulis balik
+    primary = {'bind': db.engine}
+    rows = db.session.execute(select(
+        LecturerScore.lecturer_id,
+        func.coalesce(LecturerScore.score_sum, 0),
+        func.coalesce(LecturerScore.score_count, 0),
+        func.coalesce(LecturerScore.average_score, 0)
+    ), bind_arguments=primary).all()
+    # tuple() dulu: np.array langsung atas objek Row jauh lebih lambat
+    data = np.array([tuple(row) for row in rows], dtype=np.float64).reshape(-1, 4)
+    global_average, mean_voters = bayesian_prior(data[:, 1], data[:, 2])
+
+    prior = db.session.execute(
+        select(BayesianPrior).where(BayesianPrior.id == PRIOR_ID), bind_arguments=primary
+    ).scalar()
+    if prior and not force and not _drifted(prior.global_average, global_average) \
+            and not _drifted(prior.mean_voters, mean_voters):
+        return False
+
+    scores = weighted_scores(data[:, 3], data[:, 2], global_average, mean_voters)
+    ids, scores = data[:, 0].astype(np.int64).tolist(), scores.tolist()
+    if db.engine.dialect.name == 'postgresql':
+        # Satu UPDATE untuk semua dosen: kedua array dikirim sebagai 2 parameter
+        db.session.execute(db.text(
+            "UPDATE lecturer_scores SET weighted_score = computed.weighted_score "
+            "FROM unnest(CAST(:ids AS bigint[]), CAST(:scores AS double precision[])) "
+            "AS computed(lecturer_id, weighted_score) "
+            "WHERE lecturer_scores.lecturer_id = computed.lecturer_id"
+        ), {'ids': ids, 'scores': scores})
+    elif ids:
+        # UPDATE per primary key sebagai executemany
+        db.session.execute(update(LecturerScore), [
+            {'lecturer_id': lecturer_id, 'weighted_score': score} for lecturer_id, score in zip(ids, scores)
+        ])
+
+    if prior is None:
+        prior = BayesianPrior(id=PRIOR_ID)
+        db.session.add(prior)
+    prior.global_average = global_average
+    prior.mean_voters = mean_voters
+    prior.refreshed_at = datetime.now()
+    db.session.flush()
+    return True
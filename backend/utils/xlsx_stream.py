@@ -0,0 +1,168 @@
+import re
+import zipfile
+from xml.sax.saxutils import escape
+
+# Minimal streaming XLSX writer: the workbook is a zip of XML parts, and the
+# sheet part is compressed row by row straight into the response, so memory
+# stays bounded and nothing is written to disk (openpyxl's write-only mode
+# still spools every sheet to a temporary file before saving).
+
+CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '<Override PartName="/xl/styles.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+    '</Types>'
+)
+
+ROOT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+
+WORKBOOK = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<sheets><sheet name="{name}" sheetId="1" r:id="rId1"/></sheets>'
+    '</workbook>'
+)
+
+WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+    'Target="worksheets/sheet1.xml"/>'
+    '<Relationship Id="rId2" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" '
+    'Target="styles.xml"/>'
+    '</Relationships>'
+)
+
+# Style 0: default, style 1: bold (header row)
+STYLES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    '<fonts count="2"><font><sz val="11"/><name val="Calibri"/></font>'
+    '<font><b/><sz val="11"/><name val="Calibri"/></font></fonts>'
+    '<fills count="2"><fill><patternFill patternType="none"/></fill>'
+    '<fill><patternFill patternType="gray125"/></fill></fills>'
+    '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+    '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+    '<cellXfs count="2"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+    '<xf numFmtId="0" fontId="1" fillId="0" borderId="0" xfId="0" applyFont="1"/></cellXfs>'
+    '</styleSheet>'
+)
+
+SHEET_START = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+)
+SHEET_END = '</sheetData></worksheet>'
+
+MIME_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+# Characters that are not allowed in XML 1.0
+_ILLEGAL_XML_CHARS = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+_INVALID_SHEET_CHARS = re.compile(r'[\[\]:*?/\\]')
+
+
+class _ChunkBuffer:
+    """Non-seekable sink for ZipFile; collects compressed bytes until drained."""
+
+    def __init__(self):
+        self.chunks = []
+        self.size = 0
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.size += len(data)
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        self.size = 0
+        return data
+
+
+def column_letter(index):
+    """0 -> A, 25 -> Z, 26 -> AA"""
+    letters = ''
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+
+def _cell(ref, value, style=0):
+    style_attr = f' s="{style}"' if style else ''
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return f'<c r="{ref}" t="b"{style_attr}><v>{int(value)}</v></c>'
+    if isinstance(value, (int, float)):
+        return f'<c r="{ref}"{style_attr}><v>{value}</v></c>'
+    text = escape(_ILLEGAL_XML_CHARS.sub('', str(value)))
+    return f'<c r="{ref}" t="inlineStr"{style_attr}><is><t xml:space="preserve">{text}</t></is></c>'
+
+
+def _row(number, values, letters, style=0):
+    cells = ''.join(_cell(f'{letters[i]}{number}', value, style) for i, value in enumerate(values))
+    return f'<row r="{number}">{cells}</row>'
+
+
+def stream_xlsx(sheet_name, headers, rows, widths=None, chunk_size=64 * 1024):
+    """
+    Generate an XLSX file as a sequence of byte chunks.
+
+    Args:
+        sheet_name: Worksheet title (truncated to Excel's 31 characters)
+        headers: Column titles, written in bold on the first row
+        rows: Iterable of row tuples; consumed lazily
+        widths: Optional column widths in characters (must be known up front)
+        chunk_size: Approximate size of the yielded chunks in bytes
+    """
+    sheet_name = _INVALID_SHEET_CHARS.sub('', sheet_name)[:31] or 'Sheet1'
+    letters = [column_letter(i) for i in range(len(headers))]
+
+    buffer = _ChunkBuffer()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as workbook:
+        workbook.writestr('[Content_Types].xml', CONTENT_TYPES)
+        workbook.writestr('_rels/.rels', ROOT_RELS)
+        workbook.writestr('xl/workbook.xml', WORKBOOK.format(name=escape(sheet_name, {'"': '&quot;'})))
+        workbook.writestr('xl/_rels/workbook.xml.rels', WORKBOOK_RELS)
+        workbook.writestr('xl/styles.xml', STYLES)
+        yield buffer.drain()
+
+        with workbook.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as sheet:
+            sheet.write(SHEET_START.encode('utf-8'))
+            if widths:
+                sheet.write(('<cols>' + ''.join(
+                    f'<col min="{i + 1}" max="{i + 1}" width="{width}" customWidth="1"/>'
+                    for i, width in enumerate(widths)
+                ) + '</cols>').encode('utf-8'))
+            sheet.write(('<sheetData>' + _row(1, headers, letters, style=1)).encode('utf-8'))
+
+            for number, values in enumerate(rows, start=2):
+                sheet.write(_row(number, values, letters).encode('utf-8'))
+                if buffer.size >= chunk_size:
+                    yield buffer.drain()
+
+            sheet.write(SHEET_END.encode('utf-8'))
+    yield buffer.drain()
@@ -81,9 +81,11 @@ export default function Home() {
   };
   
   // Get lecturer image URL
-  const getLecturerImage = (lecturer) => {
-    if (lecturer.photo_url && lecturer.photo_url !== '/uploads/lecturers/') {
-      return `${apiUrl}${lecturer.photo_url}`;
+  const getLecturerImage = (lecturer, large = false) => {
+    // photo_url = thumbnail kecil; podium memakai photo_url_md
+    const photoUrl = large && lecturer.photo_url_md ? lecturer.photo_url_md : lecturer.photo_url;
+    if (photoUrl && photoUrl !== '/uploads/lecturers/') {
+      return `${apiUrl}${photoUrl}`;
     }
     return `https://ui-avatars.com/api/?name=${getInitials(lecturer.name)}&background=random`;
   };
@@ -172,7 +174,7 @@ export default function Home() {
                     )}
                     <div className={`${size} rounded-full overflow-hidden border-4 ${rank === 1 ? 'border-yellow-400' : rank === 2 ? 'border-gray-300' : 'border-amber-600'} bg-gradient-to-b ${bgColor}`}>
                       <img 
-                        src={getLecturerImage(lecturer)} 
+                        src={getLecturerImage(lecturer, true)} 
                         alt=""
                         className="w-full h-full object-cover"
                         onError={(e) => {
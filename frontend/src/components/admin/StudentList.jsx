@@ -5,6 +5,7 @@ import 'react-toastify/dist/ReactToastify.css';
 import { HiOutlineDotsVertical } from 'react-icons/hi';
 import { FaSort, FaSortUp, FaSortDown } from 'react-icons/fa';
 import StudentForm from './StudentForm';
+import { fetchAllStudents } from '../../utils/studentApi';
 
 const StudentList = ({ onEdit, refreshTrigger }) => {
   const [students, setStudents] = useState([]);
@@ -26,13 +27,9 @@ const StudentList = ({ onEdit, refreshTrigger }) => {
 
   const fetchStudents = () => {
     const token = localStorage.getItem('access_token');
-    axios.get(`${apiUrl}/admin/students`, {
-        headers: {
-          'Authorization': `Bearer ${token}`
-        }
-      })
-      .then(response => {
-        setStudents(response.data);
+    fetchAllStudents(apiUrl, token)
+      .then(data => {
+        setStudents(data);
         setError(null);
       })
       .catch(err => {
@@ -1,5 +1,6 @@
 import React, { useState, useEffect } from 'react';
 import axios from 'axios';
+import { fetchAllStudents } from '../../utils/studentApi';
 import { toast } from 'react-toastify';
 import { FaChalkboardTeacher } from 'react-icons/fa';
 import 'react-toastify/dist/ReactToastify.css';
@@ -39,12 +40,10 @@ const TeachingAssignmentForm = ({ assignmentId, onSuccess }) => {
         setLecturers(lecturersResponse.data);
 
         // Fetch classes
-        const classesResponse = await axios.get(`${apiUrl}/admin/students`, {
-          headers: { 'Authorization': `Bearer ${token}` }
-        });
+        const students = await fetchAllStudents(apiUrl, token);
         // Extract unique classes from students data
         const uniqueClasses = Array.from(
-          new Set(classesResponse.data.map(student => student.class))
+          new Set(students.map(student => student.class))
         ).filter(Boolean).map((className, index) => ({
           id: index + 1, // This is a simplification, you should use actual class IDs
           name: className
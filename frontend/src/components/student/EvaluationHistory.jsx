@@ -27,14 +27,22 @@ const EvaluationHistory = () => {
     try {
       setLoading(true);
       const token = localStorage.getItem('access_token');
-      const response = await axios.get(`${apiUrl}/api/student/evaluation-history`, {
-        headers: { 'Authorization': `Bearer ${token}` }
-      });
+      // Riwayat dipaginasi dengan cursor; ambil semua halaman
+      const evaluations = [];
+      let cursor = null;
+      do {
+        const response = await axios.get(`${apiUrl}/api/student/evaluation-history`, {
+          headers: { 'Authorization': `Bearer ${token}` },
+          params: { limit: 100, ...(cursor ? { cursor } : {}) }
+        });
+        evaluations.push(...(response.data?.evaluations || []));
+        cursor = response.data?.next_cursor;
+      } while (cursor);
       
       // Check if we received data and process it
-      if (response.data && Array.isArray(response.data)) {
+      if (evaluations.length > 0) {
         // Sort data by created_at date (newest first)
-        const sortedData = [...response.data].sort((a, b) => {
+        const sortedData = [...evaluations].sort((a, b) => {
           return new Date(b.created_at) - new Date(a.created_at);
         });
         setHistory(sortedData);
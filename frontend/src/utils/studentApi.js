@@ -0,0 +1,27 @@
+/**
+ * Helpers for the paginated admin students endpoint
+ */
+import axios from 'axios';
+
+/**
+ * Fetch every student by following the keyset cursor of GET /admin/students
+ * @param {String} apiUrl - Base URL of the API
+ * @param {String} token - Access token of the admin
+ * @param {Object} filters - Optional filters (class_id, semester, name)
+ * @returns {Promise<Array>} All students matching the filters
+ */
+export const fetchAllStudents = async (apiUrl, token, filters = {}) => {
+  const students = [];
+  let cursor = null;
+
+  do {
+    const response = await axios.get(`${apiUrl}/admin/students`, {
+      headers: { 'Authorization': `Bearer ${token}` },
+      params: { ...filters, limit: 500, ...(cursor !== null ? { cursor } : {}) }
+    });
+    students.push(...response.data.students);
+    cursor = response.data.next_cursor;
+  } while (cursor !== null && cursor !== undefined);
+
+  return students;
+};